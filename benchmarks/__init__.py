@@ -0,0 +1,4 @@
+import os
+
+# I moduli del bot aprono il database all'import: senza configurazione basta un SQLite in memoria
+os.environ.setdefault('DATABASE_URL', 'sqlite:///:memory:')
@@ -0,0 +1,52 @@
+import argparse
+import logging
+import sys
+from benchmarks.harness import (
+    BENCHMARKS, BASELINE_FILE, DEFAULT_THRESHOLD, DEFAULT_REPEAT,
+    measure, load_baseline, save_baseline, find_regressions
+)
+
+
+def main(argv=None):
+    """Run the micro-benchmarks and compare them with the baseline. Returns the exit status."""
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description="Micro-benchmark dei percorsi critici del bot")
+    parser.add_argument("names", nargs="*", help="benchmark da eseguire (default: tutti)")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="file JSON con il throughput di riferimento")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="calo di throughput tollerato, es. 0.25 per il 25%% (default %(default)s)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="ripetizioni di ogni misura")
+    parser.add_argument("--update-baseline", action="store_true", help="salva i risultati come nuova baseline")
+    args = parser.parse_args(argv)
+
+    # Il database in memoria e i calendari registrano a livello INFO: qui conta solo la tabella
+    logging.disable(logging.INFO)
+    from benchmarks import cases  # noqa: F401 (registra i benchmark)
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"benchmark sconosciuti: {', '.join(unknown)} (disponibili: {', '.join(BENCHMARKS)})")
+
+    baseline = load_baseline(args.baseline)
+    results = []
+    for name in args.names or BENCHMARKS:
+        result = measure(BENCHMARKS[name], args.repeat)
+        results.append(result)
+        expected = baseline.get(name)
+        change = f"{result.items_per_second / expected - 1:+7.1%}" if expected else "  nuovo"
+        print(f"{name:<28} {result.items:>7} elementi  {result.seconds * 1000:9.3f} ms  "
+              f"{result.items_per_second:>13,.0f} elementi/s  {change}")
+
+    if args.update_baseline:
+        save_baseline(results, args.baseline)
+        print(f"Baseline aggiornata in {args.baseline}")
+        return 0
+
+    regressions = find_regressions(results, baseline, args.threshold)
+    for regression in regressions:
+        print(f"REGRESSIONE {regression.name}: {regression.current:,.0f} elementi/s contro "
+              f"{regression.baseline:,.0f} della baseline ({regression.ratio:.0%})", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,140 @@
+import datetime
+import pytz
+from unittest.mock import patch
+from benchmarks.harness import benchmark
+from commands.handlers import render_day
+from config.waste_schedules import SCHEDULE_YEAR
+from db_manager import DatabaseManager
+from service.calendar import CALENDAR
+from service.delivery import DeliveryPreference, DELIVERY_DIGEST, build_notification
+from service.schedule import get_waste_collection, next_fire_time
+
+# Dimensioni realistiche: un anno di calendario e gli utenti di un comune grande
+DAYS = [datetime.date(SCHEDULE_YEAR, 1, 1) + datetime.timedelta(days=offset) for offset in range(365)]
+USER_ROWS = 100_000
+
+USER_COLUMNS = (
+    'tenant_id', 'user_id', 'username', 'first_name', 'last_name', 'address', 'notification_time',
+    'notifications_enabled', 'delivery_mode', 'digest_days', 'waste_mask', 'language', 'created_at', 'updated_at'
+)
+SLOT_COLUMNS = ('user_id', 'address', 'delivery_mode', 'digest_days', 'waste_mask', 'language')
+
+
+class _Cursor:
+    """Cursor returning the same prepared rows to every query, as psycopg2 would decode them."""
+
+    def __init__(self, columns, rows):
+        self.description = [(column,) for column in columns]
+        self._rows = rows
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def execute(self, query, params=()):
+        pass
+
+    def fetchall(self):
+        return self._rows
+
+
+class _Pool:
+    """Pool of a single connection whose cursors return prepared rows."""
+
+    def __init__(self, columns, rows):
+        self._cursor = _Cursor(columns, rows)
+
+    def getconn(self):
+        return self
+
+    def putconn(self, conn, close=False):
+        pass
+
+    def cursor(self):
+        return self._cursor
+
+    def commit(self):
+        pass
+
+
+def rows_database(columns, rows):
+    """DatabaseManager reading prepared rows instead of a server: times only the mapping to dicts."""
+    with patch('db_manager.psycopg2.pool.SimpleConnectionPool', return_value=_Pool(columns, rows)):
+        return DatabaseManager('dbname=benchmark')
+
+
+def user_rows(count=USER_ROWS):
+    """Rows of the users table with the types returned by psycopg2."""
+    created_at = datetime.datetime(2025, 1, 1, 12, 0)
+    slots = [datetime.time(hour, minute) for hour in (18, 19, 20, 21) for minute in (0, 30)]
+    return [
+        ('calvenzano', user_id, f'user{user_id}', 'Mario', 'Rossi', f'Via Roma {user_id % 200}',
+         slots[user_id % len(slots)], True, 'daily', 3, -1, 'it', created_at, created_at)
+        for user_id in range(count)
+    ]
+
+
+@benchmark('schedule_lookup', items=len(DAYS))
+def schedule_lookup():
+    def run():
+        for date in DAYS:
+            get_waste_collection(date.day, date.month, CALENDAR)
+    return run
+
+
+@benchmark('next_fire_time', items=len(DAYS))
+def next_fire_times():
+    rome = pytz.timezone('Europe/Rome')
+    instants = [rome.localize(datetime.datetime(date.year, date.month, date.day, 12, 0)) for date in DAYS]
+
+    def run():
+        for now in instants:
+            next_fire_time('20:00', now, CALENDAR)
+    return run
+
+
+@benchmark('notification_daily', items=len(DAYS))
+def notification_daily():
+    # Senza la cache di build_notification: si misura il rendering, non il lookup nella cache
+    render = build_notification.__wrapped__
+    preference = DeliveryPreference()
+
+    def run():
+        for date in DAYS:
+            render(date, preference, 'it', CALENDAR)
+    return run
+
+
+@benchmark('notification_digest', items=len(DAYS))
+def notification_digest():
+    render = build_notification.__wrapped__
+    preference = DeliveryPreference(DELIVERY_DIGEST, 3, CALENDAR.all_mask)
+
+    def run():
+        for date in DAYS:
+            render(date, preference, 'it', CALENDAR)
+    return run
+
+
+@benchmark('tomorrow_reply', items=len(DAYS))
+def tomorrow_reply():
+    # Il testo di /domani, composto dalla stessa funzione usata dall'handler
+    def run():
+        for date in DAYS:
+            render_day(date, "tomorrow", 'it', CALENDAR)
+    return run
+
+
+@benchmark('all_users_for_notification', items=USER_ROWS)
+def all_users_for_notification():
+    db = rows_database(USER_COLUMNS, user_rows())
+    return db.get_all_users_for_notification
+
+
+@benchmark('users_for_slot', items=USER_ROWS)
+def users_for_slot():
+    rows = [(row[1], row[5], row[8], row[9], row[10], row[11]) for row in user_rows()]
+    db = rows_database(SLOT_COLUMNS, rows)
+    return lambda: db.get_users_for_slot('20:00', CALENDAR.all_mask)
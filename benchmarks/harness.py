@@ -0,0 +1,94 @@
+import json
+import os
+import timeit
+from typing import NamedTuple
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Calo massimo di throughput rispetto alla baseline prima di considerarlo una regressione
+DEFAULT_THRESHOLD = 0.25
+
+# Ripetizioni di ogni misura: si tiene la più veloce, le altre sono rumore della macchina
+DEFAULT_REPEAT = 5
+
+# Registro dei benchmark, nell'ordine di definizione
+BENCHMARKS = {}
+
+
+class Benchmark(NamedTuple):
+    """A micro-benchmark: setup() returns the function timed, which processes `items` items per call."""
+    name: str
+    setup: object
+    items: int
+
+
+class Result(NamedTuple):
+    """Best time of a benchmark and the throughput it gives."""
+    name: str
+    seconds: float
+    items: int
+
+    @property
+    def items_per_second(self):
+        return self.items / self.seconds
+
+
+class Regression(NamedTuple):
+    """A benchmark slower than its baseline by more than the threshold."""
+    name: str
+    baseline: float
+    current: float
+
+    @property
+    def ratio(self):
+        return self.current / self.baseline
+
+
+def benchmark(name, items):
+    """Register the decorated setup function as a benchmark."""
+    def register(setup):
+        BENCHMARKS[name] = Benchmark(name, setup, items)
+        return setup
+    return register
+
+
+def measure(bench, repeat=DEFAULT_REPEAT):
+    """
+    Time a benchmark and return its best run.
+
+    The setup is not timed. Each run calls the function enough times to last at least 0.2
+    seconds (as timeit does), so short benchmarks are not dominated by the timer resolution.
+    """
+    timer = timeit.Timer(bench.setup())
+    # La calibrazione fa anche da riscaldamento: import pigri, cache dei format e delle stringhe
+    number, _ = timer.autorange()
+    best = min(timer.repeat(repeat=repeat, number=number)) / number
+    return Result(bench.name, best, bench.items)
+
+
+def load_baseline(path=BASELINE_FILE):
+    """Throughput (items per second) recorded for each benchmark, {} if there is no baseline yet."""
+    try:
+        with open(path, encoding="utf-8") as baseline_file:
+            return json.load(baseline_file)["items_per_second"]
+    except FileNotFoundError:
+        return {}
+
+
+def save_baseline(results, path=BASELINE_FILE):
+    """Record the throughput of the results as the new baseline, keeping the benchmarks not run."""
+    baseline = load_baseline(path)
+    baseline.update({result.name: round(result.items_per_second, 1) for result in results})
+    with open(path, "w", encoding="utf-8") as baseline_file:
+        json.dump({"items_per_second": baseline}, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write("\n")
+
+
+def find_regressions(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """Results whose throughput dropped below (1 - threshold) times the baseline; new benchmarks never fail."""
+    regressions = []
+    for result in results:
+        expected = baseline.get(result.name)
+        if expected and result.items_per_second < expected * (1 - threshold):
+            regressions.append(Regression(result.name, expected, result.items_per_second))
+    return regressions
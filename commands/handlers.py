@@ -1,60 +1,87 @@
+import calendar
 import datetime
+import functools
 import logging
 import os
 import pytz
 import telegram
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
-from config.waste_schedules import WASTE_SCHEDULE, WASTE_INSTRUCTIONS, WASTE_EMOJI, DAY_NAMES, MONTH_NAMES
+from config.waste_schedules import WASTE_INSTRUCTIONS, WASTE_EMOJI
 
-from db_manager import DatabaseManager
-from service.schedule import schedule_tomorrow_notification, get_waste_collection
-
-# Inizializza il database manager
-db = DatabaseManager(os.environ.get('DATABASE_URL'))
+from service.calendar import CALENDAR
+from service.delivery import (
+    preference_for, DELIVERY_DAILY, DELIVERY_DIGEST, DEFAULT_DIGEST_DAYS, MIN_DIGEST_DAYS, MAX_DIGEST_DAYS
+)
+from config.messages import DEFAULT_LANGUAGE
+from service.i18n import (
+    CATALOG, translate, resolve_language, format_date, format_waste_list, month_name, day_name,
+    waste_name, waste_instruction
+)
+# Database manager condiviso con lo scheduler: un solo insieme di pool per processo
+from service.schedule import db, request_reschedule, get_waste_collection
+from service.tenants import tenant_of
+from service.reload import reload_schedule
 
 logger = logging.getLogger(__name__)
 
 # Define conversation states
 SETTING_TIME, SETTING_ADDRESS = range(2)
 
+# Utenti Telegram autorizzati ai comandi di amministrazione (ID separati da virgole)
+ADMIN_USER_IDS = {int(user_id) for user_id in os.getenv("ADMIN_USER_IDS", "").split(",") if user_id.strip()}
+
+
+def get_language(update: Update, context: ContextTypes.DEFAULT_TYPE) -> str:
+    """Language of the user, read from the database once and then kept in user_data."""
+    language = context.user_data.get('language')
+    if language is None:
+        user = update.effective_user
+        user_data = db.get_user(user.id, tenant_of(context).tenant_id) or {}
+        language = user_data.get('language') or resolve_language(user.language_code)
+        context.user_data['language'] = language
+    return language
+
+def time_keyboard(language: str) -> InlineKeyboardMarkup:
+    """Keyboard to choose the notification time."""
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(translate(language, "button_now"), callback_data="now")],
+        [InlineKeyboardButton(translate(language, "button_default"), callback_data="default")],
+        [InlineKeyboardButton(translate(language, "button_custom"), callback_data="custom")]
+    ])
+
+def address_keyboard(language: str) -> InlineKeyboardMarkup:
+    """Keyboard to choose whether to set the address."""
+    return InlineKeyboardMarkup([
+        [InlineKeyboardButton(translate(language, "button_yes"), callback_data="yes_address")],
+        [InlineKeyboardButton(translate(language, "button_no"), callback_data="no_address")]
+    ])
+
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Send a welcome message when the command /start is issued."""
     user = update.effective_user
     user_id = user.id
+    tenant = tenant_of(context)
     
     # Crea o recupera l'utente dal database
-    user_data = db.get_user(user_id)
+    user_data = db.get_user(user_id, tenant.tenant_id)
     if not user_data:
-        db.create_user(user_id, user.username, user.first_name, user.last_name)
-        user_data = db.get_user(user_id)
+        db.create_user(user_id, user.username, user.first_name, user.last_name, resolve_language(user.language_code),
+                       tenant_id=tenant.tenant_id)
+        user_data = db.get_user(user_id, tenant.tenant_id)
+    
+    language = (user_data or {}).get('language') or resolve_language(user.language_code)
+    context.user_data['language'] = language
     
     await update.message.reply_text(
-        f"Ciao {user.first_name}! 👋\n\n"
-        f"Benvenuto al bot per la raccolta differenziata di Calvenzano.\n\n"
-        f"Questo bot ti invierà notifiche sui giorni di raccolta dei rifiuti in base al calendario 2025 del Comune di Calvenzano.\n\n"
-        f"Usa i seguenti comandi:\n"
-        f"/oggi - Verifica quali rifiuti raccolgono oggi\n"
-        f"/domani - Verifica quali rifiuti raccolgono domani\n"
-        f"/setNotifica - Imposta l'orario della notifica giornaliera\n"
-        f"/setIndirizzo - Imposta il tuo indirizzo per i tessili\n"
-        f"/info - Istruzioni per la raccolta differenziata\n"
-        f"/stop - Disattiva le notifiche\n"
-        f"/start - Riattiva le notifiche"
+        translate(language, "welcome", first_name=user.first_name, town=tenant.town, year=tenant.year)
     )
     
     # Ask for notification time setting
-    keyboard = [
-        [InlineKeyboardButton("Adesso", callback_data="now")],
-        [InlineKeyboardButton("20:00 (Default)", callback_data="default")],
-        [InlineKeyboardButton("Personalizza", callback_data="custom")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
     await update.message.reply_text(
-        "A che ora vuoi ricevere le notifiche per la raccolta rifiuti?",
-        reply_markup=reply_markup
+        translate(language, "ask_time"),
+        reply_markup=time_keyboard(language)
     )
     
     return SETTING_TIME
@@ -63,6 +90,7 @@ async def set_notification_time(update: Update, context: ContextTypes.DEFAULT_TY
     """Handle notification time selection."""
     query = update.callback_query
     user_id = query.from_user.id
+    language = get_language(update, context)
     
     await query.answer()
     
@@ -70,34 +98,26 @@ async def set_notification_time(update: Update, context: ContextTypes.DEFAULT_TY
         # Get current time
         now = datetime.datetime.now(pytz.timezone('Europe/Rome'))
         notification_time = now.strftime("%H:%M")
-        db.set_notification_time(user_id, notification_time)
+        db.set_notification_time(user_id, notification_time, tenant_id=tenant_of(context).tenant_id)
         await query.edit_message_text(
-            f"Notifiche impostate per le {notification_time}.\n\n"
-            f"Vuoi impostare il tuo indirizzo per la raccolta dei tessili?"
+            translate(language, "time_set_ask_address", time=notification_time)
         )
     elif query.data == "default":
-        db.set_notification_time(user_id, "20:00")
+        db.set_notification_time(user_id, "20:00", tenant_id=tenant_of(context).tenant_id)
         await query.edit_message_text(
-            "Notifiche impostate per le 20:00.\n\n"
-            "Vuoi impostare il tuo indirizzo per la raccolta dei tessili?"
+            translate(language, "time_set_ask_address", time="20:00")
         )
     elif query.data == "custom":
         await query.edit_message_text(
-            "Per favore, invia l'orario in cui desideri ricevere le notifiche nel formato HH:MM (es. 19:30)"
+            translate(language, "ask_custom_time")
         )
         return SETTING_TIME
     
     # Ask for address
-    keyboard = [
-        [InlineKeyboardButton("Sì", callback_data="yes_address")],
-        [InlineKeyboardButton("No", callback_data="no_address")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
     await context.bot.send_message(
         chat_id=user_id,
-        text="Vuoi impostare il tuo indirizzo per la raccolta dei tessili?",
-        reply_markup=reply_markup
+        text=translate(language, "ask_address"),
+        reply_markup=address_keyboard(language)
     )
     
     return SETTING_ADDRESS
@@ -106,37 +126,32 @@ async def handle_custom_time(update: Update, context: ContextTypes.DEFAULT_TYPE)
     """Handle custom time input."""
     text = update.message.text
     user_id = update.effective_user.id
+    language = get_language(update, context)
     
     # Check if the format is correct (HH:MM)
     try:
         hours, minutes = map(int, text.split(':'))
         if 0 <= hours <= 23 and 0 <= minutes <= 59:
             notification_time = f"{hours:02d}:{minutes:02d}"
-            db.set_notification_time(user_id, notification_time)
+            db.set_notification_time(user_id, notification_time, tenant_id=tenant_of(context).tenant_id)
             await update.message.reply_text(
-                f"Notifiche impostate per le {notification_time}."
+                translate(language, "time_set", time=notification_time)
             )
         else:
             await update.message.reply_text(
-                "Formato orario non valido. Per favore, usa il formato HH:MM (es. 19:30)"
+                translate(language, "invalid_time")
             )
             return SETTING_TIME
     except ValueError:
         await update.message.reply_text(
-            "Formato orario non valido. Per favore, usa il formato HH:MM (es. 19:30)"
+            translate(language, "invalid_time")
         )
         return SETTING_TIME
     
     # Ask for address
-    keyboard = [
-        [InlineKeyboardButton("Sì", callback_data="yes_address")],
-        [InlineKeyboardButton("No", callback_data="no_address")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
     await update.message.reply_text(
-        "Vuoi impostare il tuo indirizzo per la raccolta dei tessili?",
-        reply_markup=reply_markup
+        translate(language, "ask_address"),
+        reply_markup=address_keyboard(language)
     )
     
     return SETTING_ADDRESS
@@ -145,95 +160,117 @@ async def set_address(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int
     """Handle address setting."""
     query = update.callback_query
     user_id = query.from_user.id
+    language = get_language(update, context)
     
     await query.answer()
     
     if query.data == "yes_address":
         await query.edit_message_text(
-            "Per favore, invia il tuo indirizzo (via e numero civico)"
+            translate(language, "enter_address")
         )
         return SETTING_ADDRESS
     elif query.data == "no_address":
         await query.edit_message_text(
-            "Configurazione completata! Riceverai notifiche per la raccolta dei rifiuti.\n\n"
-            "Usa /oggi per verificare la raccolta di oggi o /domani per quella di domani."
+            translate(language, "setup_complete")
         )
         # Ensure notifications are enabled
-        db.set_notifications_enabled(user_id, True)
+        db.set_notifications_enabled(user_id, True, tenant_id=tenant_of(context).tenant_id)
         # Schedule the first check for tomorrow's waste collection
-        await schedule_tomorrow_notification(context)
+        request_reschedule(context)
         return ConversationHandler.END
 
 async def handle_address_input(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle address input."""
     text = update.message.text
     user_id = update.effective_user.id
+    language = get_language(update, context)
     
     # Save the address
-    db.set_address(user_id, text)
+    db.set_address(user_id, text, tenant_id=tenant_of(context).tenant_id)
     
     await update.message.reply_text(
-        f"Indirizzo impostato: {text}\n\n"
-        f"Configurazione completata! Riceverai notifiche per la raccolta dei rifiuti.\n\n"
-        f"Usa /oggi per verificare la raccolta di oggi o /domani per quella di domani."
+        translate(language, "address_set", address=text)
     )
     
     # Ensure notifications are enabled
-    db.set_notifications_enabled(user_id, True)
+    db.set_notifications_enabled(user_id, True, tenant_id=tenant_of(context).tenant_id)
     # Schedule the first check for tomorrow's waste collection
-    await schedule_tomorrow_notification(context)
+    request_reschedule(context)
     
     return ConversationHandler.END
 
+def render_day(date, day, language=DEFAULT_LANGUAGE, calendar=CALENDAR):
+    """Render the reply of /oggi (day="today") or /domani (day="tomorrow") for a date."""
+    waste_types = get_waste_collection(date.day, date.month, calendar)
+
+    if waste_types:
+        return translate(language, f"{day}_collections",
+                         date=format_date(language, date), waste_list=format_waste_list(language, waste_types))
+    return translate(language, f"{day}_empty", date=format_date(language, date))
+
 async def check_today(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Check what waste types are collected today."""
-    today = datetime.datetime.now(pytz.timezone('Europe/Rome'))
-    waste_types = get_waste_collection(today.day, today.month)
-    
-    if waste_types:
-        await update.message.reply_text(
-            f"📅 Oggi, {DAY_NAMES[today.weekday()]} {today.day} {MONTH_NAMES[today.month]}, verranno raccolti:\n\n" +
-            "\n".join([f"{WASTE_EMOJI[waste_type]} {waste_type}" for waste_type in waste_types]) +
-            "\n\nRicorda: posiziona i rifiuti in strada non prima delle ore 20:00 del giorno precedente."
-        )
-    else:
-        await update.message.reply_text(
-            f"📅 Oggi, {DAY_NAMES[today.weekday()]} {today.day} {MONTH_NAMES[today.month]}, non è prevista alcuna raccolta di rifiuti."
-        )
+    language = get_language(update, context)
+    today = datetime.datetime.now(pytz.timezone('Europe/Rome')).date()
+    await update.message.reply_text(render_day(today, "today", language, tenant_of(context).calendar))
 
 async def check_tomorrow(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Check what waste types are collected tomorrow."""
-    today = datetime.datetime.now(pytz.timezone('Europe/Rome'))
-    tomorrow = today + datetime.timedelta(days=1)
-    waste_types = get_waste_collection(tomorrow.day, tomorrow.month)
-    
-    if waste_types:
-        await update.message.reply_text(
-            f"📅 Domani, {DAY_NAMES[tomorrow.weekday()]} {tomorrow.day} {MONTH_NAMES[tomorrow.month]}, verranno raccolti:\n\n" +
-            "\n".join([f"{WASTE_EMOJI[waste_type]} {waste_type}" for waste_type in waste_types]) +
-            "\n\nRicorda: posiziona i rifiuti in strada non prima delle ore 20:00 di oggi."
-        )
-    else:
-        await update.message.reply_text(
-            f"📅 Domani, {DAY_NAMES[tomorrow.weekday()]} {tomorrow.day} {MONTH_NAMES[tomorrow.month]}, non è prevista alcuna raccolta di rifiuti."
+    language = get_language(update, context)
+    tomorrow = datetime.datetime.now(pytz.timezone('Europe/Rome')).date() + datetime.timedelta(days=1)
+    await update.message.reply_text(render_day(tomorrow, "tomorrow", language, tenant_of(context).calendar))
+
+@functools.lru_cache(maxsize=32)
+def render_period(start, end, title, language=DEFAULT_LANGUAGE, calendar=CALENDAR):
+    """Render every collection day between two dates in a single message (cached per period)."""
+    collections = calendar.collections_between(start, end)
+
+    if not collections:
+        return translate(language, "period_empty", title=title)
+
+    lines = []
+    for date, waste_types in collections:
+        lines.append(
+            f"{day_name(language, date.weekday())} {date.day}: " +
+            " ".join([WASTE_EMOJI[waste_type] for waste_type in waste_types]) +
+            " " + ", ".join([waste_name(language, waste_type) for waste_type in waste_types])
         )
+    return translate(language, "period_collections", title=title, day_list="\n".join(lines))
+
+async def check_week(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Show all collection days of the current week."""
+    language = get_language(update, context)
+    today = datetime.datetime.now(pytz.timezone('Europe/Rome')).date()
+    monday = today - datetime.timedelta(days=today.weekday())
+    sunday = monday + datetime.timedelta(days=6)
+    title = translate(
+        language, "week_title",
+        start=f"{monday.day} {month_name(language, monday.month)}",
+        end=f"{sunday.day} {month_name(language, sunday.month)}"
+    )
+    
+    await update.message.reply_text(render_period(monday, sunday, title, language, tenant_of(context).calendar))
+
+async def check_month(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Show all collection days of the current month."""
+    language = get_language(update, context)
+    today = datetime.datetime.now(pytz.timezone('Europe/Rome')).date()
+    first = today.replace(day=1)
+    last = today.replace(day=calendar.monthrange(today.year, today.month)[1])
+    title = translate(language, "month_title", month=month_name(language, today.month), year=today.year)
+    
+    await update.message.reply_text(render_period(first, last, title, language, tenant_of(context).calendar))
 
 async def set_notification(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle the /setNotifica command."""
     user_id = update.effective_user.id
     logger.info(f"Update setting notification for user {user_id}")
+    language = get_language(update, context)
     
     # Ask for notification time setting
-    keyboard = [
-        [InlineKeyboardButton("Adesso", callback_data="now")],
-        [InlineKeyboardButton("20:00 (Default)", callback_data="default")],
-        [InlineKeyboardButton("Personalizza", callback_data="custom")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-    
     await update.message.reply_text(
-        "A che ora vuoi ricevere le notifiche per la raccolta rifiuti?",
-        reply_markup=reply_markup
+        translate(language, "ask_time"),
+        reply_markup=time_keyboard(language)
     )
     
     return SETTING_TIME
@@ -241,52 +278,167 @@ async def set_notification(update: Update, context: ContextTypes.DEFAULT_TYPE) -
 async def set_address_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> int:
     """Handle the /setIndirizzo command."""
     await update.message.reply_text(
-        "Per favore, invia il tuo indirizzo (via e numero civico) per la raccolta dei tessili."
+        translate(get_language(update, context), "enter_address_textiles")
     )
     
     return SETTING_ADDRESS
 
+@functools.lru_cache(maxsize=32)
+def render_info(language: str, tenant) -> str:
+    """Render the disposal instructions once per language and town."""
+    instructions = "".join([
+        f"{WASTE_EMOJI[waste_type]} **{waste_name(language, waste_type)}**\n{waste_instruction(language, waste_type)}\n\n"
+        for waste_type in WASTE_INSTRUCTIONS
+    ])
+    return translate(language, "info", instructions=instructions,
+                     collection_centre=tenant.collection_centre_text(language))
+
 async def show_info(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Show waste disposal instructions."""
-    info_text = "ℹ️ **ISTRUZIONI PER LA RACCOLTA DIFFERENZIATA**\n\n"
-    
-    for waste_type, instruction in WASTE_INSTRUCTIONS.items():
-        info_text += f"{WASTE_EMOJI[waste_type]} **{waste_type}**\n{instruction}\n\n"
-    
-    info_text += (
-        "⏰ **ORARI CENTRO DI RACCOLTA**\n\n"
-        "**Dal 1° Aprile al 30 Settembre:**\n"
-        "- Martedì: 9.00 - 13.00\n"
-        "- Giovedì: 14.00 - 18.00\n"
-        "- Sabato: 9.00 - 12.00, 15.00 - 18.00\n\n"
-        "**Dal 1° Ottobre al 31 Marzo:**\n"
-        "- Martedì: 10.00 - 13.00\n"
-        "- Giovedì: 14.00 - 17.00\n"
-        "- Sabato: 10.00 - 13.00, 14.00 - 17.00\n\n"
-        "⚠️ **NOTA**: La raccolta dei rifiuti viene effettuata a partire dalle ore 5.00. "
-        "Posizionare i rifiuti in strada non prima delle ore 20.00 del giorno precedente.\n\n"
-        "Per segnalare disservizi: tel. 0363/860737"
+    await update.message.reply_text(
+        render_info(get_language(update, context), tenant_of(context)),
+        parse_mode=telegram.constants.ParseMode.MARKDOWN
     )
-    
-    await update.message.reply_text(info_text, parse_mode=telegram.constants.ParseMode.MARKDOWN)
 
 async def stop_notifications(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Disable notifications."""
     user_id = update.effective_user.id
-    db.set_notifications_enabled(user_id, False)
+    db.set_notifications_enabled(user_id, False, tenant_id=tenant_of(context).tenant_id)
     
     await update.message.reply_text(
-        "Notifiche disattivate. Usa /start per riattivarle."
+        translate(get_language(update, context), "notifications_stopped")
     )
 
 async def restart_notifications(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     """Re-enable notifications."""
     user_id = update.effective_user.id
-    db.set_notifications_enabled(user_id, True)
+    db.set_notifications_enabled(user_id, True, tenant_id=tenant_of(context).tenant_id)
     
     await update.message.reply_text(
-        "Notifiche riattivate. Riceverai informazioni sulla raccolta differenziata."
+        translate(get_language(update, context), "notifications_restarted")
     )
     
     # Schedule the next notification
-    await schedule_tomorrow_notification(context)
+    request_reschedule(context)
+
+@functools.lru_cache(maxsize=16)
+def waste_keywords(calendar):
+    """Keywords of the waste types of a calendar: "carta" -> "CARTA E CARTONE", "vetro" -> "VETRO E BARATTOLAME", ..."""
+    return {waste_type.split()[0].lower(): waste_type for waste_type in calendar.waste_types}
+
+async def set_digest_mode(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Switch to a single digest message covering the next days."""
+    user_id = update.effective_user.id
+    language = get_language(update, context)
+    digest_days = DEFAULT_DIGEST_DAYS
+    
+    if context.args:
+        try:
+            digest_days = int(context.args[0])
+        except ValueError:
+            digest_days = 0
+        if not MIN_DIGEST_DAYS <= digest_days <= MAX_DIGEST_DAYS:
+            await update.message.reply_text(
+                translate(language, "digest_invalid_days", min_days=MIN_DIGEST_DAYS, max_days=MAX_DIGEST_DAYS)
+            )
+            return
+    
+    db.set_delivery_mode(user_id, DELIVERY_DIGEST, digest_days, tenant_id=tenant_of(context).tenant_id)
+    
+    await update.message.reply_text(
+        translate(language, "digest_enabled", days=digest_days)
+    )
+
+async def set_daily_mode(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Switch back to one reminder the evening before each collection."""
+    user_id = update.effective_user.id
+    db.set_delivery_mode(user_id, DELIVERY_DAILY, tenant_id=tenant_of(context).tenant_id)
+    
+    await update.message.reply_text(
+        translate(get_language(update, context), "daily_enabled")
+    )
+
+async def set_waste_types(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Choose which waste types trigger a notification."""
+    user_id = update.effective_user.id
+    language = get_language(update, context)
+    tenant = tenant_of(context)
+    keywords_by_type = waste_keywords(tenant.calendar)
+    
+    if not context.args:
+        user_data = db.get_user(user_id, tenant.tenant_id) or {}
+        mask = preference_for(user_data, tenant.calendar).waste_mask
+        await update.message.reply_text(
+            translate(language, "waste_types_current",
+                      waste_list=format_waste_list(language, tenant.calendar.types_for_mask(mask)),
+                      keywords=", ".join(keywords_by_type))
+        )
+        return
+    
+    keywords = [arg.lower() for arg in context.args]
+    if keywords in (["tutti"], ["all"]):
+        db.set_waste_mask(user_id, -1, tenant_id=tenant.tenant_id)
+        await update.message.reply_text(translate(language, "waste_types_all"))
+        return
+    
+    unknown = [keyword for keyword in keywords if keyword not in keywords_by_type]
+    if unknown:
+        await update.message.reply_text(
+            translate(language, "waste_types_unknown", unknown=", ".join(unknown), keywords=", ".join(keywords_by_type))
+        )
+        return
+    
+    waste_mask = 0
+    for keyword in keywords:
+        waste_mask |= tenant.calendar.bits[keywords_by_type[keyword]]
+    db.set_waste_mask(user_id, waste_mask, tenant_id=tenant.tenant_id)
+    
+    await update.message.reply_text(
+        translate(language, "waste_types_set", waste_list=format_waste_list(language, tenant.calendar.types_for_mask(waste_mask)))
+    )
+
+async def set_language(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Show or change the language of the bot messages."""
+    user_id = update.effective_user.id
+    language = get_language(update, context)
+    languages = ", ".join([f"{code} ({translate(code, 'language_name')})" for code in CATALOG.languages])
+    
+    if not context.args:
+        await update.message.reply_text(
+            translate(language, "language_current", name=translate(language, "language_name"), languages=languages)
+        )
+        return
+    
+    code = context.args[0].lower()
+    if code not in CATALOG.languages:
+        await update.message.reply_text(
+            translate(language, "language_unknown", code=code, languages=languages)
+        )
+        return
+    
+    db.set_language(user_id, code, tenant_id=tenant_of(context).tenant_id)
+    context.user_data['language'] = code
+    
+    await update.message.reply_text(
+        translate(code, "language_set", name=translate(code, "language_name"))
+    )
+
+async def reload_schedule_command(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Reload the collection schedule of the town from its data file (administrators only)."""
+    if update.effective_user.id not in ADMIN_USER_IDS:
+        return
+    
+    language = get_language(update, context)
+    try:
+        report = reload_schedule(tenant_of(context), context.bot)
+    except (OSError, ValueError) as e:
+        await update.message.reply_text(translate(language, "schedule_reload_failed", error=str(e)))
+        return
+    
+    if report is None:
+        await update.message.reply_text(translate(language, "schedule_unchanged"))
+        return
+    
+    await update.message.reply_text(
+        translate(language, "schedule_reloaded", days=report['changed_days'], slots=report['replanned_slots'])
+    )
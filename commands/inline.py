@@ -0,0 +1,112 @@
+import datetime
+import functools
+import logging
+import re
+import unicodedata
+import pytz
+from telegram import Update, InlineQueryResultArticle, InputTextMessageContent
+from telegram.ext import ContextTypes
+from config.messages import DAY_NAMES_BY_LANGUAGE
+from service.calendar import CALENDAR
+from service.i18n import translate, resolve_language, format_date, format_waste_list, waste_name
+from service.tenants import tenant_of
+
+logger = logging.getLogger(__name__)
+
+# Telegram non accetta cache_time più lunghi di qualche ora per le inline query
+MAX_INLINE_CACHE_TIME = 3600
+
+RELATIVE_DAYS = {
+    "oggi": 0,
+    "domani": 1,
+    "dopodomani": 2,
+    "today": 0,
+    "tomorrow": 1,
+}
+
+# "lunedi" -> 0, "monday" -> 0, ... : i nomi sono confrontati senza accenti, in tutte le lingue
+WEEKDAYS = {
+    unicodedata.normalize('NFKD', name).encode('ascii', 'ignore').decode().lower(): weekday
+    for day_names in DAY_NAMES_BY_LANGUAGE.values()
+    for weekday, name in day_names.items()
+}
+
+DATE_PATTERN = re.compile(r"^(\d{1,2})[/.\-](\d{1,2})(?:[/.\-](\d{2}|\d{4}))?$")
+
+
+def parse_date_query(text, today):
+    """Resolve an inline query such as "sabato" or "15/11" to a date, or None."""
+    text = unicodedata.normalize('NFKD', text.strip().lower()).encode('ascii', 'ignore').decode()
+
+    if text in RELATIVE_DAYS:
+        return today + datetime.timedelta(days=RELATIVE_DAYS[text])
+
+    if text in WEEKDAYS:
+        # Il prossimo giorno con quel nome, oggi compreso
+        return today + datetime.timedelta(days=(WEEKDAYS[text] - today.weekday()) % 7)
+
+    match = DATE_PATTERN.match(text)
+    if match:
+        day, month, year = match.groups()
+        if year is None:
+            year = today.year
+        elif len(year) == 2:
+            year = 2000 + int(year)
+        try:
+            return datetime.date(int(year), int(month), int(day))
+        except ValueError:
+            return None
+
+    return None
+
+
+@functools.lru_cache(maxsize=512)
+def build_date_article(date, language, calendar=CALENDAR):
+    """Build the (cached) inline result describing collections on a date."""
+    waste_types = calendar.collections_on(date)
+    title = format_date(language, date)
+
+    if waste_types:
+        description = ", ".join([waste_name(language, waste_type) for waste_type in waste_types])
+        text = translate(language, "date_collections", date=title, waste_list=format_waste_list(language, waste_types))
+    else:
+        description = translate(language, "inline_no_collection")
+        text = translate(language, "date_empty", date=title)
+
+    return InlineQueryResultArticle(
+        id=f"{date.isoformat()}-{language}",
+        title=title,
+        description=description,
+        input_message_content=InputTextMessageContent(text)
+    )
+
+
+def seconds_until_midnight(now):
+    """Seconds left before the local date changes."""
+    midnight = datetime.datetime.combine(now.date() + datetime.timedelta(days=1), datetime.time())
+    return int((midnight - now.replace(tzinfo=None)).total_seconds())
+
+
+async def inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Answer inline queries like "sabato" or "15/11" from the compiled calendar."""
+    query = update.inline_query
+    language = resolve_language(query.from_user.language_code)
+    calendar = tenant_of(context).calendar
+    now = datetime.datetime.now(pytz.timezone('Europe/Rome'))
+    today = now.date()
+
+    if query.query.strip():
+        date = parse_date_query(query.query, today)
+        dates = [date] if date else []
+    else:
+        # Senza testo mostra oggi e domani
+        dates = [today, today + datetime.timedelta(days=1)]
+
+    results = [build_date_article(date, language, calendar) for date in dates]
+
+    # "sabato" o "domani" cambiano significato a mezzanotte
+    cache_time = max(1, min(MAX_INLINE_CACHE_TIME, seconds_until_midnight(now)))
+
+    # La risposta dipende dalla lingua dell'utente: la cache di Telegram deve essere personale,
+    # la cache lato server resta condivisa per (data, lingua, calendario)
+    await query.answer(results, cache_time=cache_time, is_personal=True)
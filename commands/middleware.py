@@ -0,0 +1,159 @@
+import collections
+import logging
+import time
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop, ContextTypes
+from service.events import event_log
+from service.i18n import translate, resolve_language
+from service.tenants import tenant_of
+
+logger = logging.getLogger(__name__)
+
+# Ogni utente può fare una raffica di 5 richieste, poi una ogni 2 secondi
+THROTTLE_RATE = 0.5
+THROTTLE_BURST = 5
+
+# Doppi tocchi e ritrasmissioni dello stesso update entro questa finestra vengono ignorati
+DUPLICATE_WINDOW = 2.0
+
+# Limite ai bucket in memoria: quelli inattivi da più tempo vengono scartati per primi
+MAX_TRACKED_USERS = 10000
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at a fixed rate."""
+
+    __slots__ = ('tokens', 'updated', 'warned')
+
+    def __init__(self, capacity, now):
+        self.tokens = capacity
+        self.updated = now
+        self.warned = False
+
+    def consume(self, rate, capacity, now):
+        """Take a token if one is available."""
+        self.tokens = min(capacity, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+def update_fingerprint(update):
+    """Identify what an update asks for, so that a repeated request can be recognised."""
+    user = update.effective_user
+    if update.message and update.message.text:
+        return (user.id, 'message', update.message.text)
+    if update.callback_query:
+        return (user.id, 'callback', update.callback_query.data)
+    return None
+
+
+def update_kind(update):
+    """Short name of what an update asks for: the command, the button or "inline"."""
+    if update.message and update.message.text:
+        text = update.message.text
+        # "/oggi@CalvenzanoBot 3" -> "oggi"; i messaggi liberi (indirizzi) non vengono registrati
+        command = text.split()[0][1:].split('@')[0] if text.startswith('/') else ''
+        # "/" o "/@CalvenzanoBot" da soli non sono un comando
+        return command or 'text'
+    if update.callback_query:
+        return update.callback_query.data or 'callback'
+    if update.inline_query:
+        return 'inline'
+    return 'other'
+
+
+async def record_usage(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Record every update that got past the throttle, after the handlers have run."""
+    user = update.effective_user
+    event_log.record('command', update_kind(update), user.id if user else None, tenant_id=tenant_of(context).tenant_id)
+
+
+class UpdateThrottle:
+    """
+    Middleware run before every handler: drops duplicate updates and rate limits each user.
+
+    Registered as a TypeHandler in a group before the command handlers; rejected updates
+    stop the dispatch with ApplicationHandlerStop and never reach the database. Update ids are
+    only ordered within one bot, so each bot needs its own throttle.
+    """
+
+    def __init__(self, rate=THROTTLE_RATE, burst=THROTTLE_BURST,
+                 duplicate_window=DUPLICATE_WINDOW, max_users=MAX_TRACKED_USERS, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.duplicate_window = duplicate_window
+        self.max_users = max_users
+        self._clock = clock
+        self._buckets = collections.OrderedDict()
+        # Fingerprint -> istante di arrivo, in ordine di arrivo
+        self._recent = collections.OrderedDict()
+        self._last_update_id = -1
+        self.dropped_duplicates = 0
+        self.dropped_throttled = 0
+
+    def is_duplicate(self, update, now):
+        """True for a redelivered update or the same request repeated within the window."""
+        if update.update_id <= self._last_update_id:
+            return True
+        self._last_update_id = update.update_id
+
+        while self._recent:
+            _, seen = next(iter(self._recent.items()))
+            if now - seen < self.duplicate_window:
+                break
+            self._recent.popitem(last=False)
+
+        fingerprint = update_fingerprint(update)
+        if fingerprint is None:
+            return False
+        if fingerprint in self._recent:
+            return True
+        self._recent[fingerprint] = now
+        return False
+
+    def allow(self, user_id, now):
+        """Consume a token of the user's bucket; returns False when the user is over the limit."""
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = self._buckets[user_id] = TokenBucket(self.burst, now)
+            if len(self._buckets) > self.max_users:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(user_id)
+        return bucket.consume(self.rate, self.burst, now)
+
+    async def __call__(self, update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+        user = update.effective_user
+        # Le inline query non toccano il database e hanno una cache propria
+        if user is None or update.inline_query:
+            return
+
+        now = self._clock()
+
+        if self.is_duplicate(update, now):
+            self.dropped_duplicates += 1
+            event_log.record('duplicate', update_kind(update), user.id, tenant_id=tenant_of(context).tenant_id)
+            logger.debug(f"Update {update.update_id} duplicato dell'utente {user.id} ignorato")
+            if update.callback_query:
+                await update.callback_query.answer()
+            raise ApplicationHandlerStop
+
+        if self.allow(user.id, now):
+            self._buckets[user.id].warned = False
+            return
+
+        self.dropped_throttled += 1
+        event_log.record('throttled', update_kind(update), user.id, tenant_id=tenant_of(context).tenant_id)
+        bucket = self._buckets[user.id]
+        if update.callback_query:
+            await update.callback_query.answer()
+        elif update.message and not bucket.warned:
+            # Un solo avviso per raffica: gli altri messaggi vengono scartati in silenzio
+            bucket.warned = True
+            language = context.user_data.get('language') or resolve_language(user.language_code)
+            await update.message.reply_text(translate(language, "throttled"))
+        logger.info(f"Utente {user.id} limitato: update {update.update_id} scartato")
+        raise ApplicationHandlerStop
@@ -0,0 +1,313 @@
+# User-facing texts of the bot, one catalog per language.
+# Templates use str.format placeholders; "it" is the reference language and the fallback
+# for any key missing in the others.
+from config.waste_schedules import WASTE_INSTRUCTIONS, DAY_NAMES, MONTH_NAMES
+
+DEFAULT_LANGUAGE = "it"
+
+MESSAGES = {
+    "it": {
+        "language_name": "italiano",
+        "welcome": (
+            "Ciao {first_name}! 👋\n\n"
+            "Benvenuto al bot per la raccolta differenziata di {town}.\n\n"
+            "Questo bot ti invierà notifiche sui giorni di raccolta dei rifiuti in base al calendario {year} del Comune di {town}.\n\n"
+            "Usa i seguenti comandi:\n"
+            "/oggi - Verifica quali rifiuti raccolgono oggi\n"
+            "/domani - Verifica quali rifiuti raccolgono domani\n"
+            "/settimana - Calendario delle raccolte di questa settimana\n"
+            "/mese - Calendario delle raccolte di questo mese\n"
+            "/setNotifica - Imposta l'orario della notifica giornaliera\n"
+            "/setIndirizzo - Imposta il tuo indirizzo per i tessili\n"
+            "/digest - Ricevi un unico riepilogo per i prossimi giorni\n"
+            "/giornaliero - Ricevi una notifica ogni sera prima della raccolta\n"
+            "/rifiuti - Scegli i tipi di rifiuto da notificare\n"
+            "/lingua - Cambia la lingua dei messaggi\n"
+            "/info - Istruzioni per la raccolta differenziata\n"
+            "/stop - Disattiva le notifiche\n"
+            "/start - Riattiva le notifiche"
+        ),
+        "ask_time": "A che ora vuoi ricevere le notifiche per la raccolta rifiuti?",
+        "button_now": "Adesso",
+        "button_default": "20:00 (Default)",
+        "button_custom": "Personalizza",
+        "button_yes": "Sì",
+        "button_no": "No",
+        "time_set_ask_address": (
+            "Notifiche impostate per le {time}.\n\n"
+            "Vuoi impostare il tuo indirizzo per la raccolta dei tessili?"
+        ),
+        "time_set": "Notifiche impostate per le {time}.",
+        "ask_custom_time": "Per favore, invia l'orario in cui desideri ricevere le notifiche nel formato HH:MM (es. 19:30)",
+        "invalid_time": "Formato orario non valido. Per favore, usa il formato HH:MM (es. 19:30)",
+        "ask_address": "Vuoi impostare il tuo indirizzo per la raccolta dei tessili?",
+        "enter_address": "Per favore, invia il tuo indirizzo (via e numero civico)",
+        "enter_address_textiles": "Per favore, invia il tuo indirizzo (via e numero civico) per la raccolta dei tessili.",
+        "setup_complete": (
+            "Configurazione completata! Riceverai notifiche per la raccolta dei rifiuti.\n\n"
+            "Usa /oggi per verificare la raccolta di oggi o /domani per quella di domani."
+        ),
+        "address_set": (
+            "Indirizzo impostato: {address}\n\n"
+            "Configurazione completata! Riceverai notifiche per la raccolta dei rifiuti.\n\n"
+            "Usa /oggi per verificare la raccolta di oggi o /domani per quella di domani."
+        ),
+        "today_collections": (
+            "📅 Oggi, {date}, verranno raccolti:\n\n{waste_list}\n\n"
+            "Ricorda: posiziona i rifiuti in strada non prima delle ore 20:00 del giorno precedente."
+        ),
+        "today_empty": "📅 Oggi, {date}, non è prevista alcuna raccolta di rifiuti.",
+        "tomorrow_collections": (
+            "📅 Domani, {date}, verranno raccolti:\n\n{waste_list}\n\n"
+            "Ricorda: posiziona i rifiuti in strada non prima delle ore 20:00 di oggi."
+        ),
+        "tomorrow_empty": "📅 Domani, {date}, non è prevista alcuna raccolta di rifiuti.",
+        "date_collections": (
+            "📅 {date}, verranno raccolti:\n\n{waste_list}\n\n"
+            "Ricorda: posiziona i rifiuti in strada non prima delle ore 20:00 del giorno precedente."
+        ),
+        "date_empty": "📅 {date}, non è prevista alcuna raccolta di rifiuti.",
+        "inline_no_collection": "Nessuna raccolta prevista",
+        "period_collections": "📅 {title}:\n\n{day_list}",
+        "period_empty": "📅 {title}: non è prevista alcuna raccolta di rifiuti.",
+        "week_title": "Settimana dal {start} al {end}",
+        "month_title": "Raccolte di {month} {year}",
+        "info": (
+            "ℹ️ **ISTRUZIONI PER LA RACCOLTA DIFFERENZIATA**\n\n"
+            "{instructions}"
+            "{collection_centre}"
+        ),
+        # Orari e contatti del Comune di Calvenzano: gli altri comuni li definiscono nella propria configurazione
+        "collection_centre": (
+            "⏰ **ORARI CENTRO DI RACCOLTA**\n\n"
+            "**Dal 1° Aprile al 30 Settembre:**\n"
+            "- Martedì: 9.00 - 13.00\n"
+            "- Giovedì: 14.00 - 18.00\n"
+            "- Sabato: 9.00 - 12.00, 15.00 - 18.00\n\n"
+            "**Dal 1° Ottobre al 31 Marzo:**\n"
+            "- Martedì: 10.00 - 13.00\n"
+            "- Giovedì: 14.00 - 17.00\n"
+            "- Sabato: 10.00 - 13.00, 14.00 - 17.00\n\n"
+            "⚠️ **NOTA**: La raccolta dei rifiuti viene effettuata a partire dalle ore 5.00. "
+            "Posizionare i rifiuti in strada non prima delle ore 20.00 del giorno precedente.\n\n"
+            "Per segnalare disservizi: tel. 0363/860737"
+        ),
+        "notifications_stopped": "Notifiche disattivate. Usa /start per riattivarle.",
+        "notifications_restarted": "Notifiche riattivate. Riceverai informazioni sulla raccolta differenziata.",
+        "digest_invalid_days": "Numero di giorni non valido. Usa un valore tra {min_days} e {max_days} (es. /digest 3)",
+        "digest_enabled": (
+            "Riceverai un unico riepilogo delle raccolte dei prossimi {days} giorni. "
+            "Usa /giornaliero per tornare alla notifica di ogni sera."
+        ),
+        "daily_enabled": "Riceverai una notifica la sera prima di ogni raccolta.",
+        "waste_types_current": (
+            "Ricevi notifiche per:\n{waste_list}\n\n"
+            "Per cambiare usa ad esempio /rifiuti carta plastica, oppure /rifiuti tutti.\n"
+            "Tipi disponibili: {keywords}"
+        ),
+        "waste_types_all": "Riceverai notifiche per tutti i tipi di rifiuto.",
+        "waste_types_unknown": "Tipo di rifiuto non riconosciuto: {unknown}.\nTipi disponibili: {keywords}",
+        "waste_types_set": "Riceverai notifiche solo per:\n{waste_list}",
+        "language_current": "Lingua attuale: {name}.\nLingue disponibili: {languages} (es. /lingua en)",
+        "language_set": "Lingua impostata: {name}.",
+        "language_unknown": "Lingua non disponibile: {code}.\nLingue disponibili: {languages}",
+        "throttled": "Troppe richieste ravvicinate. Riprova tra qualche secondo.",
+        "schedule_reloaded": "Calendario aggiornato: {days} giorni di raccolta cambiati, {slots} orari di notifica ripianificati.",
+        "schedule_unchanged": "Il file del calendario non è cambiato.",
+        "schedule_reload_failed": "Calendario non aggiornato, resta in uso quello precedente:\n{error}",
+        "notification_daily": (
+            "📢 **PROMEMORIA RACCOLTA RIFIUTI**\n\n"
+            "Domani, {date}, verranno raccolti:\n\n{waste_list}\n\n"
+            "Ricorda: posiziona i rifiuti in strada non prima delle ore 20:00 di oggi."
+        ),
+        "notification_digest": (
+            "📢 **PROMEMORIA RACCOLTA RIFIUTI**\n\n"
+            "Raccolte dei prossimi {days} giorni:\n\n{day_list}\n\n"
+            "Ricorda: posiziona i rifiuti in strada non prima delle ore 20:00 del giorno precedente."
+        ),
+        "textile_note": (
+            "\n\n👕 **IMPORTANTE**: Domani è prevista la raccolta di tessili e indumenti usati. "
+            "Il tuo indirizzo registrato è: {address}. "
+            "Ricorda di segnalare via WhatsApp al 324 150 8217."
+        ),
+    },
+    "en": {
+        "language_name": "English",
+        "welcome": (
+            "Hi {first_name}! 👋\n\n"
+            "Welcome to the waste collection bot of {town}.\n\n"
+            "This bot will notify you about waste collection days according to the {year} calendar of the Municipality of {town}.\n\n"
+            "Available commands:\n"
+            "/oggi - Check which waste is collected today\n"
+            "/domani - Check which waste is collected tomorrow\n"
+            "/settimana - Collection calendar for this week\n"
+            "/mese - Collection calendar for this month\n"
+            "/setNotifica - Set the time of the daily notification\n"
+            "/setIndirizzo - Set your address for textile collection\n"
+            "/digest - Get a single summary for the next days\n"
+            "/giornaliero - Get a notification every evening before a collection\n"
+            "/rifiuti - Choose which waste types to be notified about\n"
+            "/lingua - Change the language of the messages\n"
+            "/info - Waste sorting instructions\n"
+            "/stop - Disable notifications\n"
+            "/start - Enable notifications again"
+        ),
+        "ask_time": "At what time do you want to receive waste collection notifications?",
+        "button_now": "Now",
+        "button_default": "20:00 (Default)",
+        "button_custom": "Custom",
+        "button_yes": "Yes",
+        "button_no": "No",
+        "time_set_ask_address": (
+            "Notifications set for {time}.\n\n"
+            "Do you want to set your address for textile collection?"
+        ),
+        "time_set": "Notifications set for {time}.",
+        "ask_custom_time": "Please send the time you want to receive notifications at, in HH:MM format (e.g. 19:30)",
+        "invalid_time": "Invalid time format. Please use the HH:MM format (e.g. 19:30)",
+        "ask_address": "Do you want to set your address for textile collection?",
+        "enter_address": "Please send your address (street and house number)",
+        "enter_address_textiles": "Please send your address (street and house number) for textile collection.",
+        "setup_complete": (
+            "Setup complete! You will receive waste collection notifications.\n\n"
+            "Use /oggi to check today's collection or /domani for tomorrow's."
+        ),
+        "address_set": (
+            "Address set: {address}\n\n"
+            "Setup complete! You will receive waste collection notifications.\n\n"
+            "Use /oggi to check today's collection or /domani for tomorrow's."
+        ),
+        "today_collections": (
+            "📅 Today, {date}, the following will be collected:\n\n{waste_list}\n\n"
+            "Remember: put your waste out no earlier than 20:00 of the previous day."
+        ),
+        "today_empty": "📅 Today, {date}, there is no waste collection.",
+        "tomorrow_collections": (
+            "📅 Tomorrow, {date}, the following will be collected:\n\n{waste_list}\n\n"
+            "Remember: put your waste out no earlier than 20:00 today."
+        ),
+        "tomorrow_empty": "📅 Tomorrow, {date}, there is no waste collection.",
+        "date_collections": (
+            "📅 {date}, the following will be collected:\n\n{waste_list}\n\n"
+            "Remember: put your waste out no earlier than 20:00 of the previous day."
+        ),
+        "date_empty": "📅 {date}, there is no waste collection.",
+        "inline_no_collection": "No collection",
+        "period_collections": "📅 {title}:\n\n{day_list}",
+        "period_empty": "📅 {title}: there is no waste collection.",
+        "week_title": "Week from {start} to {end}",
+        "month_title": "Collections in {month} {year}",
+        "info": (
+            "ℹ️ **WASTE SORTING INSTRUCTIONS**\n\n"
+            "{instructions}"
+            "{collection_centre}"
+        ),
+        "collection_centre": (
+            "⏰ **COLLECTION CENTRE OPENING HOURS**\n\n"
+            "**From 1 April to 30 September:**\n"
+            "- Tuesday: 9.00 - 13.00\n"
+            "- Thursday: 14.00 - 18.00\n"
+            "- Saturday: 9.00 - 12.00, 15.00 - 18.00\n\n"
+            "**From 1 October to 31 March:**\n"
+            "- Tuesday: 10.00 - 13.00\n"
+            "- Thursday: 14.00 - 17.00\n"
+            "- Saturday: 10.00 - 13.00, 14.00 - 17.00\n\n"
+            "⚠️ **NOTE**: Waste is collected starting from 5.00. "
+            "Do not put waste out before 20.00 of the previous day.\n\n"
+            "To report problems: tel. 0363/860737"
+        ),
+        "notifications_stopped": "Notifications disabled. Use /start to enable them again.",
+        "notifications_restarted": "Notifications enabled again. You will receive waste collection updates.",
+        "digest_invalid_days": "Invalid number of days. Use a value between {min_days} and {max_days} (e.g. /digest 3)",
+        "digest_enabled": (
+            "You will receive a single summary of the collections of the next {days} days. "
+            "Use /giornaliero to go back to a notification every evening."
+        ),
+        "daily_enabled": "You will receive a notification the evening before each collection.",
+        "waste_types_current": (
+            "You are notified about:\n{waste_list}\n\n"
+            "To change it use for example /rifiuti carta plastica, or /rifiuti tutti.\n"
+            "Available types: {keywords}"
+        ),
+        "waste_types_all": "You will be notified about all waste types.",
+        "waste_types_unknown": "Unknown waste type: {unknown}.\nAvailable types: {keywords}",
+        "waste_types_set": "You will only be notified about:\n{waste_list}",
+        "language_current": "Current language: {name}.\nAvailable languages: {languages} (e.g. /lingua it)",
+        "language_set": "Language set: {name}.",
+        "language_unknown": "Language not available: {code}.\nAvailable languages: {languages}",
+        "throttled": "Too many requests. Please try again in a few seconds.",
+        "schedule_reloaded": "Schedule updated: {days} collection days changed, {slots} notification times re-planned.",
+        "schedule_unchanged": "The schedule file has not changed.",
+        "schedule_reload_failed": "Schedule not updated, the previous one is still in use:\n{error}",
+        "notification_daily": (
+            "📢 **WASTE COLLECTION REMINDER**\n\n"
+            "Tomorrow, {date}, the following will be collected:\n\n{waste_list}\n\n"
+            "Remember: put your waste out no earlier than 20:00 today."
+        ),
+        "notification_digest": (
+            "📢 **WASTE COLLECTION REMINDER**\n\n"
+            "Collections of the next {days} days:\n\n{day_list}\n\n"
+            "Remember: put your waste out no earlier than 20:00 of the previous day."
+        ),
+        "textile_note": (
+            "\n\n👕 **IMPORTANT**: Used textiles and clothing are collected tomorrow. "
+            "Your registered address is: {address}. "
+            "Remember to report it via WhatsApp at 324 150 8217."
+        ),
+    },
+}
+
+DAY_NAMES_BY_LANGUAGE = {
+    "it": DAY_NAMES,
+    "en": {
+        0: "Monday",
+        1: "Tuesday",
+        2: "Wednesday",
+        3: "Thursday",
+        4: "Friday",
+        5: "Saturday",
+        6: "Sunday"
+    },
+}
+
+MONTH_NAMES_BY_LANGUAGE = {
+    "it": MONTH_NAMES,
+    "en": {
+        1: "January",
+        2: "February",
+        3: "March",
+        4: "April",
+        5: "May",
+        6: "June",
+        7: "July",
+        8: "August",
+        9: "September",
+        10: "October",
+        11: "November",
+        12: "December"
+    },
+}
+
+# Display names of the waste types (the Italian names are also the schedule keys)
+WASTE_NAMES_BY_LANGUAGE = {
+    "en": {
+        "CARTA E CARTONE": "PAPER AND CARDBOARD",
+        "INDIFFERENZIATO": "NON-RECYCLABLE WASTE",
+        "ORGANICO": "ORGANIC WASTE",
+        "PLASTICA": "PLASTIC",
+        "VETRO E BARATTOLAME": "GLASS AND CANS",
+        "TESSILI E INDUMENTI": "TEXTILES AND CLOTHING"
+    },
+}
+
+WASTE_INSTRUCTIONS_BY_LANGUAGE = {
+    "it": WASTE_INSTRUCTIONS,
+    "en": {
+        "CARTA E CARTONE": "📦 Put out in PAPER boxes or bags. Do not use plastic bags.",
+        "INDIFFERENZIATO": "🗑️ Put out in the dedicated transparent bags.",
+        "ORGANICO": "🥕 Put out in the MATER-BI (corn starch) bags, inside the bins provided.",
+        "PLASTICA": "♻️ Put out in the containers provided by the Municipality.",
+        "VETRO E BARATTOLAME": "🍾 Put out in the bins provided by the Municipality.",
+        "TESSILI E INDUMENTI": "👕 Report street and house number by calling or sending a WhatsApp message to 324 150 8217. Alternatively, use the container at the collection centre."
+    },
+}
@@ -1,5 +1,8 @@
 import os
+import io
 import logging
+import time
+import collections
 import psycopg2
 from psycopg2 import pool
 from dotenv import load_dotenv
@@ -10,22 +13,70 @@ logger = logging.getLogger(__name__)
 
 load_dotenv()
 
+ROLE_PRIMARY = 'primary'
+ROLE_REPLICA = 'replica'
+
+# Comune delle righe scritte senza indicarne uno (installazione a comune singolo)
+DEFAULT_TENANT_ID = 'calvenzano'
+
+# Ritardo massimo atteso della replica: per questo tempo dopo una scrittura l'utente si legge dal primario
+REPLICA_LAG_WINDOW = 5.0
+
+# Caratteri da proteggere nel formato testo di COPY, dove \N è NULL
+COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+def _copy_field(value):
+    """Campo del formato testo di COPY: None diventa NULL, la stringa vuota resta vuota."""
+    return '\\N' if value is None else str(value).translate(COPY_ESCAPES)
+
+class PoolMetrics:
+    """Contatori di utilizzo di un connection pool."""
+    
+    __slots__ = ('checkouts', 'in_use', 'peak_in_use', 'errors', 'fallbacks')
+    
+    def __init__(self):
+        self.checkouts = 0
+        self.in_use = 0
+        self.peak_in_use = 0
+        self.errors = 0
+        self.fallbacks = 0
+    
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
 class DatabaseManager:
     """
     Gestore della connessione al database PostgreSQL e delle operazioni CRUD per il bot Calvenzano.
     Utilizza connection pooling per una gestione efficiente delle connessioni multiple.
+    
+    Se è configurata una replica in lettura, le letture massive (orari e utenti da notificare)
+    vengono servite dalla replica e le scritture restano sul primario; un utente appena
+    modificato viene riletto dal primario finché la replica non può averlo ricevuto.
     """
     
-    def __init__(self, database_url=None):
+    def __init__(self, database_url=None, replica_url=None):
         """
         Inizializza il connection pool per PostgreSQL.
         
         Args:
             database_url (str, optional): URL di connessione al database PostgreSQL.
                                         Se non specificato, viene utilizzata la variabile d'ambiente DATABASE_URL.
+            replica_url (str, optional): URL di una replica in sola lettura.
+                                        Se non specificato, viene utilizzata la variabile d'ambiente DATABASE_REPLICA_URL;
+                                        senza replica tutte le query vanno al primario.
         """
         # Usa DATABASE_URL dall'ambiente se non fornito esplicitamente
         self.database_url = database_url or os.getenv("DATABASE_URL")
+        self.replica_url = replica_url or os.getenv("DATABASE_REPLICA_URL")
+        self.replica_pool = None
+        self.metrics = {ROLE_PRIMARY: PoolMetrics(), ROLE_REPLICA: PoolMetrics()}
+        # Ruolo di ogni connessione prestata, per restituirla al pool giusto
+        self._checked_out = {}
+        # (tenant_id, user_id) -> istante dell'ultima scrittura, in ordine di scrittura
+        self._recent_writes = collections.OrderedDict()
+        self._last_write = None
+        # Partizioni mensili di usage_events già create, (anno, mese)
+        self._event_partitions = set()
         
         if not self.database_url:
             logger.error("DATABASE_URL non configurato. Impossibile connettersi al database.")
@@ -43,6 +94,19 @@ class DatabaseManager:
             # Crea la tabella users se non esiste
             self._create_tables()
             
+            if self.replica_url:
+                try:
+                    self.replica_pool = psycopg2.pool.SimpleConnectionPool(
+                        minconn=1,
+                        maxconn=10,
+                        dsn=self.replica_url
+                    )
+                    logger.info("Connection pool della replica in lettura inizializzato con successo")
+                except psycopg2.Error as e:
+                    # Senza replica il bot funziona lo stesso: tutte le letture vanno al primario
+                    self.metrics[ROLE_REPLICA].errors += 1
+                    logger.warning(f"Replica in lettura non disponibile, uso solo il primario: {e}")
+            
         except Exception as e:
             logger.error(f"Errore nella creazione del connection pool: {e}")
             raise
@@ -51,73 +115,260 @@ class DatabaseManager:
         """Crea la tabella utenti se non esiste."""
         create_users_table_query = """
         CREATE TABLE IF NOT EXISTS users (
-            user_id BIGINT PRIMARY KEY,
+            tenant_id VARCHAR(32) NOT NULL DEFAULT 'calvenzano',
+            user_id BIGINT NOT NULL,
             username VARCHAR(255),
             first_name VARCHAR(255),
             last_name VARCHAR(255),
             address VARCHAR(255),
             notification_time TIME DEFAULT '20:00',
             notifications_enabled BOOLEAN DEFAULT TRUE,
+            delivery_mode VARCHAR(16) DEFAULT 'daily',
+            digest_days SMALLINT DEFAULT 3,
+            waste_mask INTEGER NOT NULL DEFAULT -1,
+            language VARCHAR(8) DEFAULT 'it',
             created_at TIMESTAMP DEFAULT NOW(),
-            updated_at TIMESTAMP DEFAULT NOW()
+            updated_at TIMESTAMP DEFAULT NOW(),
+            PRIMARY KEY (tenant_id, user_id)
         )
         """
         
-        with self._get_connection() as conn:
+        # Colonne aggiunte dopo la prima versione della tabella
+        migrate_users_table_queries = [
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS delivery_mode VARCHAR(16) DEFAULT 'daily'",
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS digest_days SMALLINT DEFAULT 3",
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS waste_mask INTEGER NOT NULL DEFAULT -1",
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS language VARCHAR(8) DEFAULT 'it'",
+            # Più comuni nella stessa tabella: lo stesso utente Telegram può usare i bot di più comuni
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS tenant_id VARCHAR(32) NOT NULL DEFAULT 'calvenzano'",
+            self._tenant_primary_key_query('users', 'tenant_id, user_id'),
+            "DROP INDEX IF EXISTS users_notification_slot_idx",
+            # Il filtro per comune, orario e tipo di rifiuto si risolve sull'indice, senza leggere le righe
+            "CREATE INDEX IF NOT EXISTS users_tenant_slot_idx ON users (tenant_id, notification_time, waste_mask) WHERE notifications_enabled",
+        ]
+        
+        # Destinatari di un invio interrotto dall'arresto del bot, da completare al riavvio
+        create_pending_notifications_table_query = """
+        CREATE TABLE IF NOT EXISTS pending_notifications (
+            tenant_id VARCHAR(32) NOT NULL DEFAULT 'calvenzano',
+            user_id BIGINT NOT NULL,
+            collection_date DATE NOT NULL,
+            created_at TIMESTAMP DEFAULT NOW(),
+            PRIMARY KEY (tenant_id, user_id, collection_date)
+        )
+        """
+        migrate_pending_notifications_table_queries = [
+            "ALTER TABLE pending_notifications ADD COLUMN IF NOT EXISTS tenant_id VARCHAR(32) NOT NULL DEFAULT 'calvenzano'",
+            self._tenant_primary_key_query('pending_notifications', 'tenant_id, user_id, collection_date'),
+        ]
+        
+        # Eventi di utilizzo, partizionati per mese: le partizioni vecchie si eliminano con un DROP
+        create_usage_events_table_query = """
+        CREATE TABLE IF NOT EXISTS usage_events (
+            created_at TIMESTAMPTZ NOT NULL,
+            tenant_id VARCHAR(32),
+            kind VARCHAR(32) NOT NULL,
+            name VARCHAR(64) NOT NULL,
+            user_id BIGINT,
+            detail TEXT
+        ) PARTITION BY RANGE (created_at)
+        """
+        
+        conn = self._get_connection()
+        try:
             with conn.cursor() as cursor:
                 cursor.execute(create_users_table_query)
+                for query in migrate_users_table_queries:
+                    cursor.execute(query)
+                cursor.execute(create_pending_notifications_table_query)
+                for query in migrate_pending_notifications_table_queries:
+                    cursor.execute(query)
+                cursor.execute(create_usage_events_table_query)
+                cursor.execute("ALTER TABLE usage_events ADD COLUMN IF NOT EXISTS tenant_id VARCHAR(32)")
                 conn.commit()
                 logger.info("Tabella 'users' verificata/creata con successo")
+        finally:
+            self._return_connection(conn)
     
-    def _get_connection(self):
+    @staticmethod
+    def _tenant_primary_key_query(table, columns):
+        """Query che porta la chiave primaria di una tabella a includere tenant_id, se non lo fa già."""
+        return f"""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM information_schema.key_column_usage
+                WHERE table_name = '{table}' AND constraint_name = '{table}_pkey' AND column_name = 'tenant_id'
+            ) THEN
+                ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_pkey;
+                ALTER TABLE {table} ADD PRIMARY KEY ({columns});
+            END IF;
+        END $$
+        """
+    
+    def _get_connection(self, role=ROLE_PRIMARY):
         """
         Ottiene una connessione dal pool.
         
+        Args:
+            role (str, optional): ROLE_REPLICA per una lettura che può essere servita dalla replica.
+                                  Senza replica, o se la replica non risponde, si usa il primario.
+        
         Returns:
             Connection: Una connessione al database dal pool.
         """
-        conn = self.connection_pool.getconn()
+        if role == ROLE_REPLICA and self.replica_pool is not None:
+            try:
+                conn = self.replica_pool.getconn()
+            except psycopg2.Error as e:
+                self.metrics[ROLE_REPLICA].errors += 1
+                self.metrics[ROLE_REPLICA].fallbacks += 1
+                logger.warning(f"Replica non disponibile, lettura dal primario: {e}")
+            else:
+                return self._check_out(conn, ROLE_REPLICA)
+        
+        try:
+            conn = self.connection_pool.getconn()
+        except psycopg2.Error:
+            self.metrics[ROLE_PRIMARY].errors += 1
+            raise
+        return self._check_out(conn, ROLE_PRIMARY)
+    
+    def _check_out(self, conn, role):
+        metrics = self.metrics[role]
+        metrics.checkouts += 1
+        metrics.in_use += 1
+        metrics.peak_in_use = max(metrics.peak_in_use, metrics.in_use)
+        self._checked_out[id(conn)] = role
         return conn
     
-    def _return_connection(self, conn):
+    def _return_connection(self, conn, close=False):
         """
         Restituisce una connessione al pool.
         
         Args:
             conn (Connection): La connessione da restituire al pool.
+            close (bool, optional): Chiude la connessione invece di riusarla (es. perché rotta).
         """
-        self.connection_pool.putconn(conn)
+        role = self._checked_out.pop(id(conn), ROLE_PRIMARY)
+        self.metrics[role].in_use -= 1
+        if role == ROLE_REPLICA:
+            self.replica_pool.putconn(conn, close=close)
+        elif close:
+            self.connection_pool.putconn(conn, close=True)
+        else:
+            self.connection_pool.putconn(conn)
     
-    def get_user(self, user_id):
+    def _read(self, role, read):
         """
-        Recupera i dati di un utente dal database.
+        Esegue una lettura sul ruolo indicato.
+        
+        Una connessione della replica può risultare rotta solo durante la query (replica
+        riavviata, rete caduta): in quel caso viene chiusa invece di tornare nel pool e la
+        lettura viene ripetuta una volta sul primario.
         
         Args:
-            user_id (int): ID Telegram dell'utente.
-            
+            role (str): Ruolo da cui leggere (vedi _read_role).
+            read (callable): Funzione che riceve il cursore e restituisce il risultato.
+        
         Returns:
-            dict: Dati dell'utente o None se non trovato.
+            Il risultato di read.
         """
-        query = "SELECT * FROM users WHERE user_id = %s"
+        conn = self._get_connection(role)
+        try:
+            with conn.cursor() as cursor:
+                return read(cursor)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+            if self._checked_out.get(id(conn)) != ROLE_REPLICA:
+                raise
+            self._return_connection(conn, close=True)
+            conn = None
+            self.metrics[ROLE_REPLICA].errors += 1
+            self.metrics[ROLE_REPLICA].fallbacks += 1
+            logger.warning(f"Connessione alla replica interrotta, lettura ripetuta sul primario: {e}")
+        finally:
+            if conn is not None:
+                self._return_connection(conn)
         
-        conn = self._get_connection()
+        conn = self._get_connection(ROLE_PRIMARY)
         try:
             with conn.cursor() as cursor:
-                cursor.execute(query, (user_id,))
-                result = cursor.fetchone()
-                
-                if result:
-                    columns = [desc[0] for desc in cursor.description]
-                    user_data = dict(zip(columns, result))
-                    # Converti il time in stringa HH:MM per compatibilità
-                    if user_data.get('notification_time') and hasattr(user_data['notification_time'], 'strftime'):
-                        user_data['notification_time'] = user_data['notification_time'].strftime('%H:%M')
-                    return user_data
-                return None
+                return read(cursor)
         finally:
             self._return_connection(conn)
     
-    def create_user(self, user_id, username=None, first_name=None, last_name=None):
+    def _record_write(self, user_id, tenant_id=DEFAULT_TENANT_ID):
+        """Ricorda la scrittura di un utente per rileggerlo dal primario (read-your-writes)."""
+        now = time.monotonic()
+        self._last_write = now
+        key = (tenant_id, user_id)
+        self._recent_writes.pop(key, None)
+        self._recent_writes[key] = now
+        # Le scritture più vecchie della finestra sono ormai visibili sulla replica
+        while self._recent_writes:
+            _, written = next(iter(self._recent_writes.items()))
+            if now - written < REPLICA_LAG_WINDOW:
+                break
+            self._recent_writes.popitem(last=False)
+    
+    def _read_role(self, user_id=None, tenant_id=DEFAULT_TENANT_ID):
+        """
+        Ruolo da cui leggere: la replica, salvo scritture recenti non ancora replicate.
+        
+        Args:
+            user_id (int, optional): Utente letto; senza utente conta qualsiasi scrittura recente.
+            tenant_id (str, optional): Comune dell'utente.
+        """
+        if self.replica_pool is None:
+            return ROLE_PRIMARY
+        
+        if user_id is None:
+            written = self._last_write
+        else:
+            written = self._recent_writes.get((tenant_id, user_id))
+        
+        if written is not None and time.monotonic() - written < REPLICA_LAG_WINDOW:
+            return ROLE_PRIMARY
+        return ROLE_REPLICA
+    
+    def pool_metrics(self):
+        """
+        Restituisce i contatori di utilizzo dei pool.
+        
+        Returns:
+            dict: Per ruolo ('primary', 'replica') checkouts, in_use, peak_in_use, errors e fallbacks.
+        """
+        return {role: metrics.as_dict() for role, metrics in self.metrics.items()}
+    
+    def get_user(self, user_id, tenant_id=DEFAULT_TENANT_ID):
+        """
+        Recupera i dati di un utente dal database.
+        
+        Args:
+            user_id (int): ID Telegram dell'utente.
+            tenant_id (str, optional): Comune del bot usato dall'utente.
+            
+        Returns:
+            dict: Dati dell'utente o None se non trovato.
+        """
+        query = "SELECT * FROM users WHERE tenant_id = %s AND user_id = %s"
+        
+        def read(cursor):
+            cursor.execute(query, (tenant_id, user_id))
+            result = cursor.fetchone()
+            
+            if result:
+                columns = [desc[0] for desc in cursor.description]
+                user_data = dict(zip(columns, result))
+                # Converti il time in stringa HH:MM per compatibilità
+                if user_data.get('notification_time') and hasattr(user_data['notification_time'], 'strftime'):
+                    user_data['notification_time'] = user_data['notification_time'].strftime('%H:%M')
+                return user_data
+            return None
+        
+        return self._read(self._read_role(user_id, tenant_id), read)
+    
+    def create_user(self, user_id, username=None, first_name=None, last_name=None, language='it', tenant_id=DEFAULT_TENANT_ID):
         """
         Crea un nuovo utente nel database.
         
@@ -126,33 +377,37 @@ class DatabaseManager:
             username (str, optional): Username Telegram.
             first_name (str, optional): Nome dell'utente.
             last_name (str, optional): Cognome dell'utente.
+            language (str, optional): Lingua dei messaggi.
+            tenant_id (str, optional): Comune del bot usato dall'utente.
             
         Returns:
             bool: True se l'utente è stato creato con successo.
         """
         query = """
-        INSERT INTO users (user_id, username, first_name, last_name)
-        VALUES (%s, %s, %s, %s)
-        ON CONFLICT (user_id) DO NOTHING
+        INSERT INTO users (tenant_id, user_id, username, first_name, last_name, language)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        ON CONFLICT (tenant_id, user_id) DO NOTHING
         RETURNING user_id
         """
         
         conn = self._get_connection()
         try:
             with conn.cursor() as cursor:
-                cursor.execute(query, (user_id, username, first_name, last_name))
+                cursor.execute(query, (tenant_id, user_id, username, first_name, last_name, language))
                 result = cursor.fetchone()
                 conn.commit()
+                self._record_write(user_id, tenant_id)
                 return result is not None
         finally:
             self._return_connection(conn)
     
-    def update_user(self, user_id, **kwargs):
+    def update_user(self, user_id, tenant_id=DEFAULT_TENANT_ID, **kwargs):
         """
         Aggiorna i dati di un utente.
         
         Args:
             user_id (int): ID Telegram dell'utente.
+            tenant_id (str, optional): Comune del bot usato dall'utente.
             **kwargs: Coppie chiave-valore dei campi da aggiornare.
             
         Returns:
@@ -169,13 +424,14 @@ class DatabaseManager:
         # Aggiungi sempre updated_at
         fields.append("updated_at = NOW()")
         
-        # Aggiungi l'ID utente alla lista dei valori
+        # Aggiungi comune e ID utente alla lista dei valori
+        values.append(tenant_id)
         values.append(user_id)
         
         query = f"""
         UPDATE users
         SET {', '.join(fields)}
-        WHERE user_id = %s
+        WHERE tenant_id = %s AND user_id = %s
         """
         
         conn = self._get_connection()
@@ -184,88 +440,316 @@ class DatabaseManager:
                 cursor.execute(query, values)
                 updated = cursor.rowcount > 0
                 conn.commit()
+                self._record_write(user_id, tenant_id)
                 return updated
         finally:
             self._return_connection(conn)
     
-    def set_address(self, user_id, address):
+    def set_address(self, user_id, address, tenant_id=DEFAULT_TENANT_ID):
         """
         Imposta l'indirizzo di un utente.
         
         Args:
             user_id (int): ID Telegram dell'utente.
             address (str): Indirizzo dell'utente.
+            tenant_id (str, optional): Comune del bot usato dall'utente.
             
         Returns:
             bool: True se l'indirizzo è stato aggiornato con successo.
         """
-        return self.update_user(user_id, address=address)
+        return self.update_user(user_id, tenant_id, address=address)
     
-    def set_notification_time(self, user_id, notification_time):
+    def set_notification_time(self, user_id, notification_time, tenant_id=DEFAULT_TENANT_ID):
         """
         Imposta l'orario di notifica di un utente.
         
         Args:
             user_id (int): ID Telegram dell'utente.
             notification_time (str): Orario di notifica nel formato HH:MM.
+            tenant_id (str, optional): Comune del bot usato dall'utente.
             
         Returns:
             bool: True se l'orario è stato aggiornato con successo.
         """
-        return self.update_user(user_id, notification_time=notification_time)
+        return self.update_user(user_id, tenant_id, notification_time=notification_time)
     
-    def set_notifications_enabled(self, user_id, enabled):
+    def set_notifications_enabled(self, user_id, enabled, tenant_id=DEFAULT_TENANT_ID):
         """
         Abilita o disabilita le notifiche per un utente.
         
         Args:
             user_id (int): ID Telegram dell'utente.
             enabled (bool): True per abilitare, False per disabilitare.
+            tenant_id (str, optional): Comune del bot usato dall'utente.
             
         Returns:
             bool: True se lo stato delle notifiche è stato aggiornato con successo.
         """
-        return self.update_user(user_id, notifications_enabled=enabled)
+        return self.update_user(user_id, tenant_id, notifications_enabled=enabled)
     
-    def get_all_users_for_notification(self):
+    def set_delivery_mode(self, user_id, delivery_mode, digest_days=None, tenant_id=DEFAULT_TENANT_ID):
         """
-        Recupera tutti gli utenti con notifiche abilitate.
+        Imposta la modalità di consegna delle notifiche di un utente.
         
+        Args:
+            user_id (int): ID Telegram dell'utente.
+            delivery_mode (str): 'daily' per un messaggio ogni sera, 'digest' per un riepilogo dei prossimi giorni.
+            digest_days (int, optional): Numero di giorni coperti dal riepilogo.
+            tenant_id (str, optional): Comune del bot usato dall'utente.
+            
         Returns:
-            list: Lista di dizionari contenenti i dati degli utenti.
+            bool: True se la modalità è stata aggiornata con successo.
+        """
+        if digest_days is None:
+            return self.update_user(user_id, tenant_id, delivery_mode=delivery_mode)
+        return self.update_user(user_id, tenant_id, delivery_mode=delivery_mode, digest_days=digest_days)
+    
+    def set_waste_mask(self, user_id, waste_mask, tenant_id=DEFAULT_TENANT_ID):
+        """
+        Imposta i tipi di rifiuto per cui l'utente vuole ricevere notifiche.
+        
+        Args:
+            user_id (int): ID Telegram dell'utente.
+            waste_mask (int): Bitmask dei tipi di rifiuto (bit del calendario compilato), -1 per tutti.
+            tenant_id (str, optional): Comune del bot usato dall'utente.
+            
+        Returns:
+            bool: True se i tipi di rifiuto sono stati aggiornati con successo.
+        """
+        return self.update_user(user_id, tenant_id, waste_mask=waste_mask)
+    
+    def set_language(self, user_id, language, tenant_id=DEFAULT_TENANT_ID):
+        """
+        Imposta la lingua dei messaggi di un utente.
+        
+        Args:
+            user_id (int): ID Telegram dell'utente.
+            language (str): Codice della lingua (es. 'it', 'en').
+            tenant_id (str, optional): Comune del bot usato dall'utente.
+            
+        Returns:
+            bool: True se la lingua è stata aggiornata con successo.
+        """
+        return self.update_user(user_id, tenant_id, language=language)
+    
+    def get_notification_slots(self, tenant_id=DEFAULT_TENANT_ID):
+        """
+        Recupera gli orari di notifica distinti degli utenti con notifiche abilitate.
+        
+        Args:
+            tenant_id (str, optional): Comune di cui leggere gli orari.
+        
+        Returns:
+            list: Orari nel formato HH:MM.
+        """
+        query = "SELECT DISTINCT notification_time FROM users WHERE tenant_id = %s AND notifications_enabled = TRUE"
+        
+        def read(cursor):
+            cursor.execute(query, (tenant_id,))
+            return [
+                slot.strftime('%H:%M') if hasattr(slot, 'strftime') else slot
+                for (slot,) in cursor.fetchall()
+                if slot is not None
+            ]
+        
+        # Subito dopo un cambio d'orario il nuovo slot potrebbe non essere ancora sulla replica
+        return self._read(self._read_role(), read)
+    
+    def get_users_for_slot(self, notification_time, collection_mask, tenant_id=DEFAULT_TENANT_ID):
+        """
+        Recupera gli utenti di un orario di notifica iscritti ad almeno un rifiuto raccolto.
+        
+        Args:
+            notification_time (str): Orario di notifica nel formato HH:MM.
+            collection_mask (int): Bitmask dei rifiuti raccolti il giorno notificato.
+            tenant_id (str, optional): Comune dello slot.
+            
+        Returns:
+            list: Lista di dizionari con i soli campi necessari all'invio.
+        """
+        query = """
+        SELECT user_id, address, delivery_mode, digest_days, waste_mask, language
+        FROM users
+        WHERE tenant_id = %s AND notifications_enabled = TRUE AND notification_time = %s AND waste_mask & %s <> 0
+        """
+        
+        def read(cursor):
+            cursor.execute(query, (tenant_id, notification_time, collection_mask))
+            columns = [desc[0] for desc in cursor.description]
+            return [dict(zip(columns, result)) for result in cursor.fetchall()]
+        
+        return self._read(ROLE_REPLICA, read)
+    
+    def save_pending_notifications(self, collection_date, user_ids, tenant_id=DEFAULT_TENANT_ID):
+        """
+        Salva i destinatari di un invio interrotto, da completare al prossimo avvio.
+        
+        Args:
+            collection_date (date): Giorno di raccolta notificato.
+            user_ids (list): ID Telegram degli utenti non ancora raggiunti.
+            tenant_id (str, optional): Comune degli utenti.
+            
+        Returns:
+            int: Numero di utenti salvati.
+        """
+        if not user_ids:
+            return 0
+        
+        query = """
+        INSERT INTO pending_notifications (tenant_id, user_id, collection_date)
+        VALUES (%s, %s, %s)
+        ON CONFLICT (tenant_id, user_id, collection_date) DO NOTHING
         """
-        query = "SELECT * FROM users WHERE notifications_enabled = TRUE"
         
         conn = self._get_connection()
         try:
             with conn.cursor() as cursor:
-                cursor.execute(query)
-                results = cursor.fetchall()
-                
-                if results:
-                    columns = [desc[0] for desc in cursor.description]
-                    users = []
-                    for result in results:
-                        user_data = dict(zip(columns, result))
-                        # Converti il time in stringa HH:MM per compatibilità
-                        if user_data.get('notification_time') and hasattr(user_data['notification_time'], 'strftime'):
-                            user_data['notification_time'] = user_data['notification_time'].strftime('%H:%M')
-                        users.append(user_data)
-                    return users
-                return []
+                cursor.executemany(query, [(tenant_id, user_id, collection_date) for user_id in user_ids])
+                conn.commit()
+                return len(user_ids)
         finally:
             self._return_connection(conn)
     
+    def take_pending_notifications(self, collection_date, tenant_id=DEFAULT_TENANT_ID):
+        """
+        Recupera e rimuove i destinatari salvati per un giorno di raccolta.
+        
+        I destinatari di giorni precedenti non sono più da avvisare e vengono scartati.
+        
+        Args:
+            collection_date (date): Giorno di raccolta da notificare.
+            tenant_id (str, optional): Comune degli utenti.
+            
+        Returns:
+            list: Lista di dizionari con gli stessi campi di get_users_for_slot.
+        """
+        delete_stale_query = "DELETE FROM pending_notifications WHERE tenant_id = %s AND collection_date < %s"
+        take_query = """
+        DELETE FROM pending_notifications p
+        USING users u
+        WHERE p.tenant_id = %s AND p.collection_date = %s
+          AND u.tenant_id = p.tenant_id AND u.user_id = p.user_id AND u.notifications_enabled = TRUE
+        RETURNING u.user_id, u.address, u.delivery_mode, u.digest_days, u.waste_mask, u.language
+        """
+        
+        conn = self._get_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(delete_stale_query, (tenant_id, collection_date))
+                cursor.execute(take_query, (tenant_id, collection_date))
+                columns = [desc[0] for desc in cursor.description]
+                users = [dict(zip(columns, result)) for result in cursor.fetchall()]
+                conn.commit()
+                return users
+        finally:
+            self._return_connection(conn)
+    
+    def copy_events(self, events):
+        """
+        Scrive un blocco di eventi di utilizzo con un solo COPY.
+        
+        Le partizioni mensili mancanti vengono create prima della copia.
+        
+        Args:
+            events (list): Tuple (created_at, tenant_id, kind, name, user_id, detail), created_at in UTC.
+            
+        Returns:
+            int: Numero di eventi scritti.
+        """
+        months = {(event[0].year, event[0].month) for event in events}
+        
+        # Formato testo e non CSV: in CSV una stringa vuota e NULL si scrivono allo stesso modo
+        buffer = io.StringIO("".join("\t".join(map(_copy_field, event)) + "\n" for event in events))
+        
+        conn = self._get_connection()
+        try:
+            with conn.cursor() as cursor:
+                for year, month in sorted(months - self._event_partitions):
+                    next_year, next_month = (year + 1, 1) if month == 12 else (year, month + 1)
+                    cursor.execute(
+                        f"CREATE TABLE IF NOT EXISTS usage_events_{year:04d}_{month:02d} "
+                        f"PARTITION OF usage_events "
+                        f"FOR VALUES FROM ('{year:04d}-{month:02d}-01 00:00+00') TO ('{next_year:04d}-{next_month:02d}-01 00:00+00')"
+                    )
+                cursor.copy_expert(
+                    "COPY usage_events (created_at, tenant_id, kind, name, user_id, detail) FROM STDIN WITH (FORMAT text)",
+                    buffer
+                )
+                conn.commit()
+            self._event_partitions |= months
+            return len(events)
+        except psycopg2.Error:
+            # La connessione torna al pool pulita, non in una transazione abortita
+            conn.rollback()
+            raise
+        finally:
+            self._return_connection(conn)
+    
+    def get_all_users_for_notification(self, tenant_id=DEFAULT_TENANT_ID):
+        """
+        Recupera tutti gli utenti con notifiche abilitate.
+        
+        Args:
+            tenant_id (str, optional): Comune degli utenti.
+        
+        Returns:
+            list: Lista di dizionari contenenti i dati degli utenti.
+        """
+        query = "SELECT * FROM users WHERE tenant_id = %s AND notifications_enabled = TRUE"
+        
+        def read(cursor):
+            cursor.execute(query, (tenant_id,))
+            results = cursor.fetchall()
+            
+            if results:
+                columns = [desc[0] for desc in cursor.description]
+                users = []
+                for result in results:
+                    user_data = dict(zip(columns, result))
+                    # Converti il time in stringa HH:MM per compatibilità
+                    if user_data.get('notification_time') and hasattr(user_data['notification_time'], 'strftime'):
+                        user_data['notification_time'] = user_data['notification_time'].strftime('%H:%M')
+                    users.append(user_data)
+                return users
+            return []
+        
+        return self._read(ROLE_REPLICA, read)
+    
     def close(self):
         """Chiude il connection pool."""
+        logger.info(f"Utilizzo dei connection pool: {self.pool_metrics()}")
         if hasattr(self, 'connection_pool'):
             self.connection_pool.closeall()
             logger.info("Connection pool PostgreSQL chiuso")
+        if self.replica_pool is not None:
+            self.replica_pool.closeall()
+            self.replica_pool = None
+            logger.info("Connection pool della replica chiuso")
+
+def open_database(database_url=None, replica_url=None):
+    """
+    Crea il database manager adatto all'URL configurato.
+    
+    Args:
+        database_url (str, optional): URL del database; se non specificato si usa DATABASE_URL.
+                                    Un URL sqlite:///percorso.db usa un file SQLite locale,
+                                    qualsiasi altro valore è un DSN PostgreSQL.
+        replica_url (str, optional): URL della replica in lettura (solo PostgreSQL).
+    
+    Returns:
+        DatabaseManager: Il database manager.
+    """
+    database_url = database_url or os.getenv("DATABASE_URL")
+    if database_url and database_url.startswith("sqlite:///"):
+        # Importato solo se usato: db_sqlite estende DatabaseManager
+        from db_sqlite import SQLiteDatabaseManager
+        return SQLiteDatabaseManager(database_url)
+    return DatabaseManager(database_url, replica_url)
 
 # Esempio di utilizzo
 if __name__ == "__main__":
     # Test di funzionamento
-    db = DatabaseManager()
+    db = open_database()
     
     # Crea un utente di test
     test_user_id = 12345
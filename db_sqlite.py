@@ -0,0 +1,277 @@
+import collections
+import datetime
+import functools
+import logging
+import sqlite3
+import threading
+from db_manager import DatabaseManager, PoolMetrics, ROLE_PRIMARY, ROLE_REPLICA, DEFAULT_TENANT_ID
+
+logger = logging.getLogger(__name__)
+
+SQLITE_URL_PREFIX = "sqlite:///"
+
+# Attesa massima di un lock tenuto da un altro processo (es. la shell sqlite3 aperta sul file)
+BUSY_TIMEOUT_MS = 5000
+
+# Le query sono poche e sempre le stesse: restano tutte preparate nella cache del modulo sqlite3
+CACHED_STATEMENTS = 128
+
+# Conversioni esplicite: gli adapter e i converter predefiniti di sqlite3 sono deprecati
+sqlite3.register_adapter(datetime.date, datetime.date.isoformat)
+sqlite3.register_adapter(datetime.datetime, lambda value: value.isoformat(" "))
+sqlite3.register_converter("BOOLEAN", lambda value: value != b"0")
+sqlite3.register_converter("DATE", lambda value: datetime.date.fromisoformat(value.decode()))
+sqlite3.register_converter("TIMESTAMP", lambda value: datetime.datetime.fromisoformat(value.decode()))
+
+
+def sqlite_path(database_url):
+    """
+    Percorso del file di un URL sqlite:///.
+
+    sqlite:///bot.db è relativo alla directory corrente, sqlite:////data/bot.db è assoluto,
+    sqlite:///:memory: è un database in memoria.
+    """
+    return database_url[len(SQLITE_URL_PREFIX):]
+
+
+@functools.lru_cache(maxsize=CACHED_STATEMENTS)
+def _qmark(query):
+    """Converte i segnaposto psycopg2 (%s) in quelli di sqlite3 (?)."""
+    return query.replace("%s", "?")
+
+
+class _Cursor:
+    """Cursore sqlite3 con l'interfaccia usata da DatabaseManager (context manager, segnaposto %s)."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self._cursor.close()
+
+    def execute(self, query, params=()):
+        self._cursor.execute(_qmark(query), params)
+
+    def executemany(self, query, seq_of_params):
+        self._cursor.executemany(_qmark(query), seq_of_params)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+class _Connection:
+    """Connessione sqlite3 che restituisce cursori _Cursor."""
+
+    def __init__(self, connection):
+        self._connection = connection
+
+    def cursor(self):
+        return _Cursor(self._connection.cursor())
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+class SQLiteDatabaseManager(DatabaseManager):
+    """
+    DatabaseManager su un file SQLite, per installazioni piccole e test di integrazione.
+
+    Stesso schema e stessi metodi della versione PostgreSQL: le query comuni sono condivise e
+    qui cambiano solo la connessione, la creazione delle tabelle e le due operazioni che
+    usano costrutti propri di PostgreSQL (DELETE ... USING e COPY). Il database è in modalità
+    WAL, così le letture esterne non bloccano il bot; la connessione è una sola, protetta da un
+    lock come un pool di dimensione uno.
+    """
+
+    def __init__(self, database_url):
+        """
+        Apre (o crea) il database SQLite.
+
+        Args:
+            database_url (str): URL nella forma sqlite:///percorso/del/file.db.
+        """
+        self.database_url = database_url
+        self.replica_url = None
+        self.replica_pool = None
+        self.metrics = {ROLE_PRIMARY: PoolMetrics(), ROLE_REPLICA: PoolMetrics()}
+        self._checked_out = {}
+        self._recent_writes = collections.OrderedDict()
+        self._last_write = None
+        self._lock = threading.RLock()
+
+        connection = sqlite3.connect(
+            sqlite_path(database_url),
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            cached_statements=CACHED_STATEMENTS,
+            check_same_thread=False
+        )
+        connection.create_function("NOW", 0, lambda: datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%d %H:%M:%S'))
+        journal_mode = connection.execute("PRAGMA journal_mode=WAL").fetchone()[0]
+        # In WAL basta sincronizzare ai checkpoint: un crash può perdere solo le ultime transazioni
+        connection.execute("PRAGMA synchronous=NORMAL")
+        connection.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+        self._connection = _Connection(connection)
+        logger.info(f"Database SQLite {sqlite_path(database_url)} aperto (journal_mode={journal_mode})")
+
+        self._create_tables()
+
+    def _create_tables(self):
+        """Crea le tabelle se non esistono."""
+        create_table_queries = [
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                tenant_id VARCHAR(32) NOT NULL DEFAULT 'calvenzano',
+                user_id BIGINT NOT NULL,
+                username VARCHAR(255),
+                first_name VARCHAR(255),
+                last_name VARCHAR(255),
+                address VARCHAR(255),
+                notification_time TIME DEFAULT '20:00',
+                notifications_enabled BOOLEAN DEFAULT TRUE,
+                delivery_mode VARCHAR(16) DEFAULT 'daily',
+                digest_days SMALLINT DEFAULT 3,
+                waste_mask INTEGER NOT NULL DEFAULT -1,
+                language VARCHAR(8) DEFAULT 'it',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (tenant_id, user_id)
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS users_tenant_slot_idx ON users (tenant_id, notification_time, waste_mask) WHERE notifications_enabled",
+            """
+            CREATE TABLE IF NOT EXISTS pending_notifications (
+                tenant_id VARCHAR(32) NOT NULL DEFAULT 'calvenzano',
+                user_id BIGINT NOT NULL,
+                collection_date DATE NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (tenant_id, user_id, collection_date)
+            )
+            """,
+            # Senza partizioni: su SQLite gli eventi vecchi si eliminano con un DELETE per data
+            """
+            CREATE TABLE IF NOT EXISTS usage_events (
+                created_at TIMESTAMP NOT NULL,
+                tenant_id VARCHAR(32),
+                kind VARCHAR(32) NOT NULL,
+                name VARCHAR(64) NOT NULL,
+                user_id BIGINT,
+                detail TEXT
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS usage_events_created_at_idx ON usage_events (created_at)",
+        ]
+
+        conn = self._get_connection()
+        try:
+            with conn.cursor() as cursor:
+                for query in create_table_queries:
+                    cursor.execute(query)
+                conn.commit()
+                logger.info("Tabelle SQLite verificate/create con successo")
+        finally:
+            self._return_connection(conn)
+
+    def _get_connection(self, role=ROLE_PRIMARY):
+        """
+        Ottiene l'unica connessione, in esclusiva fino a _return_connection.
+
+        Args:
+            role (str, optional): Ignorato: SQLite non ha repliche.
+
+        Returns:
+            Connection: La connessione al database.
+        """
+        self._lock.acquire()
+        return self._check_out(self._connection, ROLE_PRIMARY)
+
+    def _return_connection(self, conn, close=False):
+        """
+        Rilascia la connessione.
+
+        Args:
+            conn (Connection): La connessione ottenuta da _get_connection.
+            close (bool, optional): Ignorato: l'unica connessione resta aperta fino a close().
+        """
+        try:
+            self._checked_out.pop(id(conn), None)
+            self.metrics[ROLE_PRIMARY].in_use -= 1
+            # Una transazione ancora aperta qui è stata interrotta da un errore
+            if conn.in_transaction:
+                conn.rollback()
+        finally:
+            self._lock.release()
+
+    def take_pending_notifications(self, collection_date, tenant_id=DEFAULT_TENANT_ID):
+        """
+        Recupera e rimuove i destinatari salvati per un giorno di raccolta.
+
+        I destinatari di giorni precedenti non sono più da avvisare e vengono scartati.
+
+        Args:
+            collection_date (date): Giorno di raccolta da notificare.
+            tenant_id (str, optional): Comune degli utenti.
+
+        Returns:
+            list: Lista di dizionari con gli stessi campi di get_users_for_slot.
+        """
+        delete_stale_query = "DELETE FROM pending_notifications WHERE tenant_id = %s AND collection_date < %s"
+        # SQLite non ha DELETE ... USING: lettura e cancellazione nella stessa transazione
+        take_query = """
+        SELECT u.user_id, u.address, u.delivery_mode, u.digest_days, u.waste_mask, u.language
+        FROM pending_notifications p
+        JOIN users u ON u.tenant_id = p.tenant_id AND u.user_id = p.user_id
+        WHERE p.tenant_id = %s AND p.collection_date = %s AND u.notifications_enabled = TRUE
+        """
+        delete_taken_query = """
+        DELETE FROM pending_notifications
+        WHERE tenant_id = %s AND collection_date = %s AND user_id IN (
+            SELECT user_id FROM users WHERE tenant_id = %s AND notifications_enabled = TRUE
+        )
+        """
+
+        conn = self._get_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute(delete_stale_query, (tenant_id, collection_date))
+                cursor.execute(take_query, (tenant_id, collection_date))
+                columns = [desc[0] for desc in cursor.description]
+                users = [dict(zip(columns, result)) for result in cursor.fetchall()]
+                cursor.execute(delete_taken_query, (tenant_id, collection_date, tenant_id))
+                conn.commit()
+                return users
+        finally:
+            self._return_connection(conn)
+
+    def copy_events(self, events):
+        """
+        Scrive un blocco di eventi di utilizzo in una sola transazione.
+
+        Args:
+            events (list): Tuple (created_at, tenant_id, kind, name, user_id, detail), created_at in UTC.
+
+        Returns:
+            int: Numero di eventi scritti.
+        """
+        query = """
+        INSERT INTO usage_events (created_at, tenant_id, kind, name, user_id, detail)
+        VALUES (%s, %s, %s, %s, %s, %s)
+        """
+
+        conn = self._get_connection()
+        try:
+            with conn.cursor() as cursor:
+                cursor.executemany(query, events)
+                conn.commit()
+            return len(events)
+        finally:
+            self._return_connection(conn)
+
+    def close(self):
+        """Chiude il database, riportando il WAL nel file principale."""
+        logger.info(f"Utilizzo della connessione SQLite: {self.pool_metrics()[ROLE_PRIMARY]}")
+        with self._lock:
+            self._connection.close()
+        logger.info("Database SQLite chiuso")
@@ -1,17 +1,28 @@
+import asyncio
 import logging
 import os
-from telegram.ext import ApplicationBuilder, CommandHandler, CallbackQueryHandler, ConversationHandler, MessageHandler
+import signal
+from telegram import Update
+from telegram.ext import ApplicationBuilder, CommandHandler, CallbackQueryHandler, ConversationHandler, MessageHandler, InlineQueryHandler, TypeHandler, filters
 from dotenv import load_dotenv
 
+# Prima dei moduli del bot: alcuni leggono la configurazione all'import
+load_dotenv()
+
 from commands.handlers import (
     start, set_notification_time, handle_custom_time, set_address, handle_address_input, 
-    check_today, check_tomorrow, show_info, stop_notifications, restart_notifications, 
-    set_notification, set_address_command, SETTING_TIME, SETTING_ADDRESS
+    check_today, check_tomorrow, check_week, check_month, show_info, stop_notifications, restart_notifications, 
+    set_notification, set_address_command, set_digest_mode, set_daily_mode, set_waste_types, set_language,
+    reload_schedule_command,
+    SETTING_TIME, SETTING_ADDRESS
 )
-from logic.schedule import schedule_tomorrow_notification
-from db_manager import DatabaseManager
-
-load_dotenv()
+from commands.inline import inline_query
+from commands.middleware import UpdateThrottle, record_usage
+from service.schedule import db, schedule_tomorrow_notification, resume_pending_notifications, shutdown_notifications
+from service.ics import FeedServer, build_feeds
+from service.events import event_log
+from service.tenants import load_tenants
+from service.reload import ScheduleWatcher, reload_listeners
 
 # Enable logging
 logging.basicConfig(
@@ -20,16 +31,46 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Replace with your actual Telegram Bot token
-TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+# Porta HTTP del feed ICS (0 per disattivarlo)
+FEED_PORT = int(os.getenv("FEED_PORT", "80"))
 
-# Inizializza il database manager
-db = DatabaseManager(os.environ.get('DATABASE_URL'))
+async def start_feed_server(tenants):
+    """Serve the precomputed ICS feeds of every town alongside the bots."""
+    if not FEED_PORT:
+        return None
 
-def main() -> None:
-    """Start the bot."""
-    # Create the Application
-    application = ApplicationBuilder().token(TOKEN).build()
+    feeds = {}
+    for tenant in tenants:
+        feeds.update(build_feeds(tenant.calendar, tenant.year, tenant.town, tenant.feed_prefix))
+    feed_server = FeedServer(feeds, port=FEED_PORT)
+    try:
+        await feed_server.start()
+    except OSError as e:
+        logger.error(f"Impossibile avviare il feed ICS sulla porta {FEED_PORT}: {e}")
+        return None
+
+    # Un calendario ricaricato sostituisce i feed del suo comune
+    reload_listeners.append(lambda tenant: feed_server.replace_feeds(
+        build_feeds(tenant.calendar, tenant.year, tenant.town, tenant.feed_prefix), tenant.feed_prefix
+    ))
+    return feed_server
+
+async def drain_notifications() -> dict:
+    """Stop firing notification slots, let the sends in progress finish or checkpoint, flush the events."""
+    # I job queue sono già fermi e i bot ancora attivi: gli invii in corso possono completarsi
+    report = await shutdown_notifications()
+    # Poi le scritture bufferizzate, compresi gli eventi degli invii appena drenati
+    report['flushed_events'] = event_log.stop()
+    report['dropped_events'] = event_log.dropped
+    return report
+
+def build_application(tenant):
+    """Build the bot of a town: same handlers for every town, the tenant is kept in bot_data."""
+    application = ApplicationBuilder().token(tenant.token).build()
+    application.bot_data['tenant'] = tenant
+    
+    # Middleware: duplicati e utenti oltre il limite vengono fermati prima di qualsiasi handler
+    application.add_handler(TypeHandler(Update, UpdateThrottle()), group=-1)
     
     # Add conversation handler for setup
     conv_handler = ConversationHandler(
@@ -41,11 +82,11 @@ def main() -> None:
         states={
             SETTING_TIME: [
                 CallbackQueryHandler(set_notification_time, pattern="^(now|default|custom)$"),
-                MessageHandler(telegram.ext.filters.TEXT & ~telegram.ext.filters.COMMAND, handle_custom_time)
+                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_custom_time)
             ],
             SETTING_ADDRESS: [
                 CallbackQueryHandler(set_address, pattern="^(yes_address|no_address)$"),
-                MessageHandler(telegram.ext.filters.TEXT & ~telegram.ext.filters.COMMAND, handle_address_input)
+                MessageHandler(filters.TEXT & ~filters.COMMAND, handle_address_input)
             ]
         },
         fallbacks=[CommandHandler("start", start)]
@@ -56,22 +97,80 @@ def main() -> None:
     # Add command handlers
     application.add_handler(CommandHandler("oggi", check_today))
     application.add_handler(CommandHandler("domani", check_tomorrow))
+    application.add_handler(CommandHandler("settimana", check_week))
+    application.add_handler(CommandHandler("mese", check_month))
     application.add_handler(CommandHandler("info", show_info))
     application.add_handler(CommandHandler("stop", stop_notifications))
     application.add_handler(CommandHandler("restart", restart_notifications))
+    application.add_handler(CommandHandler("digest", set_digest_mode))
+    application.add_handler(CommandHandler("giornaliero", set_daily_mode))
+    application.add_handler(CommandHandler("rifiuti", set_waste_types))
+    application.add_handler(CommandHandler("lingua", set_language))
+    application.add_handler(CommandHandler("ricarica", reload_schedule_command))
 
-    # Start the Bot
+    # Inline mode: "@bot sabato" o "@bot 15/11" anche nei gruppi
+    application.add_handler(InlineQueryHandler(inline_query))
+
+    # Dopo gli handler: registra nel buffer eventi gli update che hanno superato il throttle
+    application.add_handler(TypeHandler(Update, record_usage), group=1)
+
+    # Schedule notifications for all users of the town when the bot starts
+    application.job_queue.run_once(schedule_tomorrow_notification, 0)
+    # Complete the broadcast interrupted by the previous shutdown, if any
+    application.job_queue.run_once(resume_pending_notifications, 0)
+
+    return application
+
+async def run(tenants) -> dict:
+    """
+    Run the bots of all towns in one event loop until SIGINT/SIGTERM.
+
+    The stop sequence follows Application.run_polling: updaters first, then the applications
+    (job queues), then the notification drain while the bots can still send, then shutdown.
+    Returns the shutdown report.
+    """
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stop_event.set)
+
+    applications = [build_application(tenant) for tenant in tenants]
+    event_log.start(db.copy_events)
+    feed_server = await start_feed_server(tenants)
+    # I file dei calendari modificati vengono ricaricati senza riavviare
+    schedule_watcher = ScheduleWatcher([(application.bot_data['tenant'], application.bot) for application in applications])
+    schedule_watcher.start()
+    started = []
+    try:
+        for application in applications:
+            await application.initialize()
+            started.append(application)
+            await application.updater.start_polling(timeout=60)
+            await application.start()
+        logger.info(f"Bot avviati per {len(applications)} comuni: {', '.join(t.tenant_id for t in tenants)}")
+        await stop_event.wait()
+    finally:
+        schedule_watcher.stop()
+        for application in started:
+            if application.updater.running:
+                await application.updater.stop()
+            if application.running:
+                await application.stop()
+        report = await drain_notifications()
+        for application in started:
+            await application.shutdown()
+        if feed_server:
+            await feed_server.stop()
+    return report
+
+def main() -> None:
+    """Start the bots of every configured town."""
+    tenants = load_tenants()
     try:
-        # Schedule notifications for all users when the bot starts
-        application.job_queue.run_once(
-            lambda context: schedule_tomorrow_notification(context),
-            0
-        )
-        
-        application.run_polling(timeout=60)
+        asyncio.run(run(tenants))
     finally:
-        # Make sure to close the database connection when the bot stops
+        # Gli invii sono già stati drenati: ora si possono chiudere tutti i pool
         db.close()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
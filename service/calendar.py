@@ -0,0 +1,293 @@
+import bisect
+import datetime
+import hashlib
+import json
+import logging
+import mmap
+import os
+import struct
+import tempfile
+from config.waste_schedules import SCHEDULE_FILE, SCHEDULE_YEAR, WASTE_EMOJI
+
+logger = logging.getLogger(__name__)
+
+# Calendari compilati, un file per contenuto: un calendario già visto si carica senza validarlo di nuovo
+SCHEDULE_CACHE_DIR = os.getenv("SCHEDULE_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "waste_bot_schedules")
+
+# Formato del calendario compilato: intestazione, nomi dei rifiuti, poi una bitmask per ogni
+# (mese, giorno) in posizione fissa, leggibile direttamente da un file mappato in memoria
+COMPILED_MAGIC = b"WBSC"
+COMPILED_VERSION = 2
+COMPILED_HEADER = struct.Struct("<4sHHH")
+COMPILED_NAME_LENGTH = struct.Struct("<B")
+COMPILED_MASKS = struct.Struct("<372I")
+
+# Bit di ogni tipo di rifiuto, gli stessi salvati in users.waste_mask: dipendono solo dall'ordine
+# di WASTE_EMOJI (i tipi nuovi vanno aggiunti in fondo), mai dall'ordine del file del calendario
+WASTE_BITS = {waste_type: 1 << i for i, waste_type in enumerate(WASTE_EMOJI)}
+
+
+class CollectionCalendar:
+    """Date-indexed view of a waste schedule, compiled once at import time."""
+
+    def __init__(self, schedule):
+        # Indice (mese, giorno) -> bitmask dei rifiuti raccolti in quel giorno
+        masks = {}
+        for waste_type, months in schedule.items():
+            for month, days in months.items():
+                for day in days:
+                    key = (month, day)
+                    masks[key] = masks.get(key, 0) | WASTE_BITS[waste_type]
+
+        self._index(schedule, masks)
+
+    @classmethod
+    def from_masks(cls, waste_types, masks):
+        """Build a calendar from its (month, day) -> bitmask index, as stored in a compiled schedule."""
+        calendar = cls.__new__(cls)
+        calendar._index(set(waste_types), masks)
+        return calendar
+
+    def _index(self, waste_types, masks):
+        # Tipi in ordine canonico, qualunque sia l'ordine in cui li elenca il file
+        self.waste_types = tuple(waste_type for waste_type in WASTE_BITS if waste_type in waste_types)
+        self.bits = {waste_type: WASTE_BITS[waste_type] for waste_type in self.waste_types}
+        self.all_mask = sum(self.bits.values())
+        self._masks = masks
+        # Hash del file da cui è stato caricato il calendario, se caricato da file
+        self.digest = None
+
+        # Le combinazioni possibili sono poche: precalcola le tuple una volta sola
+        self._types_by_mask = {mask: self._decode(mask) for mask in set(self._masks.values())}
+
+        # Giorni di raccolta ordinati, per trovare il prossimo con una ricerca binaria
+        self._collection_days = sorted(self._masks)
+
+    def _decode(self, mask):
+        """Return the waste types encoded in a bitmask, in canonical order."""
+        return tuple(waste_type for waste_type in self.waste_types if mask & self.bits[waste_type])
+
+    def mask_for(self, day, month):
+        """Return the bitmask of waste types collected on a day of a month."""
+        return self._masks.get((month, day), 0)
+
+    def mask_on(self, date):
+        """Return the bitmask of waste types collected on a date."""
+        return self._masks.get((date.month, date.day), 0)
+
+    def collections_on(self, date):
+        """Return the waste types collected on a date."""
+        return self.types_for_mask(self.mask_on(date))
+
+    def collections_between(self, start, end):
+        """Return (date, waste types) for every collection day from start to end inclusive."""
+        collections = []
+        date = start
+        while date <= end:
+            mask = self.mask_on(date)
+            if mask:
+                collections.append((date, self.types_for_mask(mask)))
+            date += datetime.timedelta(days=1)
+        return collections
+
+    def next_collection_day(self, start):
+        """Return the first collection day on or after start, or None if the schedule is empty."""
+        if not self._collection_days:
+            return None
+
+        index = bisect.bisect_left(self._collection_days, (start.month, start.day))
+        year = start.year
+        # Un 29 febbraio si salta negli anni non bisestili: entro otto anni ce n'è sempre uno
+        for _ in range(9):
+            while index < len(self._collection_days):
+                month, day = self._collection_days[index]
+                try:
+                    return datetime.date(year, month, day)
+                except ValueError:
+                    index += 1
+            # Il calendario non dipende dall'anno: si riparte da gennaio
+            index = 0
+            year += 1
+        return None
+
+    def types_for_mask(self, mask):
+        """Return the waste types encoded in a bitmask."""
+        types = self._types_by_mask.get(mask)
+        if types is None:
+            types = self._types_by_mask[mask] = self._decode(mask)
+        return types
+
+
+def changed_days(old, new):
+    """Return the sorted (month, day) pairs whose collected waste types differ between two calendars."""
+    return sorted(
+        key for key in set(old._masks) | set(new._masks)
+        if set(old.types_for_mask(old._masks.get(key, 0))) != set(new.types_for_mask(new._masks.get(key, 0)))
+    )
+
+
+def _parse_source(source, path):
+    """Decode a schedule file: YAML for .yaml/.yml files (if PyYAML is installed), JSON otherwise."""
+    if path.endswith((".yaml", ".yml")):
+        try:
+            import yaml
+        except ImportError as e:
+            raise ValueError(f"{path}: per i calendari YAML serve PyYAML (pip install pyyaml)") from e
+        try:
+            return yaml.safe_load(source)
+        except yaml.YAMLError as e:
+            raise ValueError(f"{path}: YAML non valido: {e}") from e
+
+    try:
+        return json.loads(source)
+    except (UnicodeDecodeError, json.JSONDecodeError) as e:
+        raise ValueError(f"{path}: JSON non valido: {e}") from e
+
+
+def parse_schedule(source, path, year):
+    """
+    Validate the content of a schedule file and return it shaped like {waste type: {month: [days]}}.
+
+    Months are object keys ("1".."12"); keys starting with "_" are notes and are ignored. Every
+    waste type must be one the bot has an emoji and instructions for, and every day must exist
+    in the given year.
+
+    Raises:
+        ValueError: if the content does not describe a valid schedule.
+    """
+    raw = _parse_source(source, path)
+
+    if not isinstance(raw, dict):
+        raise ValueError(f"{path}: il calendario deve essere un oggetto")
+
+    schedule = {}
+    for waste_type, months in raw.items():
+        if not isinstance(waste_type, str):
+            raise ValueError(f"{path}: il tipo di rifiuto {waste_type!r} deve essere una stringa")
+        if waste_type.startswith("_"):
+            continue
+        if waste_type not in WASTE_EMOJI:
+            raise ValueError(f"{path}: tipo di rifiuto sconosciuto '{waste_type}'")
+        if not isinstance(months, dict):
+            raise ValueError(f"{path}: i mesi di '{waste_type}' devono essere un oggetto")
+        schedule[waste_type] = {}
+        for month, days in months.items():
+            # Una stringa "15" verrebbe letta carattere per carattere come i giorni 1 e 5
+            if not isinstance(days, list):
+                raise ValueError(f"{path}: i giorni di '{waste_type}' nel mese {month} devono essere una lista")
+            try:
+                month_number = int(month)
+                schedule[waste_type][month_number] = sorted({int(day) for day in days})
+                for day in schedule[waste_type][month_number]:
+                    datetime.date(year, month_number, day)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"{path}: data non valida per '{waste_type}' nel mese {month}: {e}") from e
+    return schedule
+
+
+def load_schedule(path, year):
+    """
+    Load and validate a schedule file (see parse_schedule).
+
+    Raises:
+        ValueError: if the file does not describe a valid schedule.
+    """
+    with open(path, "rb") as schedule_file:
+        return parse_schedule(schedule_file.read(), path, year)
+
+
+def compile_calendar(calendar):
+    """Serialize a calendar into the compiled binary format."""
+    names = b"".join(
+        COMPILED_NAME_LENGTH.pack(len(encoded)) + encoded
+        for encoded in (waste_type.encode("utf-8") for waste_type in calendar.waste_types)
+    )
+    masks = [0] * 372
+    for (month, day), mask in calendar._masks.items():
+        masks[(month - 1) * 31 + day - 1] = mask
+    return (
+        COMPILED_HEADER.pack(COMPILED_MAGIC, COMPILED_VERSION, len(calendar.waste_types), 0)
+        + names + COMPILED_MASKS.pack(*masks)
+    )
+
+
+def read_compiled(buffer):
+    """
+    Build a calendar from a compiled schedule (bytes or a memory-mapped file).
+
+    Raises:
+        ValueError: if the buffer is not a compiled schedule of this version.
+    """
+    try:
+        magic, version, type_count, _ = COMPILED_HEADER.unpack_from(buffer, 0)
+        if magic != COMPILED_MAGIC or version != COMPILED_VERSION:
+            raise ValueError("intestazione del calendario compilato non valida")
+
+        offset = COMPILED_HEADER.size
+        waste_types = []
+        for _ in range(type_count):
+            (length,) = COMPILED_NAME_LENGTH.unpack_from(buffer, offset)
+            offset += COMPILED_NAME_LENGTH.size
+            waste_types.append(bytes(buffer[offset:offset + length]).decode("utf-8"))
+            offset += length
+
+        masks = COMPILED_MASKS.unpack_from(buffer, offset)
+    except (struct.error, UnicodeDecodeError) as e:
+        raise ValueError(f"calendario compilato troncato o corrotto: {e}") from e
+
+    return CollectionCalendar.from_masks(waste_types, {
+        (index // 31 + 1, index % 31 + 1): mask for index, mask in enumerate(masks) if mask
+    })
+
+
+def schedule_digest(source, year):
+    """Content hash identifying a compiled schedule: file content, year, format and waste type bits."""
+    digest = hashlib.sha256(source)
+    digest.update(f"|{year}|{COMPILED_VERSION}|{','.join(WASTE_BITS)}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_calendar(path, year, cache_dir=SCHEDULE_CACHE_DIR):
+    """
+    Load the calendar of a schedule file, through the compiled cache.
+
+    The cache is keyed by the content hash, so an edited file is always validated again
+    while an unchanged one is read straight from its memory-mapped compiled form. A cache
+    that cannot be read or written only costs the validation.
+
+    Raises:
+        ValueError: if the file does not describe a valid schedule.
+    """
+    with open(path, "rb") as schedule_file:
+        source = schedule_file.read()
+    digest = schedule_digest(source, year)
+    cache_path = os.path.join(cache_dir, f"{digest[:32]}.bin") if cache_dir else None
+
+    if cache_path and os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as cache_file, mmap.mmap(cache_file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                calendar = read_compiled(buffer)
+            calendar.digest = digest
+            return calendar
+        except (OSError, ValueError) as e:
+            logger.warning(f"Calendario compilato {cache_path} non leggibile, lo ricompilo: {e}")
+
+    calendar = CollectionCalendar(parse_schedule(source, path, year))
+    calendar.digest = digest
+
+    if cache_path:
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            # Scrittura atomica: un altro processo vede il file vecchio o quello completo
+            fd, temporary_path = tempfile.mkstemp(dir=cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "wb") as cache_file:
+                cache_file.write(compile_calendar(calendar))
+            os.replace(temporary_path, cache_path)
+        except OSError as e:
+            logger.warning(f"Impossibile salvare il calendario compilato in {cache_dir}: {e}")
+
+    return calendar
+
+
+# Calendario compilato della raccolta di Calvenzano
+CALENDAR = load_calendar(SCHEDULE_FILE, SCHEDULE_YEAR)
@@ -0,0 +1,102 @@
+import datetime
+import functools
+from typing import NamedTuple
+from config.messages import DEFAULT_LANGUAGE
+from service.calendar import CALENDAR
+from service.i18n import translate, format_date, format_waste_list
+
+# Modalità di consegna delle notifiche
+DELIVERY_DAILY = 'daily'
+DELIVERY_DIGEST = 'digest'
+DELIVERY_MODES = (DELIVERY_DAILY, DELIVERY_DIGEST)
+
+DEFAULT_DIGEST_DAYS = 3
+MIN_DIGEST_DAYS = 2
+MAX_DIGEST_DAYS = 7
+
+ALL_WASTE_MASK = CALENDAR.all_mask
+
+TEXTILE_WASTE = "TESSILI E INDUMENTI"
+
+
+class DeliveryPreference(NamedTuple):
+    """How a user wants to be notified; hashable so it can key precomputed messages."""
+    mode: str = DELIVERY_DAILY
+    digest_days: int = DEFAULT_DIGEST_DAYS
+    waste_mask: int = ALL_WASTE_MASK
+
+
+def preference_for(user, calendar=CALENDAR):
+    """Build the delivery preference of a user row for the calendar of its town."""
+    # -1 sul database significa "tutti i rifiuti", anche quelli aggiunti in futuro
+    all_mask = calendar.all_mask
+    waste_mask = user.get('waste_mask')
+    # Un filtro sui soli rifiuti che il comune non raccoglie più resta vuoto, non diventa "tutti"
+    waste_mask = all_mask if waste_mask is None or waste_mask == -1 else waste_mask & all_mask
+
+    mode = user.get('delivery_mode') or DELIVERY_DAILY
+    if mode != DELIVERY_DIGEST:
+        # Per la modalità giornaliera i giorni del digest sono irrilevanti: stessa chiave per tutti
+        return DeliveryPreference(DELIVERY_DAILY, DEFAULT_DIGEST_DAYS, waste_mask)
+    digest_days = min(max(user.get('digest_days') or DEFAULT_DIGEST_DAYS, MIN_DIGEST_DAYS), MAX_DIGEST_DAYS)
+    return DeliveryPreference(DELIVERY_DIGEST, digest_days, waste_mask)
+
+
+@functools.lru_cache(maxsize=64)
+def digest_start_days(waste_mask, digest_days, year, calendar=CALENDAR):
+    """
+    Dates on which a digest starts for a preference.
+
+    Each digest covers digest_days days starting from a collection day; the next one
+    starts on the first collection day after the window, so no day is announced twice.
+    """
+    starts = set()
+    date = datetime.date(year, 1, 1)
+    end = datetime.date(year, 12, 31)
+    while date <= end:
+        if calendar.mask_on(date) & waste_mask:
+            starts.add(date)
+            date += datetime.timedelta(days=digest_days)
+        else:
+            date += datetime.timedelta(days=1)
+    return frozenset(starts)
+
+
+@functools.lru_cache(maxsize=512)
+def build_notification(tomorrow, preference, language=DEFAULT_LANGUAGE, calendar=CALENDAR):
+    """
+    Render the reminder sent the evening before a date for a preference and a language.
+
+    Returns:
+        tuple: (message, waste types collected tomorrow) or (None, ()) when nothing must be sent.
+    """
+    tomorrow_types = calendar.types_for_mask(calendar.mask_on(tomorrow) & preference.waste_mask)
+
+    if preference.mode == DELIVERY_DIGEST:
+        if tomorrow not in digest_start_days(preference.waste_mask, preference.digest_days, tomorrow.year, calendar):
+            return None, ()
+
+        days = []
+        for offset in range(preference.digest_days):
+            date = tomorrow + datetime.timedelta(days=offset)
+            waste_types = calendar.types_for_mask(calendar.mask_on(date) & preference.waste_mask)
+            if waste_types:
+                days.append(f"**{format_date(language, date)}**\n" + format_waste_list(language, waste_types))
+
+        message = translate(language, "notification_digest", days=preference.digest_days, day_list="\n\n".join(days))
+        return message, tomorrow_types
+
+    if not tomorrow_types:
+        return None, ()
+
+    message = translate(
+        language, "notification_daily",
+        date=format_date(language, tomorrow),
+        waste_list=format_waste_list(language, tomorrow_types, bold=True)
+    )
+    return message, tomorrow_types
+
+
+def textile_note(address, language=DEFAULT_LANGUAGE):
+    """Per-user note appended when textiles are collected tomorrow."""
+    return translate(language, "textile_note", address=address)
@@ -0,0 +1,126 @@
+import asyncio
+import collections
+import datetime
+import logging
+import os
+import pytz
+
+logger = logging.getLogger(__name__)
+
+# Gli eventi vengono scritti a blocchi: ogni N secondi o appena se ne accumulano M
+EVENT_FLUSH_INTERVAL = float(os.getenv("EVENT_FLUSH_INTERVAL", "30"))
+EVENT_FLUSH_SIZE = int(os.getenv("EVENT_FLUSH_SIZE", "500"))
+
+# Memoria massima del buffer: oltre, gli eventi più vecchi vengono scartati e contati
+EVENT_BUFFER_SIZE = int(os.getenv("EVENT_BUFFER_SIZE", "10000"))
+
+MAX_NAME_LENGTH = 64
+
+
+class EventLog:
+    """
+    Usage events kept in a bounded ring buffer and written in batches.
+
+    Recording never touches the database: events are appended to the buffer and a writer
+    (DatabaseManager.copy_events) receives them in blocks. When the database cannot keep up
+    the buffer overwrites its oldest events and counts them as dropped.
+    """
+
+    def __init__(self, capacity=EVENT_BUFFER_SIZE, flush_interval=EVENT_FLUSH_INTERVAL, flush_size=EVENT_FLUSH_SIZE):
+        self.flush_interval = flush_interval
+        self.flush_size = flush_size
+        self._buffer = collections.deque(maxlen=capacity)
+        self._writer = None
+        self._task = None
+        self._flush_scheduled = False
+        # Dopo una scrittura fallita si riprova solo allo scadere dell'intervallo, non a ogni evento
+        self._paused = False
+        self.recorded = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.flush_failures = 0
+
+    def __len__(self):
+        return len(self._buffer)
+
+    def record(self, kind, name, user_id=None, detail=None, tenant_id=None):
+        """
+        Append an event to the buffer; a full buffer triggers a flush on the running loop.
+
+        After a failed flush only the periodic flush retries, so a database outage costs one
+        attempt per interval instead of one per recorded event.
+        """
+        if len(self._buffer) == self._buffer.maxlen:
+            self.dropped += 1
+        # usage_events.name è NOT NULL: un nome vuoto farebbe fallire l'intero blocco
+        name = str(name)[:MAX_NAME_LENGTH] or 'other'
+        self._buffer.append((datetime.datetime.now(pytz.utc), tenant_id, kind, name, user_id, detail))
+        self.recorded += 1
+
+        if (len(self._buffer) >= self.flush_size and self._writer is not None
+                and not self._flush_scheduled and not self._paused):
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            self._flush_scheduled = True
+            loop.call_soon(self.flush)
+
+    def flush(self):
+        """Write the buffered events; on failure they go back to the buffer. Returns the number written."""
+        self._flush_scheduled = False
+        if not self._buffer or self._writer is None:
+            return 0
+
+        events = list(self._buffer)
+        self._buffer.clear()
+        try:
+            self._writer(events)
+        except Exception as e:
+            self.flush_failures += 1
+            self._paused = True
+            # Gli eventi tornano in testa al buffer, nei limiti della sua capacità
+            space = self._buffer.maxlen - len(self._buffer)
+            kept = events[-space:] if space else []
+            self.dropped += len(events) - len(kept)
+            self._buffer.extendleft(reversed(kept))
+            logger.warning(f"Scrittura di {len(events)} eventi fallita, {len(kept)} rimessi in coda: {e}")
+            return 0
+
+        self._paused = False
+        self.flushed += len(events)
+        return len(events)
+
+    def start(self, writer):
+        """Start flushing periodically through writer(events) on the running loop."""
+        self._writer = writer
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        """Stop the periodic flush and write what is still buffered. Returns the number written."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        written = self.flush()
+        logger.info(f"Registro eventi chiuso: {self.stats()}")
+        return written
+
+    def stats(self):
+        """Counters of the event log."""
+        return {
+            'recorded': self.recorded,
+            'flushed': self.flushed,
+            'dropped': self.dropped,
+            'flush_failures': self.flush_failures,
+            'buffered': len(self._buffer),
+        }
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            self.flush()
+
+
+# Registro condiviso da handler e scheduler; il writer viene collegato all'avvio
+event_log = EventLog()
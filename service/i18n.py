@@ -0,0 +1,90 @@
+import functools
+import logging
+import string
+from config.waste_schedules import WASTE_EMOJI
+from config.messages import (
+    MESSAGES, DEFAULT_LANGUAGE, DAY_NAMES_BY_LANGUAGE, MONTH_NAMES_BY_LANGUAGE,
+    WASTE_NAMES_BY_LANGUAGE, WASTE_INSTRUCTIONS_BY_LANGUAGE
+)
+
+logger = logging.getLogger(__name__)
+
+
+def _fields(template):
+    return {name for _, name, _, _ in string.Formatter().parse(template) if name}
+
+
+class Catalog:
+    """Message templates compiled once per language into ready-to-call formatters."""
+
+    def __init__(self, messages, default_language=DEFAULT_LANGUAGE):
+        self.default_language = default_language
+        reference = messages[default_language]
+
+        self._formatters = {}
+        for language, templates in messages.items():
+            compiled = {}
+            for key, default_template in reference.items():
+                template = templates.get(key, default_template)
+                fields = _fields(template)
+                if fields != _fields(default_template):
+                    # Un segnaposto sbagliato non deve far fallire l'invio: si usa il testo di riferimento
+                    logger.warning(f"Segnaposto non validi per '{key}' in '{language}', uso '{default_language}'")
+                    template = default_template
+                    fields = _fields(template)
+                # I testi senza segnaposto non hanno bisogno di essere formattati
+                compiled[key] = template.format if fields else (lambda text=template, **_: text)
+            self._formatters[language] = compiled
+
+        self.languages = tuple(self._formatters)
+
+    def render(self, language, key, **values):
+        """Render a message in a language, falling back to the default language."""
+        formatters = self._formatters.get(language) or self._formatters[self.default_language]
+        return formatters[key](**values)
+
+
+CATALOG = Catalog(MESSAGES)
+
+
+def translate(language, key, **values):
+    """Render a message of the catalog."""
+    return CATALOG.render(language, key, **values)
+
+
+def resolve_language(code):
+    """Map a Telegram language_code such as "en-GB" to a supported language."""
+    if isinstance(code, str):
+        language = code.split('-')[0].lower()
+        if language in CATALOG.languages:
+            return language
+    return DEFAULT_LANGUAGE
+
+
+def day_name(language, weekday):
+    return DAY_NAMES_BY_LANGUAGE.get(language, DAY_NAMES_BY_LANGUAGE[DEFAULT_LANGUAGE])[weekday]
+
+
+def month_name(language, month):
+    return MONTH_NAMES_BY_LANGUAGE.get(language, MONTH_NAMES_BY_LANGUAGE[DEFAULT_LANGUAGE])[month]
+
+
+def waste_name(language, waste_type):
+    return WASTE_NAMES_BY_LANGUAGE.get(language, {}).get(waste_type, waste_type)
+
+
+def waste_instruction(language, waste_type):
+    return WASTE_INSTRUCTIONS_BY_LANGUAGE.get(language, WASTE_INSTRUCTIONS_BY_LANGUAGE[DEFAULT_LANGUAGE])[waste_type]
+
+
+@functools.lru_cache(maxsize=1024)
+def format_date(language, date):
+    """Format a date as "Sabato 1 Marzo" in the given language."""
+    return f"{day_name(language, date.weekday())} {date.day} {month_name(language, date.month)}"
+
+
+def format_waste_list(language, waste_types, bold=False):
+    """One "emoji name" line per waste type."""
+    if bold:
+        return "\n".join([f"{WASTE_EMOJI[waste_type]} **{waste_name(language, waste_type)}**" for waste_type in waste_types])
+    return "\n".join([f"{WASTE_EMOJI[waste_type]} {waste_name(language, waste_type)}" for waste_type in waste_types])
@@ -0,0 +1,199 @@
+import asyncio
+import datetime
+import gzip
+import hashlib
+import logging
+import re
+from config.waste_schedules import WASTE_INSTRUCTIONS, WASTE_EMOJI, SCHEDULE_YEAR
+from service.calendar import CALENDAR
+
+logger = logging.getLogger(__name__)
+
+# I client calendario interrogano il feed periodicamente: i corpi cambiano solo quando si ricarica il calendario
+COMBINED_FEED_PATH = "/calendar.ics"
+FEED_PATH_PREFIX = "/calendar/"
+READ_TIMEOUT = 10
+MAX_HEADER_LINES = 100
+
+
+def slugify(waste_type):
+    """Turn a waste type name into a URL path segment ("CARTA E CARTONE" -> "carta-e-cartone")."""
+    return re.sub(r"[^a-z0-9]+", "-", waste_type.lower()).strip("-")
+
+
+def _escape(text):
+    """Escape a TEXT value as required by RFC 5545."""
+    return (
+        text.replace("\\", "\\\\").replace(";", "\\;").replace(",", "\\,").replace("\n", "\\n")
+    )
+
+
+def _fold(line):
+    """Fold a content line to at most 75 octets per physical line."""
+    encoded = line.encode("utf-8")
+    if len(encoded) <= 75:
+        return line
+
+    parts = []
+    current = ""
+    limit = 75
+    for char in line:
+        if len((current + char).encode("utf-8")) > limit:
+            parts.append(current)
+            current = ""
+            limit = 74  # la riga di continuazione inizia con uno spazio
+        current += char
+    parts.append(current)
+    return "\r\n ".join(parts)
+
+
+def build_ics(waste_types, name, year=SCHEDULE_YEAR, calendar=CALENDAR):
+    """Build an iCalendar document with one all-day event per collection of the given waste types."""
+    dtstamp = f"{year}0101T000000Z"
+    lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//waste_bot//Raccolta differenziata Calvenzano//IT",
+        "CALSCALE:GREGORIAN",
+        "METHOD:PUBLISH",
+        f"X-WR-CALNAME:{_escape(name)}",
+        "X-WR-TIMEZONE:Europe/Rome",
+    ]
+
+    collections = calendar.collections_between(datetime.date(year, 1, 1), datetime.date(year, 12, 31))
+    for date, collected in collections:
+        for waste_type in collected:
+            if waste_type not in waste_types:
+                continue
+            lines += [
+                "BEGIN:VEVENT",
+                f"UID:{date:%Y%m%d}-{slugify(waste_type)}@waste_bot",
+                f"DTSTAMP:{dtstamp}",
+                f"DTSTART;VALUE=DATE:{date:%Y%m%d}",
+                f"DTEND;VALUE=DATE:{date + datetime.timedelta(days=1):%Y%m%d}",
+                f"SUMMARY:{_escape(WASTE_EMOJI[waste_type] + ' ' + waste_type)}",
+                f"DESCRIPTION:{_escape(WASTE_INSTRUCTIONS[waste_type])}",
+                "TRANSP:TRANSPARENT",
+                # Promemoria alle 20:00 del giorno precedente
+                "BEGIN:VALARM",
+                "ACTION:DISPLAY",
+                f"DESCRIPTION:{_escape('Domani raccolta ' + waste_type)}",
+                "TRIGGER:-PT4H",
+                "END:VALARM",
+                "END:VEVENT",
+            ]
+
+    lines.append("END:VCALENDAR")
+    return ("\r\n".join(_fold(line) for line in lines) + "\r\n").encode("utf-8")
+
+
+class Feed:
+    """A precomputed HTTP response body with its ETag and gzip variant."""
+
+    def __init__(self, body):
+        self.body = body
+        self.gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def build_feeds(calendar=CALENDAR, year=SCHEDULE_YEAR, town="Calvenzano", prefix=""):
+    """Precompute the combined feed and one feed per waste type, keyed by URL path (under prefix)."""
+    feeds = {
+        f"{prefix}{COMBINED_FEED_PATH}": Feed(build_ics(set(calendar.waste_types), f"Raccolta rifiuti {town}", year, calendar))
+    }
+    for waste_type in calendar.waste_types:
+        feeds[f"{prefix}{FEED_PATH_PREFIX}{slugify(waste_type)}.ics"] = Feed(
+            build_ics({waste_type}, f"Raccolta {waste_type.lower()} {town}", year, calendar)
+        )
+    return feeds
+
+
+class FeedServer:
+    """Minimal asyncio HTTP server for the precomputed ICS feeds."""
+
+    def __init__(self, feeds, host="0.0.0.0", port=80):
+        self.feeds = feeds
+        self.host = host
+        self.port = port
+        self._server = None
+
+    def replace_feeds(self, feeds, prefix=""):
+        """Swap in the feeds of one town (paths under prefix), dropping the ones it no longer has."""
+        owned = (f"{prefix}{COMBINED_FEED_PATH}", f"{prefix}{FEED_PATH_PREFIX}")
+        updated = {path: feed for path, feed in self.feeds.items() if not path.startswith(owned)}
+        updated.update(feeds)
+        # Le richieste in corso usano il dizionario vecchio o quello nuovo, mai uno a metà
+        self.feeds = updated
+
+    async def start(self):
+        """Start listening for HTTP requests."""
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info(f"Feed ICS disponibile su http://{self.host}:{self.port}{COMBINED_FEED_PATH}")
+
+    async def stop(self):
+        """Stop accepting connections and close the server."""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def respond(self, method, path, headers):
+        """Build the (status, headers, body) response for a request."""
+        if method not in ("GET", "HEAD"):
+            return 405, {"Allow": "GET, HEAD"}, b""
+
+        feed = self.feeds.get(path.split("?", 1)[0])
+        if feed is None:
+            return 404, {}, b""
+
+        response_headers = {
+            "Content-Type": "text/calendar; charset=utf-8",
+            "ETag": feed.etag,
+            "Cache-Control": "public, max-age=3600",
+            "Vary": "Accept-Encoding",
+        }
+
+        if_none_match = headers.get("if-none-match", "")
+        if feed.etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*":
+            return 304, response_headers, b""
+
+        body = feed.body
+        if "gzip" in headers.get("accept-encoding", ""):
+            body = feed.gzip_body
+            response_headers["Content-Encoding"] = "gzip"
+
+        return 200, response_headers, body
+
+    async def _handle(self, reader, writer):
+        """Serve a single request and close the connection."""
+        try:
+            request_line = await asyncio.wait_for(reader.readline(), READ_TIMEOUT)
+            parts = request_line.decode("latin-1").split()
+            if len(parts) != 3:
+                return
+
+            headers = {}
+            for _ in range(MAX_HEADER_LINES):
+                line = await asyncio.wait_for(reader.readline(), READ_TIMEOUT)
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+
+            method, path, _ = parts
+            status, response_headers, body = self.respond(method, path, headers)
+
+            reason = {200: "OK", 304: "Not Modified", 404: "Not Found", 405: "Method Not Allowed"}[status]
+            head = [f"HTTP/1.1 {status} {reason}", "Connection: close"]
+            if status != 304:
+                head.append(f"Content-Length: {len(body)}")
+            head += [f"{name}: {value}" for name, value in response_headers.items()]
+
+            writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1"))
+            if method != "HEAD":
+                writer.write(body)
+            await writer.drain()
+        except (asyncio.TimeoutError, ConnectionError):
+            pass
+        finally:
+            writer.close()
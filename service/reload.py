@@ -0,0 +1,102 @@
+import asyncio
+import logging
+import os
+from service.calendar import load_calendar, changed_days
+from service.schedule import replan_slots
+
+logger = logging.getLogger(__name__)
+
+# Ogni quanti secondi controllare se i file dei calendari sono cambiati (0 per non controllarli)
+SCHEDULE_WATCH_INTERVAL = float(os.getenv("SCHEDULE_WATCH_INTERVAL", "60"))
+
+# Funzioni chiamate con il comune dopo ogni sostituzione del calendario (es. i feed ICS)
+reload_listeners = []
+
+
+def reload_schedule(tenant, bot):
+    """
+    Reload the schedule file of a town and swap the new calendar in.
+
+    The new calendar is loaded and validated before anything changes: on error the town keeps
+    the calendar it has. Returns None if the file content did not change, otherwise a report
+    with the collection days that changed and the notification slots re-planned.
+
+    Raises:
+        OSError: if the file cannot be read.
+        ValueError: if the file does not describe a valid schedule.
+    """
+    calendar = load_calendar(tenant.schedule_path, tenant.year)
+    if calendar.digest == tenant.calendar.digest:
+        return None
+
+    days = changed_days(tenant.calendar, calendar)
+    # Un solo assegnamento: ogni update vede il calendario vecchio o quello nuovo, mai un misto
+    tenant.calendar = calendar
+    report = {'changed_days': len(days), 'replanned_slots': replan_slots(tenant, bot)}
+
+    for listener in reload_listeners:
+        listener(tenant)
+
+    logger.info(
+        f"{tenant.tenant_id}: calendario ricaricato da {tenant.schedule_path}, "
+        f"{report['changed_days']} giorni cambiati, {report['replanned_slots']} slot ripianificati"
+    )
+    return report
+
+
+class ScheduleWatcher:
+    """Polls the schedule files of the towns and reloads the ones that changed on disk."""
+
+    def __init__(self, bots, interval=SCHEDULE_WATCH_INTERVAL):
+        """bots: list of (tenant, bot) pairs; the bot is used to re-plan the slots of its town."""
+        self.bots = [(tenant, bot) for tenant, bot in bots if tenant.schedule_path]
+        self.interval = interval
+        self._task = None
+        self._stats = {tenant.tenant_id: self._stat(tenant.schedule_path) for tenant, _ in self.bots}
+
+    @staticmethod
+    def _stat(path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def check(self):
+        """Reload the schedules whose file changed since the last check. Returns the ids of the towns reloaded."""
+        reloaded = []
+        for tenant, bot in self.bots:
+            stat = self._stat(tenant.schedule_path)
+            if stat is None or stat == self._stats.get(tenant.tenant_id):
+                continue
+            self._stats[tenant.tenant_id] = stat
+            try:
+                if reload_schedule(tenant, bot) is not None:
+                    reloaded.append(tenant.tenant_id)
+            except (OSError, ValueError) as e:
+                # Un file salvato a metà o con un errore non ferma il bot: resta il calendario precedente
+                logger.error(f"{tenant.tenant_id}: calendario non ricaricato, resta quello in uso: {e}")
+            except Exception:
+                # Un errore imprevisto non deve fermare il controllo degli altri comuni
+                logger.exception(f"{tenant.tenant_id}: errore nel ricaricare il calendario, resta quello in uso")
+        return reloaded
+
+    def start(self):
+        """Start polling on the running loop."""
+        if self.interval and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        """Stop polling."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                self.check()
+            except Exception:
+                # Senza questo il task terminerebbe in silenzio e il ricaricamento resterebbe spento
+                logger.exception("Errore nel controllo dei calendari, riprovo al prossimo intervallo")
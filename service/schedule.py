@@ -1,102 +1,218 @@
+import asyncio
 import datetime
+import logging
 import pytz
 import telegram
 from telegram.ext import ContextTypes
-from config.waste_schedules import WASTE_SCHEDULE, WASTE_EMOJI, DAY_NAMES, MONTH_NAMES
-from db_manager import DatabaseManager
+from db_manager import open_database
+from service.calendar import CALENDAR
+from config.messages import DEFAULT_LANGUAGE
+from service.delivery import preference_for, build_notification, textile_note, TEXTILE_WASTE
+from service.scheduler import NotificationScheduler, fire_time
+from service.events import event_log
+from service.tenants import tenant_of
 import os
 
-# Inizializza il database manager
-db = DatabaseManager(os.environ.get('DATABASE_URL'))
+# Inizializza il database manager (PostgreSQL o SQLite, secondo DATABASE_URL)
+db = open_database(os.environ.get('DATABASE_URL'))
 
-def get_waste_collection(day, month):
+logger = logging.getLogger(__name__)
+
+# Le richieste di ripianificazione ravvicinate vengono raccolte in un'unica ricostruzione
+RESCHEDULE_JOB = "reschedule_notifications"
+RESCHEDULE_DELAY = 5
+
+# Tempo concesso agli invii in corso durante l'arresto, poi i destinatari mancanti vengono salvati.
+# Deve restare sotto lo stop_grace_period del container (docker-compose.yaml), o il SIGKILL arriva prima
+SHUTDOWN_DRAIN_TIMEOUT = float(os.getenv("SHUTDOWN_DRAIN_TIMEOUT", "20"))
+
+# Destinatari salvati per il recupero durante l'arresto, per slot
+checkpointed_users = {}
+
+def get_waste_collection(day, month, calendar=CALENDAR):
     """Get waste types collected on a specific date."""
-    waste_types = []
-    
-    for waste_type, schedule in WASTE_SCHEDULE.items():
-        if month in schedule and day in schedule[month]:
-            waste_types.append(waste_type)
-    
-    return waste_types
-
-async def send_notification(context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Send notification about tomorrow's waste collection."""
-    job = context.job
-    user_id = job.data
-    
-    # Get user data from database
-    user_data = db.get_user(user_id)
-    
-    # Check if notifications are enabled for this user
-    if not user_data or not user_data.get('notifications_enabled', False):
+    return list(calendar.types_for_mask(calendar.mask_for(day, month)))
+
+def next_fire_time(slot, now, calendar=CALENDAR):
+    """
+    UTC instant of the next evening at an HH:MM slot that precedes a collection day.
+
+    Returns None when the calendar has no collection days at all.
+    """
+    evening = now.astimezone(pytz.timezone('Europe/Rome')).date()
+
+    # If the time has already passed today, start from tomorrow
+    if fire_time(slot, evening) <= now:
+        evening += datetime.timedelta(days=1)
+
+    # Salta direttamente alla sera prima della prossima raccolta
+    collection_day = calendar.next_collection_day(evening + datetime.timedelta(days=1))
+    if collection_day is None:
+        return None
+
+    return fire_time(slot, collection_day - datetime.timedelta(days=1))
+
+def _schedule_slot(bot, tenant, slot, now) -> None:
+    """Schedule the batched dispatch of one notification slot of a town."""
+    when = next_fire_time(slot, now, tenant.calendar)
+    if when is None:
         return
-    
+
+    # Un solo scheduler per tutti i comuni: lo slot è identificato da (comune, orario)
+    notification_scheduler.schedule((tenant, slot), when, bot)
+
+async def _deliver(bot, tenant, users, tomorrow, label) -> int:
+    """
+    Send tomorrow's reminder to each user and return how many were sent.
+
+    If the send is cancelled (shutdown past the drain deadline) the users not reached yet
+    are saved, so that the next start can complete the broadcast.
+    """
+    sent = 0
+    index = 0
+    try:
+        for index, user in enumerate(users):
+            # Il messaggio dipende solo dalla preferenza: viene costruito una volta per variante
+            language = user.get('language') or DEFAULT_LANGUAGE
+            message, waste_types = build_notification(
+                tomorrow, preference_for(user, tenant.calendar), language, tenant.calendar
+            )
+            if not message:
+                continue
+
+            # Add special note for textile collection (last Thursday of month)
+            address = user.get('address')
+            if TEXTILE_WASTE in waste_types and address:
+                message += textile_note(address, language)
+
+            try:
+                await bot.send_message(
+                    user['user_id'],
+                    message,
+                    parse_mode=telegram.constants.ParseMode.MARKDOWN
+                )
+                sent += 1
+                event_log.record('notification_sent', label, user['user_id'], tenant_id=tenant.tenant_id)
+            except telegram.error.TelegramError as e:
+                logger.warning(f"Invio notifica all'utente {user['user_id']} fallito: {e}")
+                event_log.record('notification_failed', label, user['user_id'], str(e), tenant_id=tenant.tenant_id)
+    except asyncio.CancelledError:
+        # L'invio interrotto è incluso: meglio un doppione che un utente mai avvisato
+        remaining = [user['user_id'] for user in users[index:]]
+        db.save_pending_notifications(tomorrow, remaining, tenant.tenant_id)
+        key = (tenant.tenant_id, label)
+        checkpointed_users[key] = checkpointed_users.get(key, 0) + len(remaining)
+        logger.warning(f"{tenant.tenant_id} {label}: invio interrotto dopo {sent} notifiche, {len(remaining)} utenti salvati")
+        raise
+
+    return sent
+
+async def send_slot_notifications(key, bot) -> None:
+    """Send tomorrow's reminders to every user of a (town, notification time) slot."""
+    tenant, slot = key
+
     # Get tomorrow's date
     today = datetime.datetime.now(pytz.timezone('Europe/Rome'))
-    tomorrow = today + datetime.timedelta(days=1)
-    
-    # Get waste collection for tomorrow
-    waste_types = get_waste_collection(tomorrow.day, tomorrow.month)
-    
-    if waste_types:
-        message = (
-            f"📢 **PROMEMORIA RACCOLTA RIFIUTI**\n\n"
-            f"Domani, {DAY_NAMES[tomorrow.weekday()]} {tomorrow.day} {MONTH_NAMES[tomorrow.month]}, verranno raccolti:\n\n" +
-            "\n".join([f"{WASTE_EMOJI[waste_type]} **{waste_type}**" for waste_type in waste_types]) +
-            "\n\nRicorda: posiziona i rifiuti in strada non prima delle ore 20:00 di oggi."
-        )
-        
-        # Add special note for textile collection (last Thursday of month)
-        address = user_data.get('address')
-        if "TESSILI E INDUMENTI" in waste_types and address:
-            message += (
-                f"\n\n👕 **IMPORTANTE**: Domani è prevista la raccolta di tessili e indumenti usati. "
-                f"Il tuo indirizzo registrato è: {address}. "
-                f"Ricorda di segnalare via WhatsApp al 324 150 8217."
-            )
-        
-        await context.bot.send_message(
-            user_id,
-            message,
-            parse_mode=telegram.constants.ParseMode.MARKDOWN
-        )
-    
-    # Schedule the next notification for tomorrow
-    await schedule_tomorrow_notification(context)
+    tomorrow = today.date() + datetime.timedelta(days=1)
+
+    # Anche i digest partono solo da un giorno di raccolta: senza raccolta domani nessuno riceve nulla
+    collection_mask = tenant.calendar.mask_on(tomorrow)
+    users = db.get_users_for_slot(slot, collection_mask, tenant.tenant_id) if collection_mask else []
+    sent = await _deliver(bot, tenant, users, tomorrow, slot)
+
+    logger.info(f"{tenant.tenant_id} slot {slot}: {sent} notifiche inviate su {len(users)} utenti")
+
+    # Schedule the same slot for the next evening before a collection
+    _schedule_slot(bot, tenant, slot, datetime.datetime.now(pytz.utc))
 
 async def schedule_tomorrow_notification(context: ContextTypes.DEFAULT_TYPE) -> None:
-    """Schedule notification for tomorrow's waste collection."""
-    # Remove all existing jobs
-    current_jobs = context.job_queue.get_jobs_by_name("notification")
-    for job in current_jobs:
-        job.schedule_removal()
-    
-    # Get all users who have notifications enabled
-    users = db.get_all_users_for_notification()
-    
-    # Schedule notifications for all users
-    for user in users:
-        user_id = user['user_id']
-        notification_time = user['notification_time']
-        
-        # Parse notification time
-        hours, minutes = map(int, notification_time.split(':'))
-        
-        # Calculate when to send the notification
-        now = datetime.datetime.now(pytz.timezone('Europe/Rome'))
-        notification_time = now.replace(hour=hours, minute=minutes, second=0, microsecond=0)
-        
-        # If the time has already passed today, schedule for tomorrow
-        if now > notification_time:
-            notification_time = notification_time + datetime.timedelta(days=1)
-        
-        # Calculate seconds until notification
-        seconds_until_notification = (notification_time - now).total_seconds()
-        
-        # Schedule the job
-        context.job_queue.run_once(
-            send_notification,
-            seconds_until_notification,
-            data=user_id,
-            name="notification"
-        )
+    """Schedule one batched notification per notification time of the town of the bot."""
+    tenant = tenant_of(context)
+
+    # Remove the pending slots of this town only: the scheduler is shared by all of them
+    for key in notification_scheduler.keys():
+        if key[0] is tenant:
+            notification_scheduler.cancel(key)
+
+    now = datetime.datetime.now(pytz.utc)
+
+    # Un solo timer per orario, qualunque sia il numero di utenti
+    for slot in db.get_notification_slots(tenant.tenant_id):
+        _schedule_slot(context.bot, tenant, slot, now)
+
+def replan_slots(tenant, bot) -> int:
+    """
+    Re-plan the notification slots of a town after its calendar changed.
+
+    Only the slots whose next fire time moves are rescheduled (or cancelled when no collection
+    is left); the others keep their timer. Returns the number of slots re-planned.
+    """
+    now = datetime.datetime.now(pytz.utc)
+    replanned = 0
+    for slot in db.get_notification_slots(tenant.tenant_id):
+        key = (tenant, slot)
+        when = next_fire_time(slot, now, tenant.calendar)
+        if when == notification_scheduler.fire_time_of(key):
+            continue
+        if when is None:
+            notification_scheduler.cancel(key)
+        else:
+            notification_scheduler.schedule(key, when, bot)
+        replanned += 1
+    return replanned
+
+async def resume_pending_notifications(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """Complete the broadcasts interrupted by the last shutdown, if their evening is not over."""
+    tenant = tenant_of(context)
+    today = datetime.datetime.now(pytz.timezone('Europe/Rome'))
+    tomorrow = today.date() + datetime.timedelta(days=1)
+
+    # I recuperi di una sera ormai passata vengono scartati dalla query
+    users = db.take_pending_notifications(tomorrow, tenant.tenant_id)
+    if not users:
+        return
+
+    sent = await _deliver(context.bot, tenant, users, tomorrow, "recupero")
+    logger.info(f"Recupero: {sent} notifiche inviate su {len(users)} utenti interrotti all'ultimo arresto")
+
+async def shutdown_notifications(timeout=SHUTDOWN_DRAIN_TIMEOUT) -> dict:
+    """
+    Stop firing notification slots and drain the sends in progress within a deadline.
+
+    Sends still running at the deadline are cancelled and their remaining users saved for
+    resume_pending_notifications. Returns a report of what was completed and deferred.
+    """
+    checkpointed_users.clear()
+    notification_scheduler.stop()
+
+    finished, cancelled = await notification_scheduler.drain(timeout)
+    # Dopo lo svuotamento: conta anche gli slot ripianificati dagli invii appena conclusi
+    deferred_slots = len(notification_scheduler)
+
+    report = {
+        'deferred_slots': deferred_slots,
+        'finished_sends': finished,
+        'cancelled_sends': cancelled,
+        'checkpointed_users': sum(checkpointed_users.values()),
+    }
+    logger.info(
+        f"Arresto notifiche: {finished} invii completati, {cancelled} interrotti, "
+        f"{report['checkpointed_users']} utenti salvati per il recupero, "
+        f"{deferred_slots} slot in attesa ripianificati al prossimo avvio"
+    )
+    return report
+
+def request_reschedule(context: ContextTypes.DEFAULT_TYPE) -> None:
+    """
+    Ask for a rebuild of the notification slots.
+
+    Requests arriving while a rebuild is already pending are coalesced into it, so a burst of
+    /start or /restart from any number of users costs a single pass over the slots.
+    """
+    if context.job_queue.get_jobs_by_name(RESCHEDULE_JOB):
+        return
+
+    context.job_queue.run_once(schedule_tomorrow_notification, RESCHEDULE_DELAY, name=RESCHEDULE_JOB)
+
+# Timing wheel condiviso da tutti gli slot di notifica
+notification_scheduler = NotificationScheduler(send_slot_notifications)
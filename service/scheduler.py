@@ -0,0 +1,275 @@
+import asyncio
+import datetime
+import functools
+import logging
+import time
+import pytz
+
+logger = logging.getLogger(__name__)
+
+UTC = pytz.utc
+
+# Granularità del wheel: gli orari di notifica sono al minuto
+TICK_SECONDS = 60
+
+# Livelli del wheel: 60 minuti, 24 ore, 64 giorni. Oltre si finisce nella lista di overflow.
+WHEEL_LEVELS = (
+    (1, 60),
+    (60, 24),
+    (60 * 24, 64),
+)
+OVERFLOW_SPAN = WHEEL_LEVELS[-1][0] * WHEEL_LEVELS[-1][1]
+
+
+class Timer:
+    """Handle of an entry in the timing wheel."""
+
+    __slots__ = ('tick', 'key', 'data', 'bucket')
+
+    def __init__(self, tick, key, data):
+        self.tick = tick
+        self.key = key
+        self.data = data
+        self.bucket = None
+
+    @property
+    def when(self):
+        """UTC timestamp at which the timer fires."""
+        return self.tick * TICK_SECONDS
+
+
+class TimingWheel:
+    """
+    Hierarchical timing wheel with O(1) insert and cancel.
+
+    Timers are kept in the coarsest level that still tells them apart from "now" and are
+    cascaded to finer levels as time advances; advancing only walks ticks, never timers.
+    """
+
+    def __init__(self, now):
+        self._tick = int(now // TICK_SECONDS)
+        self._levels = [[set() for _ in range(size)] for _, size in WHEEL_LEVELS]
+        self._overflow = set()
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def insert(self, when, key, data=None):
+        """Add a timer firing at a UTC timestamp and return its handle."""
+        timer = Timer(max(int(-(-when // TICK_SECONDS)), self._tick), key, data)
+        self._place(timer)
+        self._count += 1
+        return timer
+
+    def cancel(self, timer):
+        """Remove a timer; cancelling an expired or cancelled timer is a no-op."""
+        if timer.bucket is not None:
+            timer.bucket.discard(timer)
+            timer.bucket = None
+            self._count -= 1
+
+    def _place(self, timer):
+        delta = timer.tick - self._tick
+        for (span, size), buckets in zip(WHEEL_LEVELS, self._levels):
+            if delta < span * size:
+                bucket = buckets[(timer.tick // span) % size]
+                break
+        else:
+            bucket = self._overflow
+        bucket.add(timer)
+        timer.bucket = bucket
+
+    def _cascade(self):
+        """Move timers of the coarser buckets starting at the current tick down one level."""
+        # Prima l'overflow, poi dal livello più grossolano al più fine: ogni timer scende
+        # fino al livello giusto nella stessa chiamata
+        if self._overflow and self._tick % OVERFLOW_SPAN == 0:
+            for timer in list(self._overflow):
+                self._overflow.discard(timer)
+                self._place(timer)
+
+        for level in range(len(WHEEL_LEVELS) - 1, 0, -1):
+            span, size = WHEEL_LEVELS[level]
+            if self._tick % span:
+                continue
+            bucket = self._levels[level][(self._tick // span) % size]
+            for timer in list(bucket):
+                bucket.discard(timer)
+                self._place(timer)
+
+    def advance(self, now):
+        """Advance the wheel to a UTC timestamp and return the expired timers."""
+        target = int(now // TICK_SECONDS)
+        expired = []
+        while self._tick <= target and self._count:
+            self._cascade()
+            bucket = self._levels[0][self._tick % WHEEL_LEVELS[0][1]]
+            if bucket:
+                for timer in bucket:
+                    timer.bucket = None
+                expired.extend(bucket)
+                self._count -= len(bucket)
+                bucket.clear()
+            self._tick += 1
+
+        # Senza timer non serve attraversare i tick intermedi
+        if not self._count:
+            self._tick = max(self._tick, target + 1)
+        return expired
+
+    def next_deadline(self):
+        """UTC timestamp of the next tick at which the wheel must be advanced, or None if empty."""
+        if not self._count:
+            return None
+
+        # Tick del primo bucket non vuoto di ogni livello: scadenza (livello 0) o confine da cui ricaricarlo
+        candidates = []
+        for (span, size), buckets in zip(WHEEL_LEVELS, self._levels):
+            base = self._tick // span
+            for offset in range(size):
+                if buckets[(base + offset) % size]:
+                    boundary = (base + offset) * span
+                    if boundary < self._tick:
+                        # Bucket corrente già ricaricato: contiene solo timer del giro successivo
+                        boundary += span * size
+                    candidates.append(boundary)
+
+        if self._overflow:
+            candidates.append(-(-self._tick // OVERFLOW_SPAN) * OVERFLOW_SPAN)
+
+        return min(candidates) * TICK_SECONDS
+
+
+@functools.lru_cache(maxsize=4096)
+def fire_time(slot, date, timezone='Europe/Rome'):
+    """UTC instant of an HH:MM local slot on a date, localized with the DST rules of that date."""
+    hours, minutes = map(int, slot.split(':'))
+    tz = pytz.timezone(timezone)
+    # Un orario inesistente (passaggio all'ora legale) slitta in avanti di un'ora
+    local = tz.normalize(tz.localize(datetime.datetime.combine(date, datetime.time(hours, minutes)), is_dst=False))
+    return local.astimezone(UTC)
+
+
+class NotificationScheduler:
+    """
+    Fires keyed notification slots from a timing wheel driven by a single asyncio timer.
+
+    Each key (a notification slot) has at most one pending fire time; scheduling a key
+    again replaces it.
+    """
+
+    def __init__(self, callback):
+        self._callback = callback
+        self._wheel = TimingWheel(time.time())
+        self._timers = {}
+        self._handle = None
+        self._deadline = None
+        self._loop = None
+        self._tasks = set()
+        # Dopo stop() i timer vengono solo registrati: gli invii che finiscono durante lo
+        # svuotamento possono ripianificare il proprio slot senza riarmare lo scheduler
+        self._stopped = False
+
+    def __len__(self):
+        return len(self._timers)
+
+    def __contains__(self, key):
+        return key in self._timers
+
+    def keys(self):
+        """Keys currently scheduled."""
+        return list(self._timers)
+
+    def fire_time_of(self, key):
+        """UTC datetime at which a key is due, or None if it is not scheduled."""
+        timer = self._timers.get(key)
+        return datetime.datetime.fromtimestamp(timer.when, UTC) if timer else None
+
+    def schedule(self, key, when, data=None):
+        """Schedule (or reschedule) a key at a timezone-aware datetime."""
+        self.cancel(key)
+        self._timers[key] = self._wheel.insert(when.timestamp(), key, data)
+        self._arm()
+
+    def cancel(self, key):
+        """Cancel the pending fire time of a key, if any."""
+        timer = self._timers.pop(key, None)
+        if timer:
+            self._wheel.cancel(timer)
+
+    def clear(self):
+        """Cancel every pending key."""
+        for key in list(self._timers):
+            self.cancel(key)
+        self._disarm()
+
+    def stop(self):
+        """Stop firing timers for good; keys scheduled afterwards are recorded but never fire."""
+        self._stopped = True
+        self._disarm()
+        self._loop = None
+
+    async def drain(self, timeout):
+        """
+        Wait up to timeout seconds for the callbacks already running, then cancel the others.
+
+        Returns:
+            tuple: (finished, cancelled) number of callbacks.
+        """
+        tasks = set(self._tasks)
+        if not tasks:
+            return 0, 0
+
+        done, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        if pending:
+            # I callback interrotti salvano il proprio stato prima di terminare
+            await asyncio.gather(*pending, return_exceptions=True)
+        return len(done), len(pending)
+
+    def _disarm(self):
+        if self._handle:
+            self._handle.cancel()
+        self._handle = None
+        self._deadline = None
+
+    def _arm(self):
+        """Point the single asyncio timer at the next wheel deadline."""
+        if self._stopped:
+            return
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._disarm()
+            self._loop = loop
+
+        deadline = self._wheel.next_deadline()
+        if deadline is None:
+            self._disarm()
+            return
+        if self._handle and self._deadline == deadline:
+            return
+
+        self._disarm()
+        self._deadline = deadline
+        self._handle = loop.call_later(max(0, deadline - time.time()), self._on_timer)
+
+    def _on_timer(self):
+        self._handle = None
+        self._deadline = None
+
+        for timer in self._wheel.advance(time.time()):
+            if self._timers.get(timer.key) is timer:
+                del self._timers[timer.key]
+            task = self._loop.create_task(self._run(timer))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+        self._arm()
+
+    async def _run(self, timer):
+        try:
+            await self._callback(timer.key, timer.data)
+        except Exception:
+            logger.exception(f"Errore nell'esecuzione dello slot {timer.key}")
@@ -0,0 +1,116 @@
+import json
+import logging
+import os
+from dotenv import load_dotenv
+from config.waste_schedules import SCHEDULE_FILE, SCHEDULE_YEAR
+from db_manager import DEFAULT_TENANT_ID
+from service.calendar import CALENDAR, load_calendar
+from service.i18n import CATALOG, translate
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+# File JSON con l'elenco dei comuni ospitati dal processo (vedi README)
+TENANTS_FILE = os.getenv("TENANTS_FILE")
+
+
+class Tenant:
+    """A municipality served by its own bot: token, calendar and local texts."""
+
+    __slots__ = ('tenant_id', 'town', 'token', 'calendar', 'year', 'collection_centre', 'feed_prefix', 'schedule_path')
+
+    def __init__(self, tenant_id, town, token, calendar, year, collection_centre, feed_prefix="", schedule_path=None):
+        self.tenant_id = tenant_id
+        self.town = town
+        self.token = token
+        # Sostituito per intero quando il file del calendario cambia: gli handler lo rileggono a ogni update
+        self.calendar = calendar
+        self.year = year
+        # Lingua -> testo con orari e contatti del centro di raccolta
+        self.collection_centre = collection_centre
+        # Prefisso dei percorsi dei feed ICS ("" per il comune predefinito, "/<id>" per gli altri)
+        self.feed_prefix = feed_prefix
+        # File da cui ricaricare il calendario (None se il calendario non è ricaricabile)
+        self.schedule_path = schedule_path
+
+    def __repr__(self):
+        return f"Tenant({self.tenant_id!r})"
+
+    def collection_centre_text(self, language):
+        """Collection centre section of /info in a language, or "" if the town has none."""
+        return self.collection_centre.get(language) or next(iter(self.collection_centre.values()), "")
+
+
+def _default_collection_centre():
+    return {language: translate(language, "collection_centre") for language in CATALOG.languages}
+
+
+DEFAULT_TENANT = Tenant(
+    DEFAULT_TENANT_ID, "Calvenzano", os.getenv("TELEGRAM_BOT_TOKEN"), CALENDAR, SCHEDULE_YEAR,
+    _default_collection_centre(), schedule_path=SCHEDULE_FILE
+)
+
+
+def load_tenants(path=TENANTS_FILE):
+    """
+    Load the municipalities hosted by this process.
+
+    Without a configuration file the process serves only Calvenzano with TELEGRAM_BOT_TOKEN.
+    Each entry of the file is an object with "id", "town", "token_env" (name of the environment
+    variable holding the bot token) and optionally "schedule" (JSON or YAML file, default
+    SCHEDULE_FILE for Calvenzano), "year" and "collection_centre" (language -> text).
+
+    Raises:
+        ValueError: if the file is not a valid tenant list.
+    """
+    if not path:
+        return [DEFAULT_TENANT]
+
+    with open(path, encoding="utf-8") as tenants_file:
+        entries = json.load(tenants_file)
+
+    tenants = []
+    seen = set()
+    for entry in entries:
+        tenant_id = entry.get("id")
+        if not tenant_id or not tenant_id.isidentifier() or tenant_id in seen:
+            raise ValueError(f"{path}: id di comune mancante, non valido o duplicato: {tenant_id!r}")
+        seen.add(tenant_id)
+
+        token = os.getenv(entry.get("token_env", ""))
+        if not token:
+            raise ValueError(f"{path}: token del comune '{tenant_id}' non configurato ({entry.get('token_env')})")
+
+        year = entry.get("year", SCHEDULE_YEAR)
+        if entry.get("schedule"):
+            schedule_path = entry["schedule"]
+            calendar = load_calendar(schedule_path, year)
+        elif tenant_id == DEFAULT_TENANT_ID:
+            schedule_path = SCHEDULE_FILE
+            calendar = CALENDAR
+        else:
+            raise ValueError(f"{path}: calendario del comune '{tenant_id}' non configurato")
+
+        if "collection_centre" in entry:
+            collection_centre = entry["collection_centre"]
+        elif tenant_id == DEFAULT_TENANT_ID:
+            collection_centre = _default_collection_centre()
+        else:
+            # Gli orari di Calvenzano non valgono per gli altri comuni
+            collection_centre = {}
+
+        tenants.append(Tenant(
+            tenant_id, entry.get("town", tenant_id), token, calendar, year, collection_centre,
+            "" if tenant_id == DEFAULT_TENANT_ID else f"/{tenant_id}", schedule_path
+        ))
+        logger.info(f"Comune '{tenant_id}' configurato con {len(calendar.waste_types)} tipi di rifiuto")
+
+    if not tenants:
+        raise ValueError(f"{path}: nessun comune configurato")
+    return tenants
+
+
+def tenant_of(context):
+    """Tenant of the bot that received an update (stored in bot_data by main)."""
+    return context.bot_data.get('tenant') or DEFAULT_TENANT
@@ -0,0 +1,43 @@
+import unittest
+import itertools
+import os
+import tempfile
+from unittest.mock import patch
+
+# Il package dei benchmark imposta un DATABASE_URL predefinito: non deve restare negli altri test
+with patch.dict(os.environ):
+    from benchmarks.harness import Benchmark, Result, measure, load_baseline, save_baseline, find_regressions
+
+class TestHarness(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'baseline.json')
+
+    def test_measure(self):
+        calls = itertools.count()
+        result = measure(Benchmark('count', lambda: lambda: next(calls), 10), repeat=2)
+        self.assertEqual(result.name, 'count')
+        self.assertGreater(result.seconds, 0)
+        self.assertAlmostEqual(result.items_per_second, 10 / result.seconds)
+        self.assertGreater(next(calls), 2)
+
+    def test_baseline_round_trip(self):
+        self.assertEqual(load_baseline(self.path), {})
+        save_baseline([Result('lookup', 0.5, 100), Result('render', 0.1, 10)], self.path)
+        # Un aggiornamento parziale mantiene i benchmark non eseguiti
+        save_baseline([Result('lookup', 0.25, 100)], self.path)
+        self.assertEqual(load_baseline(self.path), {'lookup': 400.0, 'render': 100.0})
+
+    def test_find_regressions(self):
+        baseline = {'lookup': 1000.0, 'render': 1000.0}
+        results = [Result('lookup', 1 / 800, 1), Result('render', 1 / 700, 1), Result('new', 1.0, 1)]
+
+        regressions = find_regressions(results, baseline, threshold=0.25)
+        self.assertEqual([regression.name for regression in regressions], ['render'])
+        self.assertAlmostEqual(regressions[0].ratio, 0.7)
+        self.assertEqual(find_regressions(results, baseline, threshold=0.5), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import unittest
+import datetime
+import json
+import os
+import tempfile
+
+from config.waste_schedules import SCHEDULE_FILE, SCHEDULE_YEAR
+from service.calendar import (
+    CollectionCalendar, CALENDAR, load_schedule, load_calendar, compile_calendar, read_compiled, changed_days,
+    WASTE_BITS
+)
+
+WASTE_SCHEDULE = load_schedule(SCHEDULE_FILE, SCHEDULE_YEAR)
+
+class TestCalendar(unittest.TestCase):
+
+    def test_collections_on(self):
+        # Sabato 1 marzo 2025
+        waste_types = CALENDAR.collections_on(datetime.date(2025, 3, 1))
+        self.assertEqual(waste_types, ('CARTA E CARTONE', 'ORGANICO', 'PLASTICA'))
+        self.assertEqual(CALENDAR.collections_on(datetime.date(2025, 3, 3)), ())
+
+    def test_mask_matches_schedule(self):
+        calendar = CollectionCalendar(WASTE_SCHEDULE)
+        for waste_type, months in WASTE_SCHEDULE.items():
+            for month, days in months.items():
+                for day in days:
+                    self.assertTrue(calendar.mask_for(day, month) & calendar.bits[waste_type])
+
+    def test_collections_between(self):
+        collections = CALENDAR.collections_between(datetime.date(2025, 2, 24), datetime.date(2025, 3, 2))
+        self.assertEqual([date.day for date, _ in collections], [26, 27, 28, 1])
+
+    def test_next_collection_day(self):
+        self.assertEqual(CALENDAR.next_collection_day(datetime.date(2025, 3, 2)), datetime.date(2025, 3, 5))
+        self.assertEqual(CALENDAR.next_collection_day(datetime.date(2025, 3, 5)), datetime.date(2025, 3, 5))
+        calendar = CollectionCalendar({'PLASTICA': {1: [4], 12: [6]}})
+        self.assertEqual(calendar.next_collection_day(datetime.date(2025, 12, 7)), datetime.date(2026, 1, 4))
+        self.assertIsNone(CollectionCalendar({}).next_collection_day(datetime.date(2025, 1, 1)))
+
+    def test_next_collection_day_leap_day(self):
+        # Calendario di un anno bisestile: il 29 febbraio non esiste negli anni successivi
+        calendar = CollectionCalendar({'PLASTICA': {2: [29], 3: [1]}})
+        self.assertEqual(calendar.next_collection_day(datetime.date(2024, 2, 28)), datetime.date(2024, 2, 29))
+        self.assertEqual(calendar.next_collection_day(datetime.date(2024, 12, 31)), datetime.date(2025, 3, 1))
+        self.assertEqual(calendar.next_collection_day(datetime.date(2025, 2, 1)), datetime.date(2025, 3, 1))
+        leap_only = CollectionCalendar({'PLASTICA': {2: [29]}})
+        self.assertEqual(leap_only.next_collection_day(datetime.date(2025, 1, 1)), datetime.date(2028, 2, 29))
+
+class TestCompiledCalendar(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.cache_dir = os.path.join(self.directory.name, 'cache')
+
+    def write_schedule(self, schedule, name='schedule.json'):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as schedule_file:
+            json.dump(schedule, schedule_file)
+        return path
+
+    def test_compiled_round_trip(self):
+        calendar = read_compiled(compile_calendar(CALENDAR))
+        self.assertEqual(calendar.waste_types, CALENDAR.waste_types)
+        self.assertEqual(changed_days(CALENDAR, calendar), [])
+        self.assertEqual(calendar.next_collection_day(datetime.date(2025, 3, 2)), datetime.date(2025, 3, 5))
+        with self.assertRaises(ValueError):
+            read_compiled(compile_calendar(CALENDAR)[:100])
+
+    def test_load_calendar_uses_cache(self):
+        path = self.write_schedule({'_note': 'prova', 'PLASTICA': {'3': [1]}})
+        calendar = load_calendar(path, 2025, self.cache_dir)
+        self.assertEqual(os.listdir(self.cache_dir), [f'{calendar.digest[:32]}.bin'])
+
+        cached = load_calendar(path, 2025, self.cache_dir)
+        self.assertEqual(cached.digest, calendar.digest)
+        self.assertEqual(cached.collections_on(datetime.date(2025, 3, 1)), ('PLASTICA',))
+
+        # Un file modificato ha un altro hash e viene validato di nuovo
+        self.write_schedule({'PLASTICA': {'2': [30]}})
+        with self.assertRaises(ValueError):
+            load_calendar(path, 2025, self.cache_dir)
+
+    def test_corrupt_cache_is_rebuilt(self):
+        path = self.write_schedule({'PLASTICA': {'3': [1]}})
+        digest = load_calendar(path, 2025, self.cache_dir).digest
+        with open(os.path.join(self.cache_dir, f'{digest[:32]}.bin'), 'wb') as cache_file:
+            cache_file.write(b'WBSC')
+        self.assertEqual(load_calendar(path, 2025, self.cache_dir).mask_for(1, 3), WASTE_BITS['PLASTICA'])
+
+    def test_changed_days(self):
+        old = CollectionCalendar({'PLASTICA': {3: [1, 8]}, 'ORGANICO': {3: [1]}})
+        # Stessi giorni con i tipi in un altro ordine: le raccolte non cambiano
+        new = CollectionCalendar({'ORGANICO': {3: [1]}, 'PLASTICA': {3: [1, 15]}})
+        self.assertEqual(changed_days(old, new), [(3, 8), (3, 15)])
+
+    def test_load_yaml_schedule(self):
+        try:
+            import yaml  # noqa: F401
+        except ImportError:
+            self.skipTest("PyYAML non installato")
+        path = os.path.join(self.directory.name, 'schedule.yaml')
+        with open(path, 'w', encoding='utf-8') as schedule_file:
+            schedule_file.write("PLASTICA:\n  3: [1, 15]\n")
+        self.assertEqual(load_schedule(path, 2025), {'PLASTICA': {3: [1, 15]}})
+
+        # Una chiave non testuale (un anno) è un errore di validazione, non un'eccezione imprevista
+        with open(path, 'w', encoding='utf-8') as schedule_file:
+            schedule_file.write("2025:\n  3: [1]\n")
+        with self.assertRaises(ValueError):
+            load_schedule(path, 2025)
+
+    def test_days_must_be_a_list(self):
+        with self.assertRaises(ValueError):
+            load_schedule(self.write_schedule({'PLASTICA': {'3': '15'}}), 2025)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,14 @@
 
 import unittest
+import datetime
 import os
 from unittest.mock import patch, MagicMock
 
 # Set a dummy DATABASE_URL before importing the db_manager
 os.environ['DATABASE_URL'] = 'dbname=test'
 
-from db_manager import DatabaseManager
+import psycopg2
+from db_manager import DatabaseManager, ROLE_PRIMARY, ROLE_REPLICA
 
 class TestDatabaseManager(unittest.TestCase):
 
@@ -30,6 +32,11 @@ class TestDatabaseManager(unittest.TestCase):
         result = self.db.create_user(1, 'test', 'Test', 'User')
         self.assertTrue(result)
 
+    def test_create_user_language(self):
+        self.mock_cursor.fetchone.return_value = (1,)
+        self.db.create_user(1, 'test', 'Test', 'User', 'en')
+        self.assertIn('en', self.mock_cursor.execute.call_args[0][1])
+
     def test_update_user(self):
         self.mock_cursor.rowcount = 1
         result = self.db.update_user(1, address='new_address')
@@ -46,5 +53,158 @@ class TestDatabaseManager(unittest.TestCase):
         self.assertEqual(users[0]['user_id'], 1)
         self.assertEqual(users[1]['user_id'], 2)
 
+    def test_get_users_for_slot(self):
+        self.mock_cursor.fetchall.return_value = [(1, 'address', 'daily', 3, -1, 'en')]
+        self.mock_cursor.description = [('user_id',), ('address',), ('delivery_mode',), ('digest_days',), ('waste_mask',), ('language',)]
+        users = self.db.get_users_for_slot('20:00', 0b1000)
+        self.assertEqual(users, [{'user_id': 1, 'address': 'address', 'delivery_mode': 'daily', 'digest_days': 3, 'waste_mask': -1, 'language': 'en'}])
+        self.assertEqual(self.mock_cursor.execute.call_args[0][1], ('calvenzano', '20:00', 0b1000))
+
+    def test_get_notification_slots(self):
+        self.mock_cursor.fetchall.return_value = [(datetime.time(20, 0),), ('07:30',)]
+        self.assertEqual(self.db.get_notification_slots(), ['20:00', '07:30'])
+
+    def test_save_pending_notifications(self):
+        self.assertEqual(self.db.save_pending_notifications(datetime.date(2025, 3, 1), [1, 2]), 2)
+        self.assertEqual(self.mock_cursor.executemany.call_args[0][1], [('calvenzano', 1, datetime.date(2025, 3, 1)), ('calvenzano', 2, datetime.date(2025, 3, 1))])
+        self.assertEqual(self.db.save_pending_notifications(datetime.date(2025, 3, 1), []), 0)
+
+    def test_tenant_scoped_queries(self):
+        self.mock_cursor.fetchone.return_value = None
+        self.db.get_user(1, 'arcene')
+        self.assertEqual(self.mock_cursor.execute.call_args[0][1], ('arcene', 1))
+        self.mock_cursor.rowcount = 1
+        self.assertTrue(self.db.set_language(1, 'en', tenant_id='arcene'))
+        self.assertEqual(self.mock_cursor.execute.call_args[0][1][-2:], ['arcene', 1])
+
+    def test_take_pending_notifications(self):
+        self.mock_cursor.fetchall.return_value = [(1, None, 'daily', 3, -1, 'it')]
+        self.mock_cursor.description = [('user_id',), ('address',), ('delivery_mode',), ('digest_days',), ('waste_mask',), ('language',)]
+        users = self.db.take_pending_notifications(datetime.date(2025, 3, 1))
+        self.assertEqual(users[0]['user_id'], 1)
+        self.mock_conn.commit.assert_called()
+
+    def test_copy_events(self):
+        created_at = datetime.datetime(2025, 3, 31, 22, 0, tzinfo=datetime.timezone.utc)
+        events = [(created_at, 'calvenzano', 'command', 'oggi', 1, None), (created_at, 'arcene', 'notification_failed', '20:00', 2, 'Forbidden, "blocked"')]
+        self.assertEqual(self.db.copy_events(events), 2)
+
+        ddl = self.mock_cursor.execute.call_args[0][0]
+        self.assertIn("usage_events_2025_03 PARTITION OF usage_events", ddl)
+        self.assertIn("TO ('2025-04-01 00:00+00')", ddl)
+        copied = self.mock_cursor.copy_expert.call_args[0][1].getvalue()
+        self.assertIn('\tcalvenzano\tcommand\toggi\t1\t\\N\n', copied)
+        self.assertIn('\tForbidden, "blocked"\n', copied)
+
+        # La partizione esiste già: niente DDL al blocco successivo
+        self.mock_cursor.execute.reset_mock()
+        self.db.copy_events(events)
+        self.mock_cursor.execute.assert_not_called()
+
+    def test_copy_events_keeps_empty_strings(self):
+        created_at = datetime.datetime(2025, 3, 1, tzinfo=datetime.timezone.utc)
+        self.db.copy_events([(created_at, None, 'command', '', 1, 'riga 1\nriga\t2 \\N')])
+        copied = self.mock_cursor.copy_expert.call_args[0][1].getvalue()
+        # NULL e stringa vuota restano distinti; tab, a capo e backslash non spezzano la riga
+        self.assertEqual(copied.split('\t')[1:], ['\\N', 'command', '', '1', 'riga 1\\nriga\\t2 \\\\N\n'])
+
+    def test_copy_events_rolls_back(self):
+        self.mock_cursor.copy_expert.side_effect = psycopg2.OperationalError("connection lost")
+        with self.assertRaises(psycopg2.OperationalError):
+            self.db.copy_events([(datetime.datetime(2025, 3, 1, tzinfo=datetime.timezone.utc), 'calvenzano', 'command', 'oggi', 1, None)])
+        self.mock_conn.rollback.assert_called_once()
+
+    def test_without_replica_reads_use_primary(self):
+        self.mock_cursor.fetchall.return_value = []
+        checkouts = self.db.pool_metrics()[ROLE_PRIMARY]['checkouts']
+        self.db.get_all_users_for_notification()
+        self.assertEqual(self.db.pool_metrics()[ROLE_PRIMARY]['checkouts'], checkouts + 1)
+        self.assertEqual(self.db.pool_metrics()[ROLE_REPLICA]['checkouts'], 0)
+
+
+class TestDatabaseManagerReplica(unittest.TestCase):
+
+    @patch('db_manager.psycopg2.pool.SimpleConnectionPool')
+    def setUp(self, mock_pool):
+        self.primary_pool = MagicMock()
+        self.replica_pool = MagicMock()
+        self.primary_conn = MagicMock()
+        self.replica_conn = MagicMock()
+        self.primary_pool.getconn.return_value = self.primary_conn
+        self.replica_pool.getconn.return_value = self.replica_conn
+        self.primary_conn.cursor.return_value.__enter__.return_value.rowcount = 1
+        mock_pool.side_effect = [self.primary_pool, self.replica_pool]
+        self.db = DatabaseManager('dbname=primary', 'dbname=replica')
+
+    def test_bulk_reads_use_replica(self):
+        self.replica_conn.cursor.return_value.__enter__.return_value.fetchall.return_value = []
+        self.db.get_users_for_slot('20:00', 1)
+        self.db.get_all_users_for_notification()
+        self.assertEqual(self.replica_pool.putconn.call_count, 2)
+        metrics = self.db.pool_metrics()
+        self.assertEqual(metrics[ROLE_REPLICA]['checkouts'], 2)
+        self.assertEqual(metrics[ROLE_REPLICA]['in_use'], 0)
+
+    def test_writes_use_primary(self):
+        self.db.set_address(1, 'Via Roma 1')
+        self.primary_pool.putconn.assert_called_with(self.primary_conn)
+        self.replica_pool.getconn.assert_not_called()
+
+    def test_read_your_writes(self):
+        self.replica_conn.cursor.return_value.__enter__.return_value.fetchone.return_value = None
+        self.primary_conn.cursor.return_value.__enter__.return_value.fetchone.return_value = None
+
+        self.db.get_user(1)
+        self.replica_pool.getconn.assert_called_once()
+
+        # Appena scritto, l'utente si rilegge dal primario; gli altri utenti restano sulla replica
+        self.db.set_language(1, 'en')
+        self.db.get_user(1)
+        self.replica_pool.getconn.assert_called_once()
+        self.db.get_user(2)
+        self.assertEqual(self.replica_pool.getconn.call_count, 2)
+
+        # Passata la finestra di ritardo si torna alla replica
+        with patch('db_manager.time.monotonic', return_value=10 ** 9):
+            self.db.get_user(1)
+        self.assertEqual(self.replica_pool.getconn.call_count, 3)
+
+    def test_replica_failure_falls_back_to_primary(self):
+        self.replica_pool.getconn.side_effect = psycopg2.pool.PoolError("connection pool exhausted")
+        self.primary_conn.cursor.return_value.__enter__.return_value.fetchall.return_value = []
+        self.assertEqual(self.db.get_all_users_for_notification(), [])
+        self.primary_pool.putconn.assert_called_with(self.primary_conn)
+        self.assertEqual(self.db.pool_metrics()[ROLE_REPLICA]['fallbacks'], 1)
+
+    def test_broken_replica_connection_is_discarded(self):
+        # La replica è stata riavviata: il pool restituisce una connessione che fallisce alla query
+        replica_cursor = self.replica_conn.cursor.return_value.__enter__.return_value
+        replica_cursor.execute.side_effect = psycopg2.OperationalError("server closed the connection unexpectedly")
+        self.primary_conn.cursor.return_value.__enter__.return_value.fetchall.return_value = [(1,)]
+        self.primary_conn.cursor.return_value.__enter__.return_value.description = [('user_id',)]
+
+        self.assertEqual(self.db.get_users_for_slot('20:00', 1), [{'user_id': 1}])
+        self.replica_pool.putconn.assert_called_once_with(self.replica_conn, close=True)
+        self.primary_pool.putconn.assert_called_with(self.primary_conn)
+        metrics = self.db.pool_metrics()
+        self.assertEqual(metrics[ROLE_REPLICA]['errors'], 1)
+        self.assertEqual(metrics[ROLE_REPLICA]['fallbacks'], 1)
+        self.assertEqual(metrics[ROLE_REPLICA]['in_use'], 0)
+        self.assertEqual(metrics[ROLE_PRIMARY]['in_use'], 0)
+
+    def test_broken_primary_connection_is_not_retried(self):
+        with patch('db_manager.time.monotonic', return_value=0):
+            self.db.set_address(1, 'Via Roma 1')
+            self.primary_conn.cursor.return_value.__enter__.return_value.execute.side_effect = psycopg2.OperationalError("gone")
+            with self.assertRaises(psycopg2.OperationalError):
+                self.db.get_user(1)
+        self.replica_pool.getconn.assert_not_called()
+        self.assertEqual(self.db.pool_metrics()[ROLE_PRIMARY]['in_use'], 0)
+
+    def test_close_closes_both_pools(self):
+        self.db.close()
+        self.primary_pool.closeall.assert_called_once()
+        self.replica_pool.closeall.assert_called_once()
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+import datetime
+import os
+import sqlite3
+import tempfile
+
+from db_manager import open_database
+from db_sqlite import SQLiteDatabaseManager
+
+class TestSQLiteDatabaseManager(unittest.TestCase):
+    """Integration tests on a real SQLite file: same calls as the PostgreSQL manager."""
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'bot.db')
+        self.db = open_database(f'sqlite:///{self.path}')
+        self.addCleanup(lambda: self.db.close())
+
+    def test_open_database(self):
+        self.assertIsInstance(self.db, SQLiteDatabaseManager)
+        with sqlite3.connect(self.path) as connection:
+            self.assertEqual(connection.execute("PRAGMA journal_mode").fetchone()[0], 'wal')
+
+    def test_create_and_update_user(self):
+        self.assertTrue(self.db.create_user(1, 'test', 'Test', 'User', 'en'))
+        self.assertFalse(self.db.create_user(1, 'test', 'Test', 'User'))
+        self.assertTrue(self.db.set_address(1, 'Via Roma 1'))
+        self.assertTrue(self.db.set_notification_time(1, '18:30'))
+        self.assertTrue(self.db.set_notifications_enabled(1, False))
+        self.assertFalse(self.db.set_language(2, 'en'))
+
+        user = self.db.get_user(1)
+        self.assertEqual(user['address'], 'Via Roma 1')
+        self.assertEqual(user['notification_time'], '18:30')
+        self.assertIs(user['notifications_enabled'], False)
+        self.assertEqual(user['language'], 'en')
+        self.assertEqual(user['waste_mask'], -1)
+        self.assertIsInstance(user['updated_at'], datetime.datetime)
+        self.assertIsNone(self.db.get_user(2))
+
+    def test_slots(self):
+        for user_id, slot, mask in [(1, '20:00', -1), (2, '20:00', 0b0001), (3, '07:30', 0b1000)]:
+            self.db.create_user(user_id)
+            self.db.set_notification_time(user_id, slot)
+            self.db.set_waste_mask(user_id, mask)
+        self.db.create_user(4)
+        self.db.set_notifications_enabled(4, False)
+
+        self.assertEqual(sorted(self.db.get_notification_slots()), ['07:30', '20:00'])
+        users = self.db.get_users_for_slot('20:00', 0b1000)
+        self.assertEqual([user['user_id'] for user in users], [1])
+        self.assertEqual(set(users[0]), {'user_id', 'address', 'delivery_mode', 'digest_days', 'waste_mask', 'language'})
+        self.assertEqual(len(self.db.get_all_users_for_notification()), 3)
+
+    def test_tenants_are_isolated(self):
+        self.db.create_user(1, first_name='Calvenzano')
+        self.db.create_user(1, first_name='Arcene', tenant_id='arcene')
+        self.db.set_notification_time(1, '07:00', tenant_id='arcene')
+
+        self.assertEqual(self.db.get_user(1)['notification_time'], '20:00')
+        self.assertEqual(self.db.get_user(1, 'arcene')['first_name'], 'Arcene')
+        self.assertEqual(self.db.get_notification_slots('arcene'), ['07:00'])
+
+    def test_pending_notifications(self):
+        tomorrow = datetime.date(2025, 3, 1)
+        for user_id in (1, 2, 3):
+            self.db.create_user(user_id)
+        self.db.set_notifications_enabled(3, False)
+
+        self.assertEqual(self.db.save_pending_notifications(datetime.date(2025, 2, 28), [1]), 1)
+        self.assertEqual(self.db.save_pending_notifications(tomorrow, [1, 2, 3]), 3)
+        self.assertEqual(self.db.save_pending_notifications(tomorrow, [1]), 1)
+
+        users = self.db.take_pending_notifications(tomorrow)
+        self.assertEqual(sorted(user['user_id'] for user in users), [1, 2])
+        self.assertEqual(self.db.take_pending_notifications(tomorrow), [])
+
+    def test_copy_events(self):
+        created_at = datetime.datetime(2025, 3, 31, 22, 0, tzinfo=datetime.timezone.utc)
+        events = [(created_at, 'calvenzano', 'command', 'oggi', 1, None), (created_at, None, 'throttled', 'domani', 2, 'x')]
+        self.assertEqual(self.db.copy_events(events), 2)
+
+        with sqlite3.connect(self.path) as connection:
+            rows = connection.execute("SELECT tenant_id, kind, name, user_id FROM usage_events ORDER BY user_id").fetchall()
+        self.assertEqual(rows, [('calvenzano', 'command', 'oggi', 1), (None, 'throttled', 'domani', 2)])
+
+    def test_failed_write_is_rolled_back(self):
+        self.db.create_user(1)
+        with self.assertRaises(sqlite3.OperationalError):
+            self.db.update_user(1, no_such_column='x')
+        # La connessione è di nuovo utilizzabile e nessun lock è rimasto appeso
+        self.assertTrue(self.db.set_address(1, 'Via Roma 1'))
+        self.assertEqual(self.db.pool_metrics()['primary']['in_use'], 0)
+
+    def test_reopen_keeps_data(self):
+        self.db.create_user(1, language='en')
+        self.db.close()
+        self.db = open_database(f'sqlite:///{self.path}')
+        self.assertEqual(self.db.get_user(1)['language'], 'en')
+
+if __name__ == '__main__':
+    unittest.main()
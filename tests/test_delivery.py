@@ -0,0 +1,51 @@
+import unittest
+import datetime
+
+from service.delivery import (
+    DeliveryPreference, preference_for, build_notification, digest_start_days,
+    ALL_WASTE_MASK, DELIVERY_DIGEST
+)
+from service.calendar import CALENDAR, CollectionCalendar
+
+class TestDelivery(unittest.TestCase):
+
+    def test_preference_for(self):
+        self.assertEqual(preference_for({}), DeliveryPreference())
+        preference = preference_for({'delivery_mode': 'digest', 'digest_days': 30, 'waste_mask': CALENDAR.bits['PLASTICA']})
+        self.assertEqual(preference.mode, DELIVERY_DIGEST)
+        self.assertEqual(preference.digest_days, 7)
+        self.assertEqual(preference.waste_mask, CALENDAR.bits['PLASTICA'])
+
+    def test_all_waste_mask(self):
+        self.assertEqual(preference_for({'waste_mask': -1}).waste_mask, ALL_WASTE_MASK)
+        self.assertEqual(preference_for({'waste_mask': None}).waste_mask, ALL_WASTE_MASK)
+
+    def test_mask_of_types_not_collected(self):
+        calendar = CollectionCalendar({'PLASTICA': {3: [1]}})
+        # Un filtro sul solo vetro, che il comune non raccoglie, non diventa "tutti i rifiuti"
+        self.assertEqual(preference_for({'waste_mask': CALENDAR.bits['VETRO E BARATTOLAME']}, calendar).waste_mask, 0)
+        self.assertEqual(preference_for({'waste_mask': -1}, calendar).waste_mask, calendar.bits['PLASTICA'])
+
+    def test_daily_notification(self):
+        message, waste_types = build_notification(datetime.date(2025, 3, 1), DeliveryPreference())
+        self.assertIn('PLASTICA', message)
+        self.assertEqual(waste_types, ('CARTA E CARTONE', 'ORGANICO', 'PLASTICA'))
+        self.assertEqual(build_notification(datetime.date(2025, 3, 3), DeliveryPreference()), (None, ()))
+
+    def test_daily_notification_filtered(self):
+        preference = DeliveryPreference(waste_mask=CALENDAR.bits['VETRO E BARATTOLAME'])
+        self.assertEqual(build_notification(datetime.date(2025, 3, 1), preference), (None, ()))
+
+    def test_digest_does_not_repeat_days(self):
+        preference = DeliveryPreference(DELIVERY_DIGEST, 3, ALL_WASTE_MASK)
+        starts = sorted(digest_start_days(preference.waste_mask, preference.digest_days, 2025))
+        self.assertTrue(all((b - a).days >= 3 for a, b in zip(starts, starts[1:])))
+
+        # Mercoledì 26 febbraio copre anche tessili (27) e vetro (28)
+        message, _ = build_notification(datetime.date(2025, 2, 26), preference)
+        self.assertIn('TESSILI E INDUMENTI', message)
+        self.assertIn('VETRO E BARATTOLAME', message)
+        self.assertEqual(build_notification(datetime.date(2025, 2, 27), preference), (None, ()))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,107 @@
+import unittest
+import asyncio
+from unittest.mock import MagicMock
+
+from service.events import EventLog
+
+
+class TestEventLog(unittest.TestCase):
+
+    def test_flush_writes_batch(self):
+        writer = MagicMock()
+        log = EventLog(capacity=10, flush_size=100)
+        log._writer = writer
+        log.record('command', 'oggi', 1)
+        log.record('command', 'domani', 2)
+
+        self.assertEqual(log.flush(), 2)
+        events = writer.call_args[0][0]
+        self.assertEqual([(kind, name, user_id) for _, _, kind, name, user_id, _ in events], [('command', 'oggi', 1), ('command', 'domani', 2)])
+        self.assertEqual(len(log), 0)
+        self.assertEqual(log.flush(), 0)
+
+    def test_ring_buffer_drops_oldest(self):
+        log = EventLog(capacity=3)
+        for user_id in range(5):
+            log.record('command', 'oggi', user_id)
+        self.assertEqual(len(log), 3)
+        self.assertEqual(log.stats()['dropped'], 2)
+        self.assertEqual([event[4] for event in log._buffer], [2, 3, 4])
+
+    def test_failed_flush_requeues(self):
+        writer = MagicMock(side_effect=RuntimeError("database down"))
+        log = EventLog(capacity=10)
+        log._writer = writer
+        log.record('command', 'oggi', 1)
+        log.record('command', 'domani', 2)
+
+        with self.assertLogs('service.events', level='WARNING'):
+            self.assertEqual(log.flush(), 0)
+        self.assertEqual(len(log), 2)
+        self.assertEqual(log.stats()['flush_failures'], 1)
+
+        writer.side_effect = None
+        self.assertEqual(log.flush(), 2)
+        self.assertEqual([event[3] for event in writer.call_args[0][0]], ['oggi', 'domani'])
+
+    def test_long_names_are_truncated(self):
+        log = EventLog()
+        log.record('command', 'x' * 200)
+        self.assertEqual(len(log._buffer[0][3]), 64)
+
+    def test_empty_names_are_replaced(self):
+        log = EventLog()
+        log.record('command', '')
+        self.assertEqual(log._buffer[0][3], 'other')
+
+
+class TestEventLogFlushing(unittest.IsolatedAsyncioTestCase):
+
+    async def test_flush_on_size(self):
+        writer = MagicMock()
+        log = EventLog(capacity=10, flush_interval=3600, flush_size=3)
+        log.start(writer)
+        for user_id in range(3):
+            log.record('command', 'oggi', user_id)
+        writer.assert_not_called()
+
+        await asyncio.sleep(0)
+        self.assertEqual(len(writer.call_args[0][0]), 3)
+        log.stop()
+
+    async def test_failed_flush_pauses_size_flushes(self):
+        writer = MagicMock(side_effect=RuntimeError("database down"))
+        log = EventLog(capacity=1000, flush_interval=3600, flush_size=10)
+        log.start(writer)
+        with self.assertLogs('service.events', level='WARNING'):
+            for user_id in range(200):
+                log.record('command', 'oggi', user_id)
+                await asyncio.sleep(0)
+        # Un solo tentativo: con il database giù ogni evento non deve innescare un'altra scrittura
+        writer.assert_called_once()
+        self.assertEqual(len(log), 200)
+
+        # Il flush periodico riprova; se riesce, i flush per dimensione ripartono
+        writer.side_effect = None
+        self.assertEqual(log.flush(), 200)
+        for user_id in range(10):
+            log.record('command', 'oggi', user_id)
+        await asyncio.sleep(0)
+        self.assertEqual(writer.call_count, 3)
+        log.stop()
+
+    async def test_flush_on_interval_and_stop(self):
+        writer = MagicMock()
+        log = EventLog(capacity=10, flush_interval=0.01, flush_size=100)
+        log.start(writer)
+        log.record('command', 'oggi', 1)
+        await asyncio.sleep(0.05)
+        writer.assert_called_once()
+
+        log.record('command', 'domani', 1)
+        with self.assertLogs('service.events', level='INFO'):
+            self.assertEqual(log.stop(), 1)
+        self.assertEqual(log.stats()['flushed'], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 
 import unittest
+import datetime
 import os
 from unittest.mock import patch, MagicMock, AsyncMock
 
@@ -8,55 +9,193 @@ from unittest.mock import patch, MagicMock, AsyncMock
 with patch.dict(os.environ, {'DATABASE_URL': 'dbname=test'}):
     with patch('db_manager.DatabaseManager') as MockDatabaseManager:
         MockDatabaseManager.return_value = MagicMock()
-        from commands.handlers import start, check_today, check_tomorrow, show_info, stop_notifications, restart_notifications
+        from commands.handlers import start, check_today, check_tomorrow, check_week, check_month, render_day, render_period, show_info, stop_notifications, restart_notifications, set_digest_mode, set_waste_types, set_language, reload_schedule_command
+        from service.calendar import CALENDAR
+        from service.i18n import translate, format_date
+        from service.tenants import Tenant
 
 class TestHandlers(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
         # Patch the db instance that was already imported
         self.mock_db = patch('commands.handlers.db').start()
+        self.mock_db.get_user.return_value = None
         self.addCleanup(patch.stopall)
 
+    def make_context(self):
+        context = AsyncMock()
+        context.user_data = {}
+        context.bot_data = {}
+        context.job_queue = MagicMock()
+        context.job_queue.get_jobs_by_name.return_value = []
+        return context
+
     async def test_start(self):
         update = AsyncMock()
-        context = AsyncMock()
+        context = self.make_context()
         self.mock_db.get_user.return_value = None
         await start(update, context)
         update.message.reply_text.assert_called()
 
     async def test_check_today(self):
         update = AsyncMock()
-        context = AsyncMock()
+        context = self.make_context()
         await check_today(update, context)
         update.message.reply_text.assert_called_once()
 
     async def test_check_tomorrow(self):
         update = AsyncMock()
-        context = AsyncMock()
+        context = self.make_context()
         await check_tomorrow(update, context)
         update.message.reply_text.assert_called_once()
 
+    async def test_check_week(self):
+        update = AsyncMock()
+        context = self.make_context()
+        await check_week(update, context)
+        update.message.reply_text.assert_called_once()
+
+    async def test_check_month(self):
+        update = AsyncMock()
+        context = self.make_context()
+        await check_month(update, context)
+        update.message.reply_text.assert_called_once()
+
+    def test_render_day(self):
+        # 1 marzo 2025: raccolta della plastica; 2 marzo: nessuna raccolta
+        self.assertIn('PLASTICA', render_day(datetime.date(2025, 3, 1), "tomorrow"))
+        self.assertEqual(
+            render_day(datetime.date(2025, 3, 2), "today", "en"),
+            translate("en", "today_empty", date=format_date("en", datetime.date(2025, 3, 2)))
+        )
+
+    def test_render_period(self):
+        # Sabato 1 marzo 2025: carta, organico e plastica
+        text = render_period(datetime.date(2025, 2, 24), datetime.date(2025, 3, 2), "Settimana")
+        self.assertIn("Sabato 1: ", text)
+        self.assertIn("PLASTICA", text)
+        self.assertIs(text, render_period(datetime.date(2025, 2, 24), datetime.date(2025, 3, 2), "Settimana"))
+
     async def test_show_info(self):
         update = AsyncMock()
-        context = AsyncMock()
+        context = self.make_context()
         await show_info(update, context)
         update.message.reply_text.assert_called_once()
 
+    async def test_show_info_tenant(self):
+        update = AsyncMock()
+        context = self.make_context()
+        context.bot_data['tenant'] = Tenant('arcene', 'Arcene', 'token', CALENDAR, 2025, {})
+        await show_info(update, context)
+        text = update.message.reply_text.call_args[0][0]
+        self.assertIn("PLASTICA", text)
+        self.assertNotIn("CENTRO DI RACCOLTA", text)
+
+    async def test_stop_notifications_tenant(self):
+        update = AsyncMock()
+        context = self.make_context()
+        context.bot_data['tenant'] = Tenant('arcene', 'Arcene', 'token', CALENDAR, 2025, {})
+        update.effective_user.id = 1
+        await stop_notifications(update, context)
+        self.mock_db.get_user.assert_called_with(1, 'arcene')
+        self.mock_db.set_notifications_enabled.assert_called_with(1, False, tenant_id='arcene')
+
     async def test_stop_notifications(self):
         update = AsyncMock()
-        context = AsyncMock()
+        context = self.make_context()
         update.effective_user.id = 1
         await stop_notifications(update, context)
-        self.mock_db.set_notifications_enabled.assert_called_with(1, False)
+        self.mock_db.set_notifications_enabled.assert_called_with(1, False, tenant_id='calvenzano')
         update.message.reply_text.assert_called_with('Notifiche disattivate. Usa /start per riattivarle.')
 
     async def test_restart_notifications(self):
         update = AsyncMock()
-        context = AsyncMock()
+        context = self.make_context()
         update.effective_user.id = 1
         context.job_queue.get_jobs_by_name = MagicMock(return_value=[])
         await restart_notifications(update, context)
-        self.mock_db.set_notifications_enabled.assert_called_with(1, True)
+        self.mock_db.set_notifications_enabled.assert_called_with(1, True, tenant_id='calvenzano')
+        context.job_queue.run_once.assert_called_once()
         update.message.reply_text.assert_called_with('Notifiche riattivate. Riceverai informazioni sulla raccolta differenziata.')
 
+    async def test_set_digest_mode(self):
+        update = AsyncMock()
+        context = self.make_context()
+        update.effective_user.id = 1
+        context.args = ['4']
+        await set_digest_mode(update, context)
+        self.mock_db.set_delivery_mode.assert_called_with(1, 'digest', 4, tenant_id='calvenzano')
+
+    async def test_set_digest_mode_invalid(self):
+        update = AsyncMock()
+        context = self.make_context()
+        context.args = ['30']
+        await set_digest_mode(update, context)
+        self.mock_db.set_delivery_mode.assert_not_called()
+
+    async def test_set_waste_types(self):
+        update = AsyncMock()
+        context = self.make_context()
+        update.effective_user.id = 1
+        context.args = ['Plastica', 'carta']
+        await set_waste_types(update, context)
+        self.mock_db.set_waste_mask.assert_called_with(1, 0b1001, tenant_id='calvenzano')
+
+    async def test_language_from_telegram(self):
+        update = AsyncMock()
+        context = self.make_context()
+        update.effective_user.language_code = 'en-GB'
+        await stop_notifications(update, context)
+        self.assertEqual(context.user_data['language'], 'en')
+        update.message.reply_text.assert_called_with('Notifications disabled. Use /start to enable them again.')
+
+    async def test_language_from_database(self):
+        update = AsyncMock()
+        context = self.make_context()
+        update.effective_user.language_code = 'it'
+        self.mock_db.get_user.return_value = {'language': 'en'}
+        await stop_notifications(update, context)
+        self.assertEqual(context.user_data['language'], 'en')
+
+    async def test_render_period_language(self):
+        text = render_period(datetime.date(2025, 2, 24), datetime.date(2025, 3, 2), "Week", "en")
+        self.assertIn("Saturday 1: ", text)
+        self.assertIn("PLASTIC", text)
+
+    async def test_set_language(self):
+        update = AsyncMock()
+        context = self.make_context()
+        update.effective_user.id = 1
+        context.args = ['EN']
+        await set_language(update, context)
+        self.mock_db.set_language.assert_called_with(1, 'en', tenant_id='calvenzano')
+        self.assertEqual(context.user_data['language'], 'en')
+
+    async def test_set_language_unknown(self):
+        update = AsyncMock()
+        context = self.make_context()
+        context.args = ['xx']
+        await set_language(update, context)
+        self.mock_db.set_language.assert_not_called()
+
+    async def test_reload_schedule_command(self):
+        update = AsyncMock()
+        context = self.make_context()
+        update.effective_user.id = 42
+        with patch('commands.handlers.reload_schedule') as mock_reload:
+            # Chi non è amministratore non riceve risposta
+            await reload_schedule_command(update, context)
+            mock_reload.assert_not_called()
+
+            with patch('commands.handlers.ADMIN_USER_IDS', {42}):
+                mock_reload.return_value = {'changed_days': 3, 'replanned_slots': 1}
+                await reload_schedule_command(update, context)
+                update.message.reply_text.assert_called_with(
+                    'Calendario aggiornato: 3 giorni di raccolta cambiati, 1 orari di notifica ripianificati.'
+                )
+
+                mock_reload.side_effect = ValueError("schedule.json: JSON non valido")
+                await reload_schedule_command(update, context)
+                self.assertIn('JSON non valido', update.message.reply_text.call_args[0][0])
+
 if __name__ == '__main__':
     unittest.main()
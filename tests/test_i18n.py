@@ -0,0 +1,46 @@
+import unittest
+import datetime
+from service.i18n import Catalog, translate, resolve_language, format_date, format_waste_list
+
+
+class TestCatalog(unittest.TestCase):
+    def test_render(self):
+        catalog = Catalog({
+            'it': {'hello': "Ciao {name}!", 'bye': "Ciao"},
+            'en': {'hello': "Hello {name}!"},
+        }, 'it')
+        self.assertEqual(catalog.languages, ('it', 'en'))
+        self.assertEqual(catalog.render('en', 'hello', name="Anna"), "Hello Anna!")
+        # Chiave mancante nella traduzione: testo di riferimento
+        self.assertEqual(catalog.render('en', 'bye'), "Ciao")
+        # Lingua sconosciuta: lingua di riferimento
+        self.assertEqual(catalog.render('fr', 'hello', name="Anna"), "Ciao Anna!")
+
+    def test_invalid_placeholders_fall_back(self):
+        with self.assertLogs('service.i18n', level='WARNING'):
+            catalog = Catalog({
+                'it': {'hello': "Ciao {name}!"},
+                'en': {'hello': "Hello {nome}!"},
+            }, 'it')
+        self.assertEqual(catalog.render('en', 'hello', name="Anna"), "Ciao Anna!")
+
+    def test_every_language_renders_every_key(self):
+        for language in ('it', 'en'):
+            self.assertIn("/start", translate(language, 'notifications_stopped'))
+
+    def test_resolve_language(self):
+        self.assertEqual(resolve_language('en-US'), 'en')
+        self.assertEqual(resolve_language('IT'), 'it')
+        self.assertEqual(resolve_language('de'), 'it')
+        self.assertEqual(resolve_language(None), 'it')
+
+    def test_format_date(self):
+        date = datetime.date(2025, 3, 1)
+        self.assertEqual(format_date('it', date), "Sabato 1 Marzo")
+        self.assertEqual(format_date('en', date), "Saturday 1 March")
+
+    def test_format_waste_list(self):
+        self.assertEqual(format_waste_list('it', ('CARTA E CARTONE',), bold=True), "📦 **CARTA E CARTONE**")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import gzip
+
+from service.ics import build_ics, build_feeds, slugify, FeedServer, COMBINED_FEED_PATH
+
+class TestIcs(unittest.TestCase):
+
+    def setUp(self):
+        self.feeds = build_feeds()
+        self.server = FeedServer(self.feeds)
+
+    def test_build_ics(self):
+        body = build_ics({'PLASTICA'}, 'Plastica').decode('utf-8')
+        self.assertTrue(body.startswith('BEGIN:VCALENDAR\r\n'))
+        self.assertIn('DTSTART;VALUE=DATE:20250301', body)
+        self.assertNotIn('ORGANICO', body)
+        self.assertTrue(all(len(line.encode('utf-8')) <= 75 for line in body.split('\r\n')))
+
+    def test_feed_paths(self):
+        self.assertEqual(slugify('VETRO E BARATTOLAME'), 'vetro-e-barattolame')
+        self.assertIn('/calendar/carta-e-cartone.ics', self.feeds)
+        self.assertEqual(len(self.feeds), 7)
+
+    def test_feed_prefix(self):
+        feeds = build_feeds(town='Arcene', prefix='/arcene')
+        self.assertIn('/arcene/calendar.ics', feeds)
+        self.assertIn('/arcene/calendar/plastica.ics', feeds)
+        self.assertIn(b'X-WR-CALNAME:Raccolta rifiuti Arcene', feeds['/arcene/calendar.ics'].body)
+
+    def test_replace_feeds(self):
+        self.server.feeds = {**self.feeds, **build_feeds(town='Arcene', prefix='/arcene')}
+        self.server.replace_feeds({'/calendar.ics': self.feeds['/calendar/plastica.ics']})
+        self.assertNotIn('/calendar/carta-e-cartone.ics', self.server.feeds)
+        self.assertIs(self.server.feeds['/calendar.ics'], self.feeds['/calendar/plastica.ics'])
+        self.assertIn('/arcene/calendar/carta-e-cartone.ics', self.server.feeds)
+
+    def test_respond_gzip(self):
+        status, headers, body = self.server.respond('GET', COMBINED_FEED_PATH, {'accept-encoding': 'gzip, br'})
+        self.assertEqual(status, 200)
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(body), self.feeds[COMBINED_FEED_PATH].body)
+
+    def test_respond_not_modified(self):
+        etag = self.feeds[COMBINED_FEED_PATH].etag
+        status, _, body = self.server.respond('GET', COMBINED_FEED_PATH, {'if-none-match': etag})
+        self.assertEqual(status, 304)
+        self.assertEqual(body, b'')
+
+    def test_respond_errors(self):
+        self.assertEqual(self.server.respond('GET', '/nope.ics', {})[0], 404)
+        self.assertEqual(self.server.respond('POST', COMBINED_FEED_PATH, {})[0], 405)
+
+if __name__ == '__main__':
+    unittest.main()
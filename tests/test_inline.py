@@ -0,0 +1,52 @@
+import unittest
+import datetime
+from unittest.mock import AsyncMock
+
+from commands.inline import parse_date_query, build_date_article, inline_query
+
+def make_context():
+    context = AsyncMock()
+    context.bot_data = {}
+    return context
+
+class TestInline(unittest.IsolatedAsyncioTestCase):
+
+    def test_parse_date_query(self):
+        today = datetime.date(2025, 11, 12)  # Mercoledì
+        self.assertEqual(parse_date_query("domani", today), datetime.date(2025, 11, 13))
+        self.assertEqual(parse_date_query("Sabato", today), datetime.date(2025, 11, 15))
+        self.assertEqual(parse_date_query("mercoledì", today), today)
+        self.assertEqual(parse_date_query("15/11", today), datetime.date(2025, 11, 15))
+        self.assertEqual(parse_date_query("1.3.25", today), datetime.date(2025, 3, 1))
+        self.assertIsNone(parse_date_query("31/02", today))
+        self.assertIsNone(parse_date_query("ciao", today))
+
+    def test_build_date_article_is_cached(self):
+        date = datetime.date(2025, 3, 1)
+        article = build_date_article(date, 'it')
+        self.assertIs(article, build_date_article(date, 'it'))
+        self.assertIn('PLASTICA', article.input_message_content.message_text)
+
+    def test_build_date_article_language(self):
+        article = build_date_article(datetime.date(2025, 3, 1), 'en')
+        self.assertEqual(article.title, 'Saturday 1 March')
+        self.assertIsNot(article, build_date_article(datetime.date(2025, 3, 1), 'it'))
+
+    async def test_inline_query(self):
+        update = AsyncMock()
+        update.inline_query.query = "15/11"
+        await inline_query(update, make_context())
+        args, kwargs = update.inline_query.answer.call_args
+        self.assertEqual(len(args[0]), 1)
+        self.assertGreater(kwargs['cache_time'], 0)
+        self.assertTrue(kwargs['is_personal'])
+
+    async def test_inline_query_unknown_text(self):
+        update = AsyncMock()
+        update.inline_query.query = "boh"
+        await inline_query(update, make_context())
+        args, _ = update.inline_query.answer.call_args
+        self.assertEqual(args[0], [])
+
+if __name__ == '__main__':
+    unittest.main()
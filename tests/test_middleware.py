@@ -0,0 +1,118 @@
+import unittest
+from unittest.mock import AsyncMock, MagicMock
+from telegram.ext import ApplicationHandlerStop
+from commands.middleware import TokenBucket, UpdateThrottle, update_kind
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def make_update(update_id, user_id=1, text=None, callback_data=None):
+    update = AsyncMock()
+    update.update_id = update_id
+    update.effective_user.id = user_id
+    update.effective_user.language_code = 'it'
+    update.inline_query = None
+    if callback_data is None:
+        update.callback_query = None
+        update.message.text = text if text is not None else f"/cmd{update_id}"
+    else:
+        update.message = None
+        update.callback_query.data = callback_data
+    return update
+
+
+def make_context():
+    context = MagicMock()
+    context.user_data = {}
+    context.bot_data = {}
+    return context
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_refill(self):
+        bucket = TokenBucket(2, 0.0)
+        self.assertTrue(bucket.consume(1, 2, 0.0))
+        self.assertTrue(bucket.consume(1, 2, 0.0))
+        self.assertFalse(bucket.consume(1, 2, 0.5))
+        self.assertTrue(bucket.consume(1, 2, 1.0))
+
+
+class TestUpdateThrottle(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.throttle = UpdateThrottle(rate=1, burst=3, duplicate_window=2, clock=self.clock)
+
+    async def test_allows_burst_then_throttles(self):
+        for update_id in range(3):
+            await self.throttle(make_update(update_id), make_context())
+
+        update = make_update(3)
+        with self.assertRaises(ApplicationHandlerStop):
+            await self.throttle(update, make_context())
+        update.message.reply_text.assert_called_once()
+
+        # Un solo avviso per raffica
+        update = make_update(4)
+        with self.assertRaises(ApplicationHandlerStop):
+            await self.throttle(update, make_context())
+        update.message.reply_text.assert_not_called()
+        self.assertEqual(self.throttle.dropped_throttled, 2)
+
+        self.clock.now = 1.0
+        await self.throttle(make_update(5), make_context())
+
+    async def test_users_are_independent(self):
+        for update_id in range(3):
+            await self.throttle(make_update(update_id, user_id=1), make_context())
+        await self.throttle(make_update(3, user_id=2), make_context())
+
+    async def test_duplicate_request(self):
+        await self.throttle(make_update(1, text="/restart"), make_context())
+        with self.assertRaises(ApplicationHandlerStop):
+            await self.throttle(make_update(2, text="/restart"), make_context())
+        self.assertEqual(self.throttle.dropped_duplicates, 1)
+
+        # Fuori dalla finestra la stessa richiesta torna valida
+        self.clock.now = 2.5
+        await self.throttle(make_update(3, text="/restart"), make_context())
+
+    async def test_redelivered_update(self):
+        await self.throttle(make_update(7), make_context())
+        with self.assertRaises(ApplicationHandlerStop):
+            await self.throttle(make_update(7), make_context())
+
+    async def test_duplicate_callback_is_answered(self):
+        await self.throttle(make_update(1, callback_data="default"), make_context())
+        update = make_update(2, callback_data="default")
+        with self.assertRaises(ApplicationHandlerStop):
+            await self.throttle(update, make_context())
+        update.callback_query.answer.assert_called_once()
+
+    async def test_inline_queries_pass(self):
+        update = make_update(1)
+        update.inline_query = MagicMock()
+        for _ in range(10):
+            await self.throttle(update, make_context())
+
+    def test_update_kind(self):
+        self.assertEqual(update_kind(make_update(1, text="/oggi@CalvenzanoBot")), 'oggi')
+        self.assertEqual(update_kind(make_update(1, text="/digest 4")), 'digest')
+        self.assertEqual(update_kind(make_update(1, text="Via Roma 1")), 'text')
+        self.assertEqual(update_kind(make_update(1, text="/")), 'text')
+        self.assertEqual(update_kind(make_update(1, text="/@CalvenzanoBot")), 'text')
+        self.assertEqual(update_kind(make_update(1, callback_data="default")), 'default')
+
+    def test_bounded_users(self):
+        throttle = UpdateThrottle(max_users=2, clock=self.clock)
+        for user_id in range(5):
+            throttle.allow(user_id, 0.0)
+        self.assertEqual(list(throttle._buckets), [3, 4])
+
+if __name__ == '__main__':
+    unittest.main()
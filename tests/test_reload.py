@@ -0,0 +1,135 @@
+import unittest
+import asyncio
+import datetime
+import functools
+import itertools
+import json
+import os
+import tempfile
+from unittest.mock import patch, MagicMock, AsyncMock
+
+
+# Patch DatabaseManager before importing modules that use it
+with patch.dict(os.environ, {'DATABASE_URL': 'dbname=test'}):
+    with patch('db_manager.DatabaseManager') as MockDatabaseManager:
+        MockDatabaseManager.return_value = MagicMock()
+        from service.calendar import load_calendar
+        from service.reload import reload_schedule, reload_listeners, ScheduleWatcher
+        from service.schedule import notification_scheduler, replan_slots
+        from service.tenants import Tenant
+
+# Anno bisestile: qualunque (mese, giorno) è valido
+YEAR = 2024
+
+class TestReload(unittest.IsolatedAsyncioTestCase):
+
+    def setUp(self):
+        self.mock_db = patch('service.schedule.db').start()
+        self.mock_db.get_notification_slots.return_value = ['20:00', '07:00']
+        self.addCleanup(patch.stopall)
+        self.addCleanup(notification_scheduler.clear)
+
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'arcene.json')
+        # I calendari compilati restano nella directory del test, non nella cache di sistema
+        self.cache_dir = os.path.join(self.directory.name, 'cache')
+        patch('service.reload.load_calendar', functools.partial(load_calendar, cache_dir=self.cache_dir)).start()
+
+        today = datetime.date.today()
+        self.first = today + datetime.timedelta(days=10)
+        self.second = today + datetime.timedelta(days=20)
+        self.write_schedule([self.first])
+        self.tenant = Tenant('arcene', 'Arcene', 'token', load_calendar(self.path, YEAR, self.cache_dir), YEAR, {}, '/arcene', self.path)
+        self.bot = AsyncMock()
+
+    def write_schedule(self, dates):
+        schedule = {'PLASTICA': {}}
+        for date in dates:
+            schedule['PLASTICA'].setdefault(str(date.month), []).append(date.day)
+        with open(self.path, 'w', encoding='utf-8') as schedule_file:
+            json.dump(schedule, schedule_file)
+        # mtime diverso anche su filesystem a bassa risoluzione
+        os.utime(self.path, ns=(0, os.stat(self.path).st_mtime_ns + 1_000_000_000))
+
+    def fire_times(self):
+        return {slot: notification_scheduler.fire_time_of((self.tenant, slot)) for slot in ('20:00', '07:00')}
+
+    async def test_only_affected_slots_are_replanned(self):
+        self.assertEqual(replan_slots(self.tenant, self.bot), 2)
+        before = self.fire_times()
+
+        # Un giorno in più dopo la prossima raccolta: il calendario cambia, gli slot no
+        self.write_schedule([self.first, self.second])
+        report = reload_schedule(self.tenant, self.bot)
+        self.assertEqual(report, {'changed_days': 1, 'replanned_slots': 0})
+        self.assertEqual(self.fire_times(), before)
+        self.assertEqual(self.tenant.calendar.collections_on(self.second), ('PLASTICA',))
+
+        # La prossima raccolta viene spostata: entrambi gli slot vanno ripianificati
+        self.write_schedule([self.second])
+        report = reload_schedule(self.tenant, self.bot)
+        self.assertEqual(report, {'changed_days': 1, 'replanned_slots': 2})
+        self.assertEqual(self.fire_times()['20:00'].date(), self.second - datetime.timedelta(days=1))
+
+    async def test_reordered_file_keeps_stored_masks(self):
+        with open(self.path, 'w', encoding='utf-8') as schedule_file:
+            json.dump({'PLASTICA': {'3': [1]}, 'ORGANICO': {'3': [2]}}, schedule_file)
+        self.tenant.calendar = load_calendar(self.path, YEAR, self.cache_dir)
+        stored_mask = self.tenant.calendar.bits['ORGANICO']
+
+        # Stessi giorni, tipi in un altro ordine e un tipo in più: il filtro salvato non cambia significato
+        with open(self.path, 'w', encoding='utf-8') as schedule_file:
+            json.dump({'VETRO E BARATTOLAME': {'3': [3]}, 'ORGANICO': {'3': [2]}, 'PLASTICA': {'3': [1]}}, schedule_file)
+        self.assertEqual(reload_schedule(self.tenant, self.bot)['changed_days'], 1)
+        self.assertEqual(self.tenant.calendar.types_for_mask(stored_mask), ('ORGANICO',))
+        self.assertEqual(self.tenant.calendar.waste_types, ('ORGANICO', 'PLASTICA', 'VETRO E BARATTOLAME'))
+
+    async def test_unchanged_file(self):
+        calendar = self.tenant.calendar
+        self.assertIsNone(reload_schedule(self.tenant, self.bot))
+        self.assertIs(self.tenant.calendar, calendar)
+
+    async def test_invalid_file_keeps_calendar(self):
+        calendar = self.tenant.calendar
+        with open(self.path, 'w', encoding='utf-8') as schedule_file:
+            schedule_file.write('{"PLASTICA": {"3": [')
+        with self.assertRaises(ValueError):
+            reload_schedule(self.tenant, self.bot)
+        self.assertIs(self.tenant.calendar, calendar)
+
+    async def test_watcher_reloads_changed_files(self):
+        listener = MagicMock()
+        reload_listeners.append(listener)
+        self.addCleanup(reload_listeners.remove, listener)
+        watcher = ScheduleWatcher([(self.tenant, self.bot)], interval=0)
+
+        self.assertEqual(watcher.check(), [])
+        self.write_schedule([self.second])
+        self.assertEqual(watcher.check(), ['arcene'])
+        listener.assert_called_once_with(self.tenant)
+        self.assertEqual(watcher.check(), [])
+
+        # Un file non valido viene segnalato e ignorato fino alla prossima modifica
+        with open(self.path, 'w', encoding='utf-8') as schedule_file:
+            schedule_file.write('non json')
+        self.assertEqual(watcher.check(), [])
+        self.assertEqual(self.tenant.calendar.collections_on(self.second), ('PLASTICA',))
+
+    async def test_watcher_survives_unexpected_errors(self):
+        watcher = ScheduleWatcher([(self.tenant, self.bot)], interval=0.01)
+        self.write_schedule([self.second])
+        with patch('service.reload.reload_schedule', side_effect=AttributeError("bug")):
+            with self.assertLogs('service.reload', level='ERROR'):
+                self.assertEqual(watcher.check(), [])
+
+        # Anche un errore fuori dal ricaricamento non ferma il controllo periodico
+        with patch.object(watcher, 'check', side_effect=itertools.chain([RuntimeError("bug")], itertools.repeat([]))) as check:
+            with self.assertLogs('service.reload', level='ERROR'):
+                watcher.start()
+                await asyncio.sleep(0.05)
+            watcher.stop()
+        self.assertGreaterEqual(check.call_count, 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,9 @@
 
 import unittest
+import asyncio
+import datetime
 import os
+import pytz
 from unittest.mock import patch, MagicMock, AsyncMock
 
 
@@ -8,13 +11,21 @@ from unittest.mock import patch, MagicMock, AsyncMock
 with patch.dict(os.environ, {'DATABASE_URL': 'dbname=test'}):
     with patch('db_manager.DatabaseManager') as MockDatabaseManager:
         MockDatabaseManager.return_value = MagicMock()
-        from service.schedule import get_waste_collection, send_notification, schedule_tomorrow_notification
+        from service.tenants import Tenant, DEFAULT_TENANT
+        from service.scheduler import NotificationScheduler
+        from service.schedule import get_waste_collection, send_slot_notifications, schedule_tomorrow_notification, request_reschedule, next_fire_time, notification_scheduler, resume_pending_notifications, shutdown_notifications
+
+def make_tenant(calendar):
+    return Tenant('calvenzano', 'Calvenzano', 'token', calendar, 2025, {})
 
 class TestSchedule(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
         # Patch the db instance that was already imported
         self.mock_db = patch('service.schedule.db').start()
         self.addCleanup(patch.stopall)
+        self.addCleanup(notification_scheduler.clear)
+        # I test di arresto fermano lo scheduler condiviso
+        self.addCleanup(setattr, notification_scheduler, '_stopped', False)
 
     def test_get_waste_collection(self):
         # March 1st has PLASTICA scheduled
@@ -22,28 +33,146 @@ class TestSchedule(unittest.IsolatedAsyncioTestCase):
         print(f"Waste types for March 1st: {waste_types}") # Debugging print
         self.assertIn('PLASTICA', waste_types)
 
-    @patch('service.schedule.get_waste_collection')
-    async def test_send_notification(self, mock_get_waste_types): 
-        mock_get_waste_types.return_value = ["PLASTICA"] 
+    @patch('service.schedule.build_notification')
+    async def test_send_slot_notifications(self, mock_build_notification):
+        mock_calendar = MagicMock()
+        tenant = make_tenant(mock_calendar)
+        mock_build_notification.return_value = ("Domani: PLASTICA", ("PLASTICA",))
+        mock_calendar.mask_on.return_value = 0b1000
+        mock_calendar.next_collection_day.return_value = datetime.date.today() + datetime.timedelta(days=7)
+
+        self.mock_db.get_users_for_slot.return_value = [
+            {'user_id': 1, 'address': 'test_address'},
+            {'user_id': 2, 'address': None, 'delivery_mode': 'digest'}
+        ]
+        bot = AsyncMock()
+
+        await send_slot_notifications((tenant, '20:00'), bot)
 
-        self.mock_db.get_user.return_value = {'user_id': 1, 'notifications_enabled': True, 'address': 'test_address'}
-        context = AsyncMock()
-        context.job.data = 1
-        context.job_queue.get_jobs_by_name = MagicMock(return_value=[])
-        
-        await send_notification(context)
-        
-        context.bot.send_message.assert_called_once()
+        self.mock_db.get_users_for_slot.assert_called_once_with('20:00', 0b1000, 'calvenzano')
+        self.assertEqual(bot.send_message.call_count, 2)
+        self.assertIn((tenant, '20:00'), notification_scheduler)
+
+    async def test_send_slot_notifications_skips_empty_days(self):
+        mock_calendar = MagicMock()
+        mock_calendar.mask_on.return_value = 0
+        mock_calendar.next_collection_day.return_value = None
+        bot = AsyncMock()
+
+        await send_slot_notifications((make_tenant(mock_calendar), '20:00'), bot)
+
+        self.mock_db.get_users_for_slot.assert_not_called()
+        bot.send_message.assert_not_called()
 
     async def test_schedule_tomorrow_notification(self):
-        self.mock_db.get_all_users_for_notification.return_value = [
-            {'user_id': 1, 'notification_time': '20:00'}
-        ]
+        self.mock_db.get_notification_slots.return_value = ['20:00']
         context = MagicMock()
-        context.job_queue.get_jobs_by_name.return_value = [] # Mock this to return an empty list
-        context.job_queue.run_once = MagicMock()
+        context.bot_data = {}
         await schedule_tomorrow_notification(context)
+        self.assertEqual(len(notification_scheduler), 1)
+        self.assertIn((DEFAULT_TENANT, '20:00'), notification_scheduler)
+
+    async def test_schedule_tomorrow_notification_keeps_other_towns(self):
+        self.mock_db.get_notification_slots.return_value = ['20:00']
+        other = Tenant('arcene', 'Arcene', 'token', DEFAULT_TENANT.calendar, 2025, {})
+        for tenant in (DEFAULT_TENANT, other):
+            context = MagicMock()
+            context.bot_data = {'tenant': tenant}
+            await schedule_tomorrow_notification(context)
+        # Ricostruire gli slot di un comune non cancella quelli dell'altro
+        self.assertEqual(len(notification_scheduler), 2)
+        self.assertIn((other, '20:00'), notification_scheduler)
+        self.mock_db.get_notification_slots.assert_called_with('arcene')
+
+    @patch('service.schedule.build_notification')
+    async def test_shutdown_checkpoints_interrupted_send(self, mock_build_notification):
+        mock_build_notification.return_value = ("Domani: PLASTICA", ("PLASTICA",))
+        mock_calendar = MagicMock()
+        mock_calendar.mask_on.return_value = 0b1000
+        tenant = make_tenant(mock_calendar)
+        self.mock_db.get_users_for_slot.return_value = [{'user_id': user_id} for user_id in range(1, 6)]
+        self.mock_db.get_notification_slots.return_value = ['20:00']
+
+        # Il terzo invio resta appeso: l'arresto lo interrompe allo scadere del tempo
+        async def send_message(user_id, *args, **kwargs):
+            if user_id == 3:
+                await asyncio.sleep(10)
+        bot = AsyncMock()
+        bot.send_message.side_effect = send_message
+
+        notification_scheduler.schedule((tenant, '20:00'), datetime.datetime.now(pytz.utc) - datetime.timedelta(minutes=1), bot)
+        notification_scheduler.schedule((tenant, '21:00'), datetime.datetime.now(pytz.utc) + datetime.timedelta(hours=1), bot)
+        await asyncio.sleep(0.05)
+
+        report = await shutdown_notifications(timeout=0.05)
+
+        self.assertEqual(report, {'deferred_slots': 1, 'finished_sends': 0, 'cancelled_sends': 1, 'checkpointed_users': 3})
+        collection_date, user_ids, tenant_id = self.mock_db.save_pending_notifications.call_args[0]
+        self.assertEqual(user_ids, [3, 4, 5])
+        self.assertEqual(tenant_id, 'calvenzano')
+
+    @patch('service.schedule.build_notification')
+    async def test_shutdown_counts_slots_replanned_while_draining(self, mock_build_notification):
+        mock_build_notification.return_value = ("Domani: PLASTICA", ("PLASTICA",))
+        mock_calendar = MagicMock()
+        mock_calendar.mask_on.return_value = 0b1000
+        mock_calendar.next_collection_day.return_value = datetime.date.today() + datetime.timedelta(days=7)
+        tenant = make_tenant(mock_calendar)
+        self.mock_db.get_users_for_slot.return_value = [{'user_id': 1}]
+
+        # L'invio è lento ma finisce entro la scadenza, e ripianifica lo slot durante lo svuotamento
+        async def send_message(*args, **kwargs):
+            await asyncio.sleep(0.05)
+        bot = AsyncMock()
+        bot.send_message.side_effect = send_message
+
+        # Scheduler nuovo: quello condiviso ha già superato il tick corrente negli altri test
+        scheduler = NotificationScheduler(send_slot_notifications)
+        with patch('service.schedule.notification_scheduler', scheduler):
+            scheduler.schedule((tenant, '20:00'), datetime.datetime.now(pytz.utc) - datetime.timedelta(minutes=1), bot)
+            await asyncio.sleep(0.01)
+
+            report = await shutdown_notifications(timeout=1)
+
+        self.assertEqual(report, {'deferred_slots': 1, 'finished_sends': 1, 'cancelled_sends': 0, 'checkpointed_users': 0})
+        self.assertIn((tenant, '20:00'), scheduler)
+        self.assertIsNone(scheduler._handle)
+
+    @patch('service.schedule.build_notification')
+    async def test_resume_pending_notifications(self, mock_build_notification):
+        mock_build_notification.return_value = ("Domani: PLASTICA", ("PLASTICA",))
+        self.mock_db.take_pending_notifications.return_value = [{'user_id': 4}, {'user_id': 5}]
+        context = MagicMock()
+        context.bot_data = {}
+        context.bot = AsyncMock()
+
+        await resume_pending_notifications(context)
+
+        self.assertEqual(context.bot.send_message.call_count, 2)
+
+    def test_request_reschedule_is_coalesced(self):
+        context = MagicMock()
+        context.bot_data = {}
+        context.job_queue.get_jobs_by_name.return_value = []
+        request_reschedule(context)
         context.job_queue.run_once.assert_called_once()
 
+        # Una ricostruzione è già in attesa: la nuova richiesta viene assorbita
+        context.job_queue.get_jobs_by_name.return_value = [MagicMock()]
+        request_reschedule(context)
+        context.job_queue.run_once.assert_called_once()
+
+    def test_next_fire_time_skips_idle_evenings(self):
+        rome = pytz.timezone('Europe/Rome')
+        # Domenica sera: lunedì e martedì senza raccolta, la prossima è mercoledì 5 marzo
+        now = rome.localize(datetime.datetime(2025, 3, 2, 21, 0))
+        self.assertEqual(next_fire_time('20:00', now), rome.localize(datetime.datetime(2025, 3, 4, 20, 0)))
+
+    def test_next_fire_time_across_dst(self):
+        rome = pytz.timezone('Europe/Rome')
+        # Il 30 marzo 2025 entra l'ora legale: le 20:00 di martedì 1 aprile sono le 18:00 UTC
+        now = rome.localize(datetime.datetime(2025, 3, 29, 21, 0))
+        self.assertEqual(next_fire_time('20:00', now), pytz.utc.localize(datetime.datetime(2025, 4, 1, 18, 0)))
+
 if __name__ == '__main__':
     unittest.main()
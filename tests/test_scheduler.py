@@ -0,0 +1,118 @@
+import unittest
+import asyncio
+import datetime
+import random
+import pytz
+from unittest.mock import AsyncMock
+
+from service.scheduler import TimingWheel, NotificationScheduler, fire_time, TICK_SECONDS
+
+class TestTimingWheel(unittest.TestCase):
+
+    def test_timers_fire_at_their_tick(self):
+        random.seed(0)
+        now = 1_750_000_000
+        wheel = TimingWheel(now)
+        timers = [wheel.insert(now + random.randint(0, 86400 * 120), key) for key in range(200)]
+        cancelled = {timer.key for timer in timers[:20]}
+        for timer in timers[:20]:
+            wheel.cancel(timer)
+
+        fired = {}
+        clock = now
+        while len(wheel):
+            clock = max(clock, wheel.next_deadline())
+            for timer in wheel.advance(clock):
+                fired[timer.key] = clock
+
+        for timer in timers:
+            if timer.key in cancelled:
+                self.assertNotIn(timer.key, fired)
+            else:
+                self.assertEqual(fired[timer.key], timer.tick * TICK_SECONDS)
+
+    def test_empty_wheel(self):
+        wheel = TimingWheel(0)
+        self.assertIsNone(wheel.next_deadline())
+        self.assertEqual(wheel.advance(86400), [])
+
+class TestFireTime(unittest.TestCase):
+
+    def test_fire_time_dst(self):
+        self.assertEqual(fire_time('20:00', datetime.date(2025, 3, 29)), pytz.utc.localize(datetime.datetime(2025, 3, 29, 19, 0)))
+        self.assertEqual(fire_time('20:00', datetime.date(2025, 3, 30)), pytz.utc.localize(datetime.datetime(2025, 3, 30, 18, 0)))
+        # Le 02:30 del 30 marzo non esistono: si passa alle 03:30 ora legale
+        self.assertEqual(fire_time('02:30', datetime.date(2025, 3, 30)), pytz.utc.localize(datetime.datetime(2025, 3, 30, 1, 30)))
+
+class TestNotificationScheduler(unittest.IsolatedAsyncioTestCase):
+
+    async def test_schedule_replaces_and_fires(self):
+        callback = AsyncMock()
+        scheduler = NotificationScheduler(callback)
+        past = datetime.datetime.now(pytz.utc) - datetime.timedelta(minutes=1)
+
+        scheduler.schedule('20:00', past + datetime.timedelta(days=1), 'bot')
+        scheduler.schedule('20:00', past, 'bot')
+        self.assertEqual(len(scheduler), 1)
+
+        await asyncio.sleep(0.05)
+        callback.assert_awaited_once_with('20:00', 'bot')
+        self.assertNotIn('20:00', scheduler)
+
+    async def test_cancel(self):
+        callback = AsyncMock()
+        scheduler = NotificationScheduler(callback)
+        scheduler.schedule('07:30', datetime.datetime.now(pytz.utc))
+        scheduler.cancel('07:30')
+
+        await asyncio.sleep(0.05)
+        callback.assert_not_awaited()
+
+    async def test_drain(self):
+        release = asyncio.Event()
+        finished = []
+
+        async def callback(key, data):
+            if key == 'slow':
+                await asyncio.sleep(10)
+            else:
+                await release.wait()
+            finished.append(key)
+
+        scheduler = NotificationScheduler(callback)
+        now = datetime.datetime.now(pytz.utc) - datetime.timedelta(minutes=1)
+        scheduler.schedule('fast', now)
+        scheduler.schedule('slow', now)
+        await asyncio.sleep(0.05)
+
+        scheduler.stop()
+        release.set()
+        self.assertEqual(await scheduler.drain(0.1), (1, 1))
+        self.assertEqual(finished, ['fast'])
+        self.assertEqual(await scheduler.drain(0.1), (0, 0))
+
+    async def test_stop_sticks(self):
+        release = asyncio.Event()
+        fired = []
+
+        async def callback(key, data):
+            fired.append(key)
+            await release.wait()
+            # Come send_slot_notifications: a invio concluso lo slot si ripianifica
+            scheduler.schedule('next', datetime.datetime.now(pytz.utc) - datetime.timedelta(minutes=1))
+
+        scheduler = NotificationScheduler(callback)
+        scheduler.schedule('slot', datetime.datetime.now(pytz.utc) - datetime.timedelta(minutes=1))
+        await asyncio.sleep(0.05)
+
+        scheduler.stop()
+        release.set()
+        self.assertEqual(await scheduler.drain(0.1), (1, 0))
+        await asyncio.sleep(0.05)
+        # Lo slot ripianificato resta registrato ma non scatta
+        self.assertIn('next', scheduler)
+        self.assertEqual(fired, ['slot'])
+        self.assertIsNone(scheduler._handle)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import unittest
+import datetime
+import functools
+import json
+import os
+import tempfile
+from unittest.mock import patch, MagicMock
+
+from service.calendar import CALENDAR, load_schedule, load_calendar
+from service.tenants import load_tenants, tenant_of, DEFAULT_TENANT
+
+class TestTenants(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        # I calendari compilati restano nella directory del test, non nella cache di sistema
+        cache_dir = os.path.join(self.directory.name, 'cache')
+        patcher = patch('service.tenants.load_calendar', functools.partial(load_calendar, cache_dir=cache_dir))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write_json(self, name, data):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8') as json_file:
+            json.dump(data, json_file)
+        return path
+
+    def test_default_tenant(self):
+        self.assertEqual(load_tenants(None), [DEFAULT_TENANT])
+        context = MagicMock()
+        context.bot_data = {}
+        self.assertIs(tenant_of(context), DEFAULT_TENANT)
+
+    def test_load_schedule(self):
+        path = self.write_json('arcene.json', {'PLASTICA': {'3': [1, 15]}, 'VETRO E BARATTOLAME': {'12': [6]}})
+        self.assertEqual(load_schedule(path, 2025), {'PLASTICA': {3: [1, 15]}, 'VETRO E BARATTOLAME': {12: [6]}})
+
+    def test_load_schedule_invalid(self):
+        with self.assertRaises(ValueError):
+            load_schedule(self.write_json('a.json', {'PLASTICA': {'2': [29]}}), 2025)
+        with self.assertRaises(ValueError):
+            load_schedule(self.write_json('b.json', {'AMIANTO': {'2': [3]}}), 2025)
+
+    def test_load_tenants(self):
+        schedule = self.write_json('arcene.json', {'PLASTICA': {'3': [1]}})
+        path = self.write_json('tenants.json', [
+            {'id': 'calvenzano', 'town': 'Calvenzano', 'token_env': 'CALVENZANO_TOKEN'},
+            {'id': 'arcene', 'town': 'Arcene', 'token_env': 'ARCENE_TOKEN', 'schedule': schedule},
+        ])
+        with patch.dict(os.environ, {'CALVENZANO_TOKEN': 'token-1', 'ARCENE_TOKEN': 'token-2'}):
+            calvenzano, arcene = load_tenants(path)
+
+        self.assertIs(calvenzano.calendar, CALENDAR)
+        self.assertEqual(calvenzano.feed_prefix, '')
+        self.assertIn('CENTRO DI RACCOLTA', calvenzano.collection_centre_text('it'))
+        self.assertEqual(arcene.token, 'token-2')
+        self.assertEqual(arcene.feed_prefix, '/arcene')
+        self.assertEqual(arcene.calendar.collections_on(datetime.date(2025, 3, 1)), ('PLASTICA',))
+        self.assertEqual(arcene.collection_centre_text('it'), '')
+
+    def test_load_tenants_invalid(self):
+        with patch.dict(os.environ, {'ARCENE_TOKEN': 'token'}):
+            # Senza calendario un comune diverso da Calvenzano non può essere servito
+            with self.assertRaises(ValueError):
+                load_tenants(self.write_json('a.json', [{'id': 'arcene', 'token_env': 'ARCENE_TOKEN'}]))
+            with self.assertRaises(ValueError):
+                load_tenants(self.write_json('b.json', [{'id': 'arcene', 'token_env': 'MISSING_TOKEN'}]))
+
+if __name__ == '__main__':
+    unittest.main()